@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+#
+#  @file  bench.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+#/////////////////////////////////////////////////////////////////////////////
+
+#**********************************************************************#
+# Micro benchmarks for the parts of the pipeline that run.py and sim.py own.
+# The Evolvix worker is replaced by a stand-in that just writes a trajectory
+# so that the numbers only reflect the overhead around the simulations.
+#**********************************************************************#
+from __future__ import print_function
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import subprocess
+import time
+import random
+import math
+
+import sim
+import simserver
+import sampler
+import priors
+import smc
+import obscache
+import rundirs
+
+BIN_DIR = os.path.dirname(os.path.abspath(__file__))
+DEMO_QUEST = 'birth'
+DEMO_DIR = os.path.join(BIN_DIR, 'demo_quests', DEMO_QUEST)
+
+
+#**********************************************************************#
+def main():
+    args = parseArgs()
+    args.func(args)
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Benchmark parts of the ABC pipeline.',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    subparsers = parser.add_subparsers()
+
+    server = subparsers.add_parser('server', help='Per simulation overhead of sim.py vs. simclient.py with a simulation server.')
+    server.add_argument('-n', type=int, help='Number of simulations.', default=200)
+    server.set_defaults(func=benchServer)
+
+    native = subparsers.add_parser('sampler', help='Throughput of the native sampler for different numbers of cores.')
+    native.add_argument('-n', type=int, help='Number of simulations per core.', default=200)
+    native.add_argument('-c', type=int, nargs='+', help='Numbers of cores to try.', default=[1, 2, 4])
+    native.set_defaults(func=benchSampler)
+
+    abcSmc = subparsers.add_parser('smc', help='Simulations needed by SMC vs. rejection sampling to reach the same tolerance on the birth demo quest. '
+                                   'The birth model is replaced by a Poisson process with the same rate.')
+    abcSmc.add_argument('--particles', type=int, help='Number of SMC particles and of retained rejection samples.', default=1000)
+    abcSmc.add_argument('--prior-sims', type=int, help='Simulations used to estimate the rejection acceptance rate.', default=1000000)
+    abcSmc.add_argument('--seed', type=int, default=1)
+    abcSmc.set_defaults(func=benchSmc)
+
+    reader = subparsers.add_parser('reader', help='sim.getData vs. the original line by line reader.')
+    reader.add_argument('--rows', type=int, help='Number of time points.', default=100000)
+    reader.add_argument('--species', type=int, help='Number of species.', default=100)
+    reader.add_argument('--files', type=int, help='Number of TimeSeries files the species are split over.', default=2)
+    reader.set_defaults(func=benchReader)
+
+    runDirs = subparsers.add_parser('rundirs', help='Time to the first simulation with run directories of copies vs. links to one read-only copy.')
+    runDirs.add_argument('-c', type=int, nargs='+', help='Numbers of cores to try.', default=[10, 100, 1000, 10000])
+    runDirs.add_argument('--epb-size', type=float, help='Size of the stand-in parsed quest in MB.', default=1.0)
+    runDirs.set_defaults(func=benchRunDirs)
+
+    return parser.parse_args()
+
+
+#**********************************************************************#
+def makeRunDir(runDir=None):
+    runDir = runDir or tempfile.mkdtemp(prefix='evolvix_bench_')
+    if not os.path.isdir(runDir): os.mkdir(runDir)
+    shutil.copy(os.path.join(DEMO_DIR, DEMO_QUEST + 'Data.txt'), runDir)
+    with open(os.path.join(runDir, DEMO_QUEST + '-temp.par'), 'w') as f:
+        f.write('birthRate: 0.01\n')
+    workerPath = os.path.join(runDir, 'Worker_SSA_SDM')
+    with open(workerPath, 'w') as f:
+        f.write('#!/bin/sh\ncp {0}Data.txt TSmyTS.txt\n'.format(DEMO_QUEST))
+    os.chmod(workerPath, 0o755)
+    return runDir
+
+
+def timeSims(command, runDir, nSims):
+    start = time.time()
+    for i in range(nSims):
+        subprocess.check_call(command, cwd=runDir)
+    return (time.time() - start) / nSims
+
+
+def report(name, seconds, baseline=None):
+    line = '{0:<30} {1:10.2f} ms'.format(name, seconds * 1000)
+    if baseline: line += '  ({0:.1f}x)'.format(baseline / seconds)
+    print(line)
+
+
+#**********************************************************************#
+def benchServer(args):
+    runDir = makeRunDir()
+    try:
+        simArgs = [DEMO_QUEST, '--distance', 'L2']
+        before = timeSims([sys.executable, BIN_DIR + '/sim.py'] + simArgs, runDir, args.n)
+        server = subprocess.Popen([sys.executable, BIN_DIR + '/simserver.py'] + simArgs, cwd=runDir)
+        socketPath = os.path.join(runDir, simserver.SOCKET_NAME)
+        while not os.path.exists(socketPath): time.sleep(0.01)
+        after = timeSims([sys.executable, BIN_DIR + '/simclient.py'] + simArgs, runDir, args.n)
+        simserver.stopServer(socketPath)
+        server.wait()
+        report('sim.py per simulation', before)
+        report('simclient.py per simulation', after, before)
+    finally:
+        shutil.rmtree(runDir)
+
+
+#**********************************************************************#
+def benchSampler(args):
+    samDir = tempfile.mkdtemp(prefix='evolvix_bench_')
+    try:
+        priorsPath = os.path.join(DEMO_DIR, DEMO_QUEST + 'Priors.est')
+        for nCores in args.c:
+            for i in range(nCores): makeRunDir(os.path.join(samDir, str(i)))
+            nSims = args.n * nCores
+            start = time.time()
+            sampler.run(DEMO_QUEST, priorsPath, nSims, nCores, samDir, [DEMO_QUEST])
+            seconds = time.time() - start
+            print('{0:>3} cores {1:10.1f} simulations/s {2:10.2f} ms per simulation and core'.format(
+                  nCores, nSims / seconds, seconds * nCores / nSims * 1000))
+    finally:
+        shutil.rmtree(samDir)
+
+
+#**********************************************************************#
+def birthSurrogate(obsData):
+    #the birth quest is a Poisson process whose rate is the birthRate
+    import numpy
+    times = numpy.asarray(obsData['Time'])
+    observed = numpy.asarray(obsData['myPart'])
+    rng = numpy.random.RandomState(0)
+    counter = {'sims': 0}
+    def simulate(valuesList):
+        rates = numpy.array([values[0] for values in valuesList], dtype=float)
+        counts = numpy.cumsum(rng.poisson(rates[:, None] * numpy.diff(times)[None, :]), axis=1)
+        trajectories = numpy.hstack([numpy.zeros((len(rates), 1)), counts])
+        counter['sims'] += len(rates)
+        return numpy.square(trajectories - observed[None, :]).sum(axis=1)
+    return simulate, counter
+
+
+def benchSmc(args):
+    import numpy
+    obsData = sim.getData([os.path.join(DEMO_DIR, DEMO_QUEST + 'Data.txt')])
+    priorList = priors.readPriors(os.path.join(DEMO_DIR, DEMO_QUEST + 'Priors.est'))
+    simulate, counter = birthSurrogate(obsData)
+
+    populations = smc.run(priorList, simulate, args.particles, maxSims=50 * args.prior_sims, seed=args.seed)
+
+    pyRng = random.Random(args.seed)
+    priorValues = [[p.draw(pyRng) for p in priorList] for i in range(args.prior_sims)]
+    priorDistances = simulate(priorValues)
+    rates = numpy.array([v[0] for v in priorValues])
+
+    print('')
+    print('{0:>12} {1:>14} {2:>16} {3:>8} {4:>24} {5:>24}'.format(
+          'tolerance', 'SMC sims', 'rejection sims', 'ratio', 'SMC mean (sd)', 'rejection mean (sd)'))
+    nSims = 0
+    for population in populations:
+        nSims += population.nSims
+        if population.generation == 0: continue
+        accepted = priorDistances <= population.tolerance
+        nAccepted = int(accepted.sum())
+        smcRates = numpy.array([v[0] for v in population.values])
+        smcMean = numpy.average(smcRates, weights=population.weights)
+        smcSd = math.sqrt(numpy.average(numpy.square(smcRates - smcMean), weights=population.weights))
+        if nAccepted < 10:
+            rejectionSims, rejection = '>{0}'.format(args.particles * args.prior_sims // max(nAccepted, 1)), 'too few accepted'
+            ratio = ''
+        else:
+            needed = args.particles * float(args.prior_sims) / nAccepted
+            rejectionSims = '{0:.0f}'.format(needed)
+            ratio = '{0:.1f}x'.format(needed / nSims)
+            rejection = '{0:.5f} ({1:.5f})'.format(rates[accepted].mean(), rates[accepted].std())
+        print('{0:12.4g} {1:14d} {2:>16} {3:>8} {4:>24} {5:>24}'.format(
+              population.tolerance, nSims, rejectionSims, ratio, '{0:.5f} ({1:.5f})'.format(smcMean, smcSd), rejection))
+
+
+#**********************************************************************#
+def legacyGetData(filePaths):
+    #the reader sim.py used before it read whole columns at once
+    files = map(lambda x: open(x, 'r'), filePaths)
+    data = {}
+    for f in files:
+        fileData = {}
+        headers = f.readline().split()
+        for header in headers:
+            fileData[header] = []
+        for line in f:
+            for i in range(0, len(headers)):
+                fileData[headers[i]].append(float(line.split()[i]))
+        sim.mergeData(data, fileData)
+    return data
+
+
+def writeTimeSeries(path, times, species):
+    with open(path, 'w') as f:
+        f.write('\t'.join(['Time'] + species) + '\n')
+        for t in times:
+            f.write('\t'.join(['%.15f' % t] + ['%.15f' % random.uniform(0, 1000) for s in species]) + '\n')
+
+
+def benchReader(args):
+    runDir = tempfile.mkdtemp(prefix='evolvix_bench_')
+    try:
+        times = [i * 33.3333333333 for i in range(args.rows)]
+        species = ['species{0}'.format(i) for i in range(args.species)]
+        paths = []
+        for i in range(args.files):
+            paths.append(os.path.join(runDir, 'TS{0}.txt'.format(i)))
+            writeTimeSeries(paths[-1], times, species[i::args.files])
+        print('{0} rows, {1} species in {2} files'.format(args.rows, args.species, args.files))
+
+        start = time.time()
+        legacy = legacyGetData(paths)
+        before = time.time() - start
+        start = time.time()
+        columnar = sim.getData(paths)
+        after = time.time() - start
+        assert sorted(legacy) == sorted(columnar)
+        assert all(list(columnar[key]) == legacy[key] for key in legacy)
+
+        report('line by line reader', before)
+        report('columnar reader', after, before)
+    finally:
+        shutil.rmtree(runDir)
+
+
+#**********************************************************************#
+def legacyPrepRunDirs(samDir, srcFiles, nCores):
+    #how run.py set up the run directories before they were linked
+    for i in range(nCores):
+        runDir = os.path.join(samDir, str(i))
+        if not os.path.exists(runDir): os.mkdir(runDir)
+        for f in srcFiles:
+            shutil.copy(f, runDir)
+
+
+def makeSampleDir(samDir, epbSize):
+    #the top level files of a sample directory as run.py leaves them
+    makeRunDir(samDir)
+    shutil.copy(os.path.join(DEMO_DIR, DEMO_QUEST + 'Priors.est'), samDir)
+    dataPath = os.path.join(samDir, DEMO_QUEST + 'Data.txt')
+    obscache.writeCache(dataPath, sim.getData([dataPath]))
+    with open(os.path.join(samDir, DEMO_QUEST + 'Quest.epb'), 'wb') as f:
+        f.write(os.urandom(int(epbSize * 1024 * 1024)))
+    with open(os.path.join(samDir, DEMO_QUEST + '.par'), 'w') as f:
+        f.write('birthRate: birthRate\n')
+    return [os.path.join(samDir, f) for f in os.listdir(samDir) if os.path.isfile(os.path.join(samDir, f))]
+
+
+def timeToFirstSim(prep, samDir, srcFiles, nCores):
+    start = time.time()
+    prep(samDir, srcFiles, nCores)
+    runDir = os.path.join(samDir, '0')
+    with open(os.path.join(runDir, DEMO_QUEST + '-temp.par'), 'w') as f:
+        f.write('birthRate: 0.01\n')
+    subprocess.check_call([sys.executable, os.path.join(BIN_DIR, 'sim.py'), DEMO_QUEST], cwd=runDir)
+    return time.time() - start
+
+
+def benchRunDirs(args):
+    for nCores in args.c:
+        seconds = []
+        for prep in (legacyPrepRunDirs, rundirs.populate):
+            samDir = tempfile.mkdtemp(prefix='evolvix_bench_')
+            try:
+                srcFiles = makeSampleDir(samDir, args.epb_size)
+                seconds.append(timeToFirstSim(prep, samDir, srcFiles, nCores))
+            finally:
+                shutil.rmtree(samDir)
+        print('{0:>6} cores'.format(nCores))
+        report('  copies', seconds[0])
+        report('  links', seconds[1], seconds[0])
+
+
+if __name__ == '__main__':
+    main()
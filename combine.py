@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+#
+#  @file  combine.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# Appends the rows of the per core sample files (out.txt_sampling1.txt in
+# the numbered run directories) to samples.txt without holding them in
+# memory. A manifest next to samples.txt records, for every sample file,
+# how many of its bytes have been merged and the size samples.txt had
+# afterwards, so combining again only appends rows that are new since the
+# last combine. Only complete lines are merged, so a sample file that is
+# still being written can be combined again later.
+#
+# The manifest is only replaced once all rows are written. Rows appended
+# by a combine that did not finish are cut off again by the next one.
+#**********************************************************************#
+from __future__ import print_function
+import os
+import json
+import hashlib
+from multiprocessing.pool import ThreadPool
+
+CHUNK_SIZE = 16 * 1024 * 1024
+MANIFEST_SUFFIX = '.manifest'
+IDENTITY_BYTES = 4096
+
+
+#**********************************************************************#
+def combine(samFile, sampleFiles, jobs=1):
+    #returns the number of bytes appended to samFile
+    manifestPath = samFile + MANIFEST_SUFFIX
+    manifest = readManifest(manifestPath)
+    if manifest is not None and not os.path.isfile(samFile):
+        manifest = None
+    if manifest is not None and os.path.getsize(samFile) < manifest['size']:
+        raise Exception(samFile + ' is shorter than when it was last combined. Remove ' + manifestPath + ' to combine it anew.')
+    if manifest is None and os.path.isfile(samFile):
+        print('Warning: ' + samFile + ' was not combined with a manifest, all sample files are appended to it.')
+        manifest = {'size': os.path.getsize(samFile), 'shards': {}}
+    elif manifest is None:
+        manifest = {'size': 0, 'shards': {}}
+
+    header = None
+    if manifest['size'] > 0:
+        with open(samFile, 'rb') as f:
+            header = f.readline()
+
+    samDir = os.path.dirname(os.path.abspath(samFile))
+    plan = []
+    end = manifest['size']
+    for sampleFile in sampleFiles:
+        key = os.path.relpath(os.path.abspath(sampleFile), samDir)
+        shardHeader, start, stop = newRange(sampleFile, manifest['shards'].get(key))
+        if header is None:
+            header = shardHeader
+            end = len(header)
+        elif shardHeader != header:
+            raise Exception('The header of {0} does not match the header of {1}.'.format(sampleFile, samFile))
+        if stop > start:
+            plan.append((sampleFile, start, stop, end))
+            end += stop - start
+        else:
+            print('No new samples in ' + os.path.abspath(sampleFile))
+        manifest['shards'][key] = {'offset': stop, 'identity': identity(sampleFile, stop)}
+
+    fd = os.open(samFile, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        #drops whatever an unfinished combine appended after the last manifest
+        os.ftruncate(fd, manifest['size'])
+        if manifest['size'] == 0: os.write(fd, header)
+        if jobs > 1 and len(plan) > 1:
+            pool = ThreadPool(jobs)
+            try: pool.map(lambda part: copyRange(fd, *part), plan, chunksize=1)
+            finally: pool.close()
+        else:
+            for part in plan: copyRange(fd, *part)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+    appended = end - max(manifest['size'], len(header))
+    manifest['size'] = end
+    writeManifest(manifestPath, manifest)
+    return appended
+
+
+def newRange(sampleFile, shard):
+    #returns the header and the range of complete lines not merged yet
+    with open(sampleFile, 'rb') as f:
+        header = f.readline()
+        if not header.endswith(b'\n'):
+            raise Exception('The header of {0} is incomplete.'.format(sampleFile))
+        stop = lastLineEnd(f, os.fstat(f.fileno()).st_size, len(header))
+    start = len(header)
+    #a sample file that shrank or changed was written anew and is merged from the start
+    if shard and shard['offset'] <= stop and identity(sampleFile, shard['offset']) == shard['identity']:
+        start = shard['offset']
+    return header, start, stop
+
+
+def lastLineEnd(f, size, minimum):
+    position = size
+    while position > minimum:
+        length = min(CHUNK_SIZE, position - minimum)
+        f.seek(position - length)
+        newline = f.read(length).rfind(b'\n')
+        if newline >= 0: return position - length + newline + 1
+        position -= length
+    return minimum
+
+
+def identity(sampleFile, offset):
+    #a hash of the start of what was merged, so a rewritten sample file is noticed
+    with open(sampleFile, 'rb') as f:
+        return hashlib.sha1(f.read(min(offset, IDENTITY_BYTES))).hexdigest()
+
+
+def copyRange(fd, sampleFile, start, stop, destination):
+    src = os.open(sampleFile, os.O_RDONLY)
+    try:
+        while start < stop:
+            data = os.pread(src, min(CHUNK_SIZE, stop - start), start)
+            if not data: raise Exception(sampleFile + ' got shorter while it was combined.')
+            written = 0
+            while written < len(data):
+                written += os.pwrite(fd, data[written:], destination + written)
+            start += len(data)
+            destination += len(data)
+    finally:
+        os.close(src)
+    print('Done processing ' + os.path.abspath(sampleFile))
+
+
+#**********************************************************************#
+def readManifest(path):
+    if not os.path.isfile(path): return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def writeManifest(path, manifest):
+    tmpPath = path + '.tmp'
+    with open(tmpPath, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(tmpPath, path)
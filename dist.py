@@ -2,6 +2,11 @@ import sys
 import math
 import inspect
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 def L2(obsData, simData):
     dist = 0
@@ -33,8 +38,108 @@ try:
 except ImportError:
     pass
 
-#the following code needs to be below all function definitions
+#the following code needs to be below all distance function definitions
 funcObjects = inspect.getmembers(sys.modules[__name__], inspect.isfunction)
 distFuncs = {}
 for name, func in funcObjects:
     distFuncs[name] = func;
+
+
+#**********************************************************************#
+# Vectorized versions of the distances above. They take the observed and
+# simulated data as whole (time x species) matrices plus the max(obs, 1)
+# denominators (precomputed in <quest>Data.bin, see obscache.py) and
+# return one distance per species column. geometric is computed in log
+# space so that long time series don't underflow.
+#**********************************************************************#
+def _L2Columns(obs, sim, z):
+    return numpy.square(sim - obs).sum(axis=0)
+
+def _normalizedL2Columns(obs, sim, z):
+    return (numpy.square(sim - obs) / z).sum(axis=0)
+
+def _geometricColumns(obs, sim, z):
+    logTerms = numpy.log(numpy.maximum(numpy.square(sim - obs) / z, 1 / z))
+    return numpy.exp(logTerms.mean(axis=0))
+
+columnFuncs = {'L2': _L2Columns, 'normalizedL2': _normalizedL2Columns, 'geometric': _geometricColumns}
+
+def stackColumns(columns):
+    if numpy is None: return list(zip(*columns))
+    return numpy.column_stack(columns).astype(float)
+
+def columnDists(funcName, obsMatrix, simMatrix, denominators=None):
+    if funcName not in distFuncs:
+        raise Exception('Invalid distance function name: {}'.format(funcName))
+    if numpy is None or funcName not in columnFuncs:
+        #fall back to the element wise functions, one column at a time
+        return [distFuncs[funcName](list(obsCol), list(simCol))
+                for obsCol, simCol in zip(zip(*obsMatrix), zip(*simMatrix))]
+    obs = numpy.asarray(obsMatrix, dtype=float)
+    sim = numpy.asarray(simMatrix, dtype=float)
+    if obs.shape != sim.shape:
+        raise Exception('Distance function requires matrices of the same shape')
+    if denominators is None: z = numpy.maximum(obs, 1)
+    else:                    z = numpy.asarray(denominators, dtype=float)
+    return columnFuncs[funcName](obs, sim, z)
+
+def matrixDist(funcName, obsMatrix, simMatrix, denominators=None):
+    return float(sum(columnDists(funcName, obsMatrix, simMatrix, denominators)))
+
+
+#**********************************************************************#
+# Lower bound on the final distance while the simulated rows are still
+# arriving (see early rejection in sim.py). Every term of L2 and
+# normalizedL2 is non-negative, and every factor of geometric is at least
+# 1/max(obs, 1), so the rows that are still missing can only push the
+# distance up from here. Distances without a known bound never reject.
+#**********************************************************************#
+class PartialDistance(object):
+
+    def __init__(self, funcName, obsData, denominators=None):
+        self.funcName = funcName
+        self.times = obsData['Time']
+        self.nRows = len(self.times)
+        self.valid = funcName in columnFuncs
+        self.obs = {}
+        self.z = {}
+        self.terms = {}
+        self.seen = {}
+        self.logRemaining = {}
+        for key in obsData:
+            if key == 'Time': continue
+            self.obs[key] = obsData[key]
+            self.z[key] = denominators[key] if denominators else [max(x, 1) for x in obsData[key]]
+            self.terms[key] = 0.0
+            self.seen[key] = 0
+            if funcName == 'geometric':
+                #sum of log(1/z) over the rows from i on
+                suffix = [0.0] * (self.nRows + 1)
+                for i in range(self.nRows - 1, -1, -1):
+                    suffix[i] = suffix[i + 1] - math.log(self.z[key][i])
+                self.logRemaining[key] = suffix
+
+    def addRow(self, rowIndex, headers, row):
+        if not self.valid: return
+        if rowIndex >= self.nRows:
+            self.valid = False
+            return
+        for key, value in zip(headers, row):
+            if key == 'Time':
+                if value != self.times[rowIndex]: self.valid = False
+                continue
+            if key not in self.obs:
+                self.valid = False
+                continue
+            z = self.z[key][rowIndex]
+            squared = (value - self.obs[key][rowIndex]) ** 2
+            if self.funcName == 'L2':             self.terms[key] += squared
+            elif self.funcName == 'normalizedL2': self.terms[key] += squared / z
+            else:                                 self.terms[key] += math.log(max(squared / z, 1.0 / z))
+            self.seen[key] = rowIndex + 1
+
+    def lowerBound(self):
+        if not self.valid: return 0.0
+        if self.funcName != 'geometric': return sum(self.terms.values())
+        return sum(math.exp((self.terms[key] + self.logRemaining[key][self.seen[key]]) / self.nRows)
+                   for key in self.terms)
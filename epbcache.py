@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+#
+#  @file  epbcache.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# Cache of the models Evolvix --parse_only makes of quest files. A parsed
+# model is kept as <cache dir>/<key>.epb, where the key is the sha1 of the
+# quest file and of the Evolvix binary, so a run only parses a quest if
+# the quest or Evolvix changed since the last parse. The parser writes to
+# a temporary file that is only renamed to its key once Evolvix exited
+# without an error, so a failed or interrupted parse is never cached.
+#**********************************************************************#
+from __future__ import print_function
+import os
+import shutil
+import hashlib
+import tempfile
+import subprocess
+
+EPB_SUFFIX = '.epb'
+HASH_BLOCK_SIZE = 16 * 2 ** 20
+
+
+def cacheKey(questPath, evolvixPath):
+    digest = hashlib.sha1()
+    for path in (questPath, evolvixPath):
+        fileDigest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                fileDigest.update(block)
+        digest.update(fileDigest.digest())
+    return digest.hexdigest()
+
+
+def parsedModel(questPath, evolvixPath, cacheDir):
+    #returns the path of the cached model of the quest, parsing it first if needed, and whether it was cached
+    path = os.path.join(cacheDir, cacheKey(questPath, evolvixPath) + EPB_SUFFIX)
+    if os.path.isfile(path): return path, True
+    if not os.path.isdir(cacheDir): os.makedirs(cacheDir)
+    fd, tempPath = tempfile.mkstemp(suffix=EPB_SUFFIX, dir=cacheDir)
+    os.close(fd)
+    try:
+        try:
+            status = subprocess.call([evolvixPath, '--parse_only', tempPath, questPath])
+        except OSError:
+            raise Exception('There was an error parsing the quest file. Check that Evolvix is installed and available.')
+        if status != 0:
+            raise Exception('Evolvix could not parse {0} (exit status {1}).'.format(questPath, status))
+        if os.path.getsize(tempPath) == 0:
+            raise Exception('Evolvix did not write a model for {0}.'.format(questPath))
+        os.rename(tempPath, path)
+    finally:
+        if os.path.exists(tempPath): os.remove(tempPath)
+    return path, False
+
+
+def install(cachedPath, path):
+    #hard links the cached model where possible, runs only read it
+    if os.path.exists(path): os.remove(path)
+    try:
+        os.link(cachedPath, path)
+    except OSError:
+        shutil.copyfile(cachedPath, path)
@@ -0,0 +1,458 @@
+#!/usr/bin/env python
+#
+#  @file  estimator.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# A numpy replacement for the standard estimation of ABCestimator. It
+# reads the same input file (see estimatorTemplate.input.txt) and writes
+# the main outputs under the same names:
+#
+#   <outputPrefix>model0_BestSimsParamStats_Obs0.txt       retained samples
+#   <outputPrefix>model0_MarginalPosteriorDensities_Obs0.txt
+#   <outputPrefix>model0_MarginalPosteriorCharacteristics.txt
+#
+# The numRetained samples closest to the observed statistics (Euclidean
+# distance on statistics standardized over all samples) are retained. With
+# the loclinear regression their parameters are then adjusted towards the
+# observed statistics by Epanechnikov weighted local-linear regression
+# (Beaumont et al. 2002). The adjustment is done on the logit scale within
+# the prior bounds, so adjusted values stay inside the priors. Densities
+# are weighted Gaussian kernel density estimates on posteriorDensityPoints
+# points; above DIRECT_KDE_LIMIT kernel evaluations they are computed by
+# binning and FFT (see kde.py) and checked against the direct sum at a few
+# points. This is not ABCestimator's ABC-GLM, so the densities are close to
+# but not the same as ABCestimator's.
+#
+# A line "jointPosteriors a,b;c,d" in the input file adds the joint
+# posterior density of every listed pair of parameters on a grid of
+# jointPosteriorDensityPoints points per axis:
+#
+#   <outputPrefix>model0_jointPosterior_<a>_<b>_Obs0.txt    columns a, b, density
+#
+#     ./estimator.py birthEstimator.input.txt --priors birthPriors.est
+#**********************************************************************#
+from __future__ import print_function
+import os
+import math
+import argparse
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import kde
+import priors
+import samplestore
+
+REGRESSIONS = ['loclinear', 'none']
+DEFAULT_OUTPUT_PREFIX = 'ABC_GLM_'
+CHARACTERISTICS_NAME = 'model0_MarginalPosteriorCharacteristics.txt'
+SWEEP_DIR_NAME = 'sweep'
+SWEEP_RUN_NAME = 'r{0}_p{1}'
+SWEEP_TABLE_NAME = 'sweep.txt'
+SWEEP_STATS = ['mode', 'mean', 'median', 'HDI95_lower', 'HDI95_upper']
+DEFAULT_DENSITY_POINTS = 500
+DEFAULT_JOINT_DENSITY_POINTS = 100
+DIRECT_KDE_LIMIT = 10 ** 7     #kernel evaluations above which densities are binned
+KDE_TOLERANCE = 1e-3           #largest binning error relative to the peak density
+QUANTILE_LEVELS = [50, 90, 95, 99]
+LOGIT_EPSILON = 1e-10
+
+
+#**********************************************************************#
+def main():
+    args = parseArgs()
+    if args.sweep_retained or args.sweep_peak_width:
+        counts = parseList(args.sweep_retained, int) or [int(float(readSettings(args.input)['numRetained']))]
+        sweep(args.input, counts, parseList(args.sweep_peak_width, float) or [None], args.regression, args.priors,
+              nSamples=args.sweep_samples)
+    else:
+        run(args.input, args.regression, args.priors, args.dirac_peak_width)
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Estimate posteriors from an ABCestimator input file.',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('input', type=str, help='ABCestimator input file')
+    parser.add_argument('--regression', type=str, choices=REGRESSIONS, default='loclinear',
+                        help='Regression adjustment of the retained parameters.')
+    parser.add_argument('--priors', type=str, help='Priors.est file, whose bounds keep the adjusted parameters inside the priors.')
+    parser.add_argument('--dirac-peak-width', action='store_true', help='Use the diracPeakWidth of the input file, relative to the prior ranges, '
+                        'for the posterior densities instead of Silverman\'s rule.')
+    parser.add_argument('--sweep-retained', type=str, help='Comma separated numbers of retained samples to estimate with, '
+                        'into sweep/r<retained>_p<peak width>/ next to the input file, with a comparison table in sweep/sweep.txt.')
+    parser.add_argument('--sweep-peak-width', type=str, help='Comma separated kernel widths of the sweep, relative to the prior ranges '
+                        'like diracPeakWidth. Default: Silverman\'s rule.')
+    parser.add_argument('--sweep-samples', type=int, help='Number of samples the input was selected from, for the percentages '
+                        'of the sweep table. Default: the number of rows of the input.')
+    return parser.parse_args()
+
+
+#**********************************************************************#
+def run(inputPath, regression='loclinear', priorsPath=None, usePeakWidth=False):
+    #the densities use Silverman's rule unless usePeakWidth asks for the diracPeakWidth of the input file
+    table = ReferenceTable(inputPath, priorsPath)
+    nRetained = min(int(float(table.settings['numRetained'])), table.rows)
+    retained, distances, values, weights = table.estimate(nRetained, regression)
+    peakWidth = float(table.settings['diracPeakWidth']) if usePeakWidth else None
+    writeEstimate(table, table.prefix, retained, values, weights, peakWidth)
+    print('Retained {0} of {1} samples, largest distance {2}'.format(len(retained), table.rows, distances.max()))
+
+
+def sweep(inputPath, counts, peakWidths=(None,), regression='loclinear', priorsPath=None, outDir=None, nSamples=None):
+    #one estimate per number of retained samples and peak width, all from one sort of the distances.
+    #nSamples is the size of the whole sample when the input only holds the closest of them
+    table = ReferenceTable(inputPath, priorsPath)
+    nSamples = nSamples or table.rows
+    outDir = outDir or os.path.join(table.baseDir, SWEEP_DIR_NAME)
+    counts = sorted(set(min(int(k), table.rows) for k in counts))
+    table.sortClosest(counts[-1])
+    runs = []
+    for k in counts:
+        #the regression depends on the retained samples only, the densities on the peak width
+        retained, distances, values, weights = table.estimate(k, regression)
+        for peakWidth in peakWidths:
+            runDir = os.path.join(outDir, sweepRunName(k, peakWidth))
+            if not os.path.isdir(runDir): os.makedirs(runDir)
+            prefix = os.path.join(runDir, table.settings.get('outputPrefix', DEFAULT_OUTPUT_PREFIX))
+            writeEstimate(table, prefix, retained, values, weights, peakWidth, writeRows=False)
+            runs.append((k, peakWidth, prefix + CHARACTERISTICS_NAME))
+        print('Retained {0} of {1} samples, largest distance {2}'.format(k, nSamples, distances.max()))
+    writeSweepTable(os.path.join(outDir, SWEEP_TABLE_NAME), runs, table.paramNames, nSamples)
+
+
+def sweepRunName(nRetained, peakWidth):
+    return SWEEP_RUN_NAME.format(nRetained, 'default' if peakWidth is None else '{0:g}'.format(peakWidth))
+
+
+#**********************************************************************#
+class ReferenceTable(object):
+    #the samples named by an estimator input file and their distances to the observed statistics
+    def __init__(self, inputPath, priorsPath=None):
+        if numpy is None:
+            raise Exception('The native estimator needs numpy.')
+        self.baseDir = os.path.dirname(os.path.abspath(inputPath))
+        self.settings = readSettings(inputPath)
+        self.simPath = os.path.join(self.baseDir, self.settings['simName'])
+        obsNames, self.obsValues = readObserved(os.path.join(self.baseDir, self.settings['obsName']))
+        self.prefix = os.path.join(self.baseDir, self.settings.get('outputPrefix', DEFAULT_OUTPUT_PREFIX))
+        self.header, self.data = readSamples(self.simPath, obsNames, self.settings)
+        self.paramNames = [self.header[i - 1] for i in parseColumns(self.settings['params'])]
+        self.bounds = priorBounds(self.paramNames, priorsPath)
+        #distances on statistics standardized over all samples
+        self.stats = numpy.column_stack([self.data[name] for name in obsNames])
+        self.scale = self.stats.std(axis=0)
+        self.scale[self.scale == 0] = 1
+        self.distances = numpy.sqrt((((self.stats - self.obsValues) / self.scale) ** 2).sum(axis=1))
+        self.rows = len(self.distances)
+        self.order = None
+
+    def sortClosest(self, k):
+        #orders the k closest samples by distance, after which closest() takes prefixes of them
+        candidates = numpy.argpartition(self.distances, k - 1)[:k] if k < self.rows else numpy.arange(self.rows)
+        self.order = candidates[numpy.argsort(self.distances[candidates], kind='stable')]
+
+    def closest(self, k):
+        #indices (in file order) and distances of the k samples closest to the observed statistics
+        if self.order is not None and k <= len(self.order):
+            retained = numpy.sort(self.order[:k])
+        elif k < self.rows:
+            retained = numpy.sort(numpy.argpartition(self.distances, k - 1)[:k])
+        else:
+            retained = numpy.arange(self.rows)
+        return retained, self.distances[retained]
+
+    def estimate(self, k, regression):
+        #the retained samples and their (adjusted) parameter values and weights
+        retained, distances = self.closest(k)
+        values = numpy.column_stack([numpy.asarray(self.data[name])[retained] for name in self.paramNames])
+        weights = epanechnikov(distances)
+        if regression == 'loclinear':
+            values = adjust(values, (self.stats[retained] - self.obsValues) / self.scale, weights, self.bounds)
+        else:
+            weights = numpy.ones(len(retained))
+        return retained, distances, values, weights
+
+
+def writeEstimate(table, prefix, retained, values, weights, peakWidth=None, writeRows=True):
+    nPoints = int(float(table.settings.get('posteriorDensityPoints', DEFAULT_DENSITY_POINTS)))
+    if writeRows:
+        writeRetained(prefix + 'model0_BestSimsParamStats_Obs0.txt', table.simPath, table.header, retained)
+    grids, densities = [], []
+    for j, name in enumerate(table.paramNames):
+        bandwidth = peakBandwidth(peakWidth, values[:, j], table.bounds[j])
+        grid, density = posteriorDensity(values[:, j], weights, nPoints, table.bounds[j], bandwidth)
+        grids.append(grid)
+        densities.append(density)
+    writeDensities(prefix + 'model0_MarginalPosteriorDensities_Obs0.txt', table.paramNames, grids, densities)
+    writeCharacteristics(prefix + CHARACTERISTICS_NAME, table.paramNames, values, weights, grids, densities)
+    nJointPoints = int(float(table.settings.get('jointPosteriorDensityPoints', DEFAULT_JOINT_DENSITY_POINTS)))
+    for a, b in parsePairs(table.settings.get('jointPosteriors', ''), table.paramNames):
+        i, j = table.paramNames.index(a), table.paramNames.index(b)
+        jointGrids, joint = jointPosteriorDensity(values[:, i], values[:, j], weights, nJointPoints, grids[i], grids[j])
+        writeJointDensity('{0}model0_jointPosterior_{1}_{2}_Obs0.txt'.format(prefix, a, b), a, b, jointGrids, joint)
+
+
+#**********************************************************************#
+def readSettings(path):
+    settings = {}
+    with open(path, 'r') as f:
+        for line in f:
+            fields = line.split(None, 1)
+            if len(fields) == 2 and not fields[0].startswith('//'): settings[fields[0]] = fields[1].strip()
+    for name in ('simName', 'obsName', 'params', 'numRetained'):
+        if name not in settings: raise Exception('The estimator input file {0} does not set {1}.'.format(path, name))
+    return settings
+
+
+def parseList(text, kind):
+    return [kind(float(x)) for x in text.split(',') if x.strip()] if text else []
+
+
+def parseColumns(text):
+    #column numbers start at 1, ranges like 2-4 are allowed
+    columns = []
+    for part in text.replace(' ', '').split(','):
+        if not part: continue
+        first, _, last = part.partition('-')
+        columns.extend(range(int(first), int(last or first) + 1))
+    return columns
+
+
+def parsePairs(text, paramNames):
+    #"a,b;c,d" -> [(a, b), (c, d)]
+    pairs = []
+    for group in text.split(';'):
+        if not group.strip(): continue
+        pair = [name.strip() for name in group.split(',')]
+        if len(pair) != 2 or pair[0] == pair[1]:
+            raise Exception('Joint posteriors are defined for pairs of parameters, not: ' + group)
+        for name in pair:
+            if name not in paramNames: raise Exception('Unknown parameter in jointPosteriors: ' + name)
+        pairs.append(tuple(pair))
+    return pairs
+
+
+def readObserved(path):
+    with open(path, 'r') as f:
+        names = f.readline().split()
+        values = [float(x) for x in f.readline().split()]
+    if len(values) != len(names):
+        raise Exception('Cannot read the observed statistics in ' + path)
+    return names, numpy.array(values)
+
+
+def readSamples(simPath, obsNames, settings):
+    #the needed columns, from the sample store if it is up to date
+    with open(simPath, 'r') as f:
+        header = f.readline().split()
+    names = [header[i - 1] for i in parseColumns(settings['params'])] + list(obsNames)
+    for name in names:
+        if name not in header: raise Exception('The samples {0} have no column {1}.'.format(simPath, name))
+    maxRows = int(float(settings.get('maxReadSims', 0))) or None
+    store = samplestore.openStore(simPath)
+    if store is not None:
+        return header, dict((name, store.column(name)[:maxRows]) for name in names)
+    columns = sorted(set(header.index(name) for name in names))
+    table = numpy.loadtxt(simPath, skiprows=1, usecols=columns, ndmin=2, max_rows=maxRows)
+    return header, dict((header[c], table[:, i]) for i, c in enumerate(columns))
+
+
+#**********************************************************************#
+def epanechnikov(distances):
+    bandwidth = distances.max()
+    if bandwidth == 0: return numpy.ones(len(distances))
+    return 1 - (distances / bandwidth) ** 2
+
+
+def adjust(values, statDiffs, weights, bounds):
+    #local-linear regression of the transformed parameters on the statistics, evaluated at the observed statistics
+    transformed = numpy.column_stack([toRegressionScale(values[:, j], bounds[j]) for j in range(values.shape[1])])
+    design = numpy.column_stack([numpy.ones(len(values)), statDiffs])
+    root = numpy.sqrt(weights)[:, None]
+    keep = weights > 0
+    beta = numpy.linalg.lstsq((design * root)[keep], (transformed * root)[keep], rcond=None)[0]
+    adjusted = transformed - statDiffs.dot(beta[1:])
+    return numpy.column_stack([fromRegressionScale(adjusted[:, j], bounds[j]) for j in range(values.shape[1])])
+
+
+def priorBounds(paramNames, priorsPath):
+    #(lower, upper, log scale) of every parameter with a prior, None for the others
+    byName = {}
+    if priorsPath and os.path.isfile(priorsPath):
+        byName = dict((prior.name, prior) for prior in priors.readPriors(priorsPath))
+    bounds = []
+    for name in paramNames:
+        prior = byName.get(name)
+        if prior is None or prior.dist == 'fixed' or prior.min == prior.max: bounds.append(None)
+        else: bounds.append((prior.min, prior.max, prior.isLogScale()))
+    return bounds
+
+
+def toRegressionScale(x, bounds):
+    if bounds is None: return x
+    lower, upper, log = bounds
+    if log: x, lower, upper = numpy.log(x), math.log(lower), math.log(upper)
+    p = numpy.clip((x - lower) / (upper - lower), LOGIT_EPSILON, 1 - LOGIT_EPSILON)
+    return numpy.log(p / (1 - p))
+
+
+def fromRegressionScale(y, bounds):
+    if bounds is None: return y
+    lower, upper, log = bounds
+    if log: lower, upper = math.log(lower), math.log(upper)
+    x = lower + (upper - lower) / (1 + numpy.exp(-y))
+    return numpy.exp(x) if log else x
+
+
+#**********************************************************************#
+def posteriorDensity(values, weights, nPoints, bounds, bandwidth=None):
+    #Silverman's bandwidth unless one is given
+    weights = weights / weights.sum()
+    if not bandwidth:
+        mean = weights.dot(values)
+        sd = math.sqrt(max(weights.dot((values - mean) ** 2), 0))
+        nEffective = 1 / numpy.square(weights).sum()
+        bandwidth = 1.06 * sd * nEffective ** -0.2 or 1e-12 * max(abs(mean), 1)
+    lower, upper = values.min() - 3 * bandwidth, values.max() + 3 * bandwidth
+    if bounds is not None: lower, upper = max(lower, bounds[0]), min(upper, bounds[1])
+    grid = numpy.linspace(lower, upper, nPoints)
+    if len(values) * nPoints <= DIRECT_KDE_LIMIT:
+        return grid, kde.directDensity(values, weights, grid, bandwidth)
+    density = kde.density(values, weights, grid, bandwidth)
+    error = kde.maxError(values, weights, grid, density, bandwidth)
+    if error > KDE_TOLERANCE:
+        print('Binned density differs by {0:.2g} of its peak from the direct sum, using the direct sum.'.format(error))
+        density = kde.directDensity(values, weights, grid, bandwidth)
+    return grid, density
+
+
+def peakBandwidth(peakWidth, values, bounds):
+    #ABCestimator's diracPeakWidth is relative to the prior range
+    if peakWidth is None: return None
+    if bounds is not None and numpy.isfinite(bounds).all(): return peakWidth * (bounds[1] - bounds[0])
+    return peakWidth * (values.max() - values.min())
+
+
+def jointPosteriorDensity(x, y, weights, nPoints, gridX, gridY):
+    #on the ranges of the marginal grids, with Scott's rule bandwidths
+    weights = weights / weights.sum()
+    nEffective = 1 / numpy.square(weights).sum()
+    bandwidths = []
+    for values, grid in ((x, gridX), (y, gridY)):
+        sd = math.sqrt(max(weights.dot((values - weights.dot(values)) ** 2), 0))
+        bandwidths.append(sd * nEffective ** (-1 / 6.0) or (grid[-1] - grid[0]) / nPoints or 1e-12)
+    jointGrids = numpy.linspace(gridX[0], gridX[-1], nPoints), numpy.linspace(gridY[0], gridY[-1], nPoints)
+    return jointGrids, kde.density2d(x, y, weights, jointGrids[0], jointGrids[1], bandwidths[0], bandwidths[1])
+
+
+def weightedQuantiles(values, weights, probabilities):
+    order = numpy.argsort(values)
+    cumulative = numpy.cumsum(weights[order])
+    cumulative /= cumulative[-1]
+    return numpy.interp(probabilities, cumulative, values[order])
+
+
+def highestDensityInterval(grid, density, level):
+    #smallest set of grid points holding the level, reported by its outermost points
+    order = numpy.argsort(density)[::-1]
+    mass = numpy.cumsum(density[order])
+    inside = order[:numpy.searchsorted(mass, level / 100.0 * mass[-1]) + 1]
+    return grid[inside].min(), grid[inside].max()
+
+
+#**********************************************************************#
+def writeRetained(path, simPath, header, retained):
+    #copies the retained rows of the samples, which are in file order
+    with open(simPath, 'rb') as f, open(path, 'wb') as out:
+        out.write(f.readline())
+        wanted = iter(retained.tolist())
+        next_ = next(wanted, None)
+        for i, line in enumerate(f):
+            if next_ is None: break
+            if i == next_:
+                out.write(line)
+                next_ = next(wanted, None)
+
+
+def writeDensities(path, paramNames, grids, densities):
+    with open(path, 'w') as out:
+        out.write('\t'.join(['number'] + [n for name in paramNames for n in (name, name + '.density')]) + '\n')
+        for i in range(len(grids[0])):
+            out.write('\t'.join([str(i)] + ['{0!r}\t{1!r}'.format(float(g[i]), float(d[i])) for g, d in zip(grids, densities)]) + '\n')
+
+
+def writeJointDensity(path, nameX, nameY, grids, density):
+    with open(path, 'w') as out:
+        out.write('\t'.join([nameX, nameY, 'density']) + '\n')
+        for i, x in enumerate(grids[0]):
+            for j, y in enumerate(grids[1]):
+                out.write('{0!r}\t{1!r}\t{2!r}\n'.format(float(x), float(y), float(density[i, j])))
+
+
+def writeSweepTable(path, runs, paramNames, nSamples):
+    #one row of posterior characteristics per (retained, peakWidth, characteristics file) of a sweep
+    header = ['retained', 'percent', 'peakWidth'] + ['{0}_{1}'.format(name, stat) for name in paramNames for stat in SWEEP_STATS]
+    with open(path, 'w') as out:
+        out.write('\t'.join(header) + '\n')
+        for nRetained, peakWidth, characteristicsPath in runs:
+            found = {}
+            if os.path.exists(characteristicsPath):
+                with open(characteristicsPath, 'r') as f:
+                    found = dict(zip(f.readline().split(), f.readline().split()))
+            row = [str(nRetained), '{0:g}'.format(100.0 * nRetained / nSamples), 'default' if peakWidth is None else repr(peakWidth)]
+            out.write('\t'.join(row + [found.get(name, 'NA') for name in header[3:]]) + '\n')
+
+
+def writeCharacteristics(path, paramNames, values, weights, grids, densities):
+    header, row = ['Obs'], ['0']
+    for j, name in enumerate(paramNames):
+        x, w = values[:, j], weights / weights.sum()
+        header += [name + '_mode', name + '_mean', name + '_median']
+        row += [grids[j][numpy.argmax(densities[j])], w.dot(x), weightedQuantiles(x, w, [0.5])[0]]
+        for level in QUANTILE_LEVELS:
+            tail = (1 - level / 100.0) / 2
+            header += ['{0}_q{1}_lower'.format(name, level), '{0}_q{1}_upper'.format(name, level)]
+            row += list(weightedQuantiles(x, w, [tail, 1 - tail]))
+        for level in QUANTILE_LEVELS:
+            header += ['{0}_HDI{1}_lower'.format(name, level), '{0}_HDI{1}_upper'.format(name, level)]
+            row += list(highestDensityInterval(grids[j], densities[j], level))
+    with open(path, 'w') as out:
+        out.write('\t'.join(header) + '\n')
+        out.write('\t'.join([row[0]] + [repr(float(x)) for x in row[1:]]) + '\n')
+
+
+if __name__ == '__main__':
+    main()
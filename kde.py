@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+#
+#  @file  kde.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# Weighted Gaussian kernel density estimates on regular grids. density()
+# and density2d() bin the samples linearly onto a grid that is fine
+# compared to the bandwidth and convolve the bins with the kernel by FFT,
+# so the cost grows with the number of samples plus the number of bins
+# instead of their product. directDensity() evaluates the sum over all
+# samples and is what maxError() checks the binned estimates against.
+#**********************************************************************#
+from __future__ import print_function
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BINS_PER_BANDWIDTH = 8
+MAX_BINS = 2 ** 16
+MAX_BINS_2D = 2 ** 10
+KERNEL_REACH = 6        #kernel truncated at this many bandwidths
+CHECK_POINTS = 16
+
+
+#**********************************************************************#
+def density(values, weights, grid, bandwidth):
+    #density of the weighted values at the points of the regular grid
+    weights = numpy.asarray(weights, dtype=float) / numpy.sum(weights)
+    lower, upper, nBins = fineAxis(grid, bandwidth, MAX_BINS)
+    bins = linearBins([values], weights, [(lower, upper, nBins)])
+    fine = convolve(bins, [kernel(bandwidth, (upper - lower) / (nBins - 1), nBins)])
+    return numpy.interp(grid, numpy.linspace(lower, upper, nBins), fine)
+
+
+def density2d(x, y, weights, gridX, gridY, bandwidthX, bandwidthY):
+    #density of the weighted points (x, y) on the grid gridX x gridY, indexed [i, j] for (gridX[i], gridY[j])
+    weights = numpy.asarray(weights, dtype=float) / numpy.sum(weights)
+    axes = [fineAxis(gridX, bandwidthX, MAX_BINS_2D), fineAxis(gridY, bandwidthY, MAX_BINS_2D)]
+    bins = linearBins([x, y], weights, axes)
+    kernels = [kernel(bw, (upper - lower) / (n - 1), n) for bw, (lower, upper, n) in zip((bandwidthX, bandwidthY), axes)]
+    fine = convolve(bins, kernels)
+    #bilinear interpolation onto the requested grid
+    fineX, fineY = [numpy.linspace(lower, upper, n) for lower, upper, n in axes]
+    alongY = numpy.array([numpy.interp(gridY, fineY, row) for row in fine])
+    return numpy.array([numpy.interp(gridX, fineX, column) for column in alongY.T]).T
+
+
+def directDensity(values, weights, points, bandwidth):
+    weights = numpy.asarray(weights, dtype=float) / numpy.sum(weights)
+    result = numpy.zeros(len(points))
+    step = max(1, 2 ** 22 // max(1, len(points)))
+    for start in range(0, len(values), step):
+        z = (points[:, None] - values[None, start:start + step]) / bandwidth
+        result += numpy.exp(-0.5 * z * z).dot(weights[start:start + step])
+    return result / (bandwidth * math.sqrt(2 * math.pi))
+
+
+def maxError(values, weights, grid, estimate, bandwidth, rng=None):
+    #largest difference to the direct sum at CHECK_POINTS grid points, relative to the peak of the estimate
+    rng = rng or numpy.random.RandomState(0)
+    points = numpy.unique(numpy.concatenate([[numpy.argmax(estimate)], rng.randint(0, len(grid), CHECK_POINTS)]))
+    direct = directDensity(values, weights, grid[points], bandwidth)
+    return numpy.abs(direct - estimate[points]).max() / max(estimate.max(), 1e-300)
+
+
+#**********************************************************************#
+def fineAxis(grid, bandwidth, maxBins):
+    #covers the grid and the reach of the kernel around it with bins well below the bandwidth
+    lower = grid[0] - KERNEL_REACH * bandwidth
+    upper = grid[-1] + KERNEL_REACH * bandwidth
+    nBins = int(min(maxBins, max(len(grid), math.ceil((upper - lower) / bandwidth * BINS_PER_BANDWIDTH)))) + 1
+    return lower, upper, nBins
+
+
+def linearBins(coordinates, weights, axes):
+    #splits the weight of every point between the corners of its bin
+    bins = numpy.zeros([n for lower, upper, n in axes])
+    positions, fractions = [], []
+    keep = numpy.ones(len(weights), dtype=bool)
+    for values, (lower, upper, n) in zip(coordinates, axes):
+        scaled = (numpy.asarray(values, dtype=float) - lower) / (upper - lower) * (n - 1)
+        keep &= (scaled >= 0) & (scaled <= n - 1)
+        position = numpy.clip(numpy.floor(scaled).astype(int), 0, n - 2)
+        positions.append(position)
+        fractions.append(scaled - position)
+    positions = [p[keep] for p in positions]
+    fractions = [f[keep] for f in fractions]
+    weights = weights[keep]
+    for corner in range(2 ** len(axes)):
+        index, share = [], weights.copy()
+        for axis in range(len(axes)):
+            upperCorner = (corner >> axis) & 1
+            index.append(positions[axis] + upperCorner)
+            share = share * (fractions[axis] if upperCorner else 1 - fractions[axis])
+        numpy.add.at(bins, tuple(index), share)
+    return bins
+
+
+def kernel(bandwidth, step, nBins):
+    reach = min(nBins - 1, int(math.ceil(KERNEL_REACH * bandwidth / step)))
+    z = numpy.arange(-reach, reach + 1) * step / bandwidth
+    return numpy.exp(-0.5 * z * z) / (bandwidth * math.sqrt(2 * math.pi))
+
+
+def convolve(bins, kernels):
+    #linear (not circular) convolution of the bins with the separable kernel
+    shape = [n + len(k) - 1 for n, k in zip(bins.shape, kernels)]
+    size = [int(2 ** math.ceil(math.log(s, 2))) for s in shape]
+    transformed = numpy.fft.rfftn(bins, size)
+    for axis, k in enumerate(kernels):
+        #rfftn only halves the last axis
+        if axis == bins.ndim - 1:
+            factor = numpy.fft.rfft(k, size[axis])
+        else:
+            factor = numpy.fft.fft(k, size[axis])
+        shape = [1] * bins.ndim
+        shape[axis] = len(factor)
+        transformed = transformed * factor.reshape(shape)
+    full = numpy.fft.irfftn(transformed, size)
+    reaches = [(len(k) - 1) // 2 for k in kernels]
+    return full[tuple(slice(r, r + n) for r, n in zip(reaches, bins.shape))]
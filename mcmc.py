@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+#
+#  @file  mcmc.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+#/////////////////////////////////////////////////////////////////////////////
+
+#**********************************************************************#
+# ABC-MCMC (Marjoram et al. 2003) with one chain per core. The chains start
+# from the best simulations of a pilot samples.txt, whose distances also
+# set the tolerance, and move with a Gaussian random walk on the internal
+# scale of the priors (see priors.Prior.toInternal). During burn-in every
+# chain adapts its proposal covariance to its own history (Haario et al.
+# 2001); afterwards the proposal is fixed so that the chain targets the ABC
+# posterior. A proposal is only simulated if it passes the prior part of
+# the Metropolis-Hastings test.
+#
+# The chains run on the simulation workers of sampler.py.
+#**********************************************************************#
+from __future__ import print_function
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import sim
+import smc
+import sampler
+import samplestore
+
+ADAPT_SCALE = 2.38 ** 2     #Gelman et al. scaling of the proposal covariance
+DEFAULT_ADAPT_EVERY = 50    #burn-in steps between proposal updates
+
+
+#**********************************************************************#
+def run(priorList, pool, pilotPath, nSteps, nChains, tolerance=None, quantile=5,
+        burnIn=None, adaptEvery=DEFAULT_ADAPT_EVERY, seed=None):
+    if numpy is None:
+        raise Exception('The MCMC sampler requires numpy.')
+    free = [i for i, prior in enumerate(priorList) if prior.dist != 'fixed']
+    if not free:
+        raise Exception('The MCMC sampler needs at least one parameter that is not fixed.')
+    pilotValues, pilotDistances = readPilot(pilotPath, priorList)
+    if tolerance is None:
+        tolerance = float(numpy.percentile(pilotDistances, quantile))
+    if burnIn is None:
+        burnIn = nSteps // 5
+
+    #start from distinct pilot simulations within the tolerance, best first
+    order = numpy.argsort(pilotDistances, kind='mergesort')
+    close = order[pilotDistances[order] <= tolerance]
+    if len(close) < max(nChains, len(free) + 1):
+        close = order[:max(nChains, len(free) + 1)]
+    internal = smc.toInternal(priorList, pilotValues)
+    cov = proposalCovariance(internal[close][:, free])
+
+    rng = numpy.random.RandomState(seed)
+    starts = rng.choice(close, size=nChains, replace=len(close) < nChains)
+    print('ABC-MCMC: {0} chains of {1} steps, tolerance {2:.6g}, burn-in {3} steps.'.format(nChains, nSteps, tolerance, burnIn))
+    tasks = [(chain, priorList, pilotValues[start], pilotDistances[start], cov, tolerance, nSteps, burnIn,
+              adaptEvery, rng.randint(2 ** 31 - 1)) for chain, start in enumerate(starts)]
+    chains = list(sampler.checkedResults(pool, pool.imap(runChain, tasks, chunksize=1)))
+    return chains, tolerance, burnIn
+
+
+def readPilot(pilotPath, priorList):
+    store = samplestore.openStore(pilotPath)
+    if store is not None and all(name in store for name in [prior.name for prior in priorList] + ['myDist']):
+        if store.rows == 0:
+            raise Exception('The pilot samples ' + pilotPath + ' are empty.')
+        values = numpy.column_stack([store.column(prior.name) for prior in priorList]).tolist()
+        return values, numpy.array(store.column('myDist'))
+    with open(pilotPath, 'r') as f:
+        header = f.readline().split()
+        try:
+            columns = [header.index(prior.name) for prior in priorList]
+            distColumn = header.index('myDist')
+        except ValueError:
+            raise Exception('The pilot samples ' + pilotPath + ' do not have a column for every parameter and myDist.')
+        values, distances = [], []
+        for line in f:
+            fields = line.split()
+            if not fields: continue
+            values.append([float(fields[i]) for i in columns])
+            distances.append(float(fields[distColumn]))
+    if not values:
+        raise Exception('The pilot samples ' + pilotPath + ' are empty.')
+    return values, numpy.array(distances)
+
+
+def proposalCovariance(x):
+    cov = ADAPT_SCALE / x.shape[1] * numpy.atleast_2d(numpy.cov(x, rowvar=False))
+    return cov + numpy.eye(x.shape[1]) * (1e-12 + 1e-9 * numpy.trace(cov) / x.shape[1])
+
+
+#**********************************************************************#
+def runChain(task):
+    chain, priorList, values, distance, cov, tolerance, nSteps, burnIn, adaptEvery, seed = task
+    rng = numpy.random.RandomState(seed)
+    free = [i for i, prior in enumerate(priorList) if prior.dist != 'fixed']
+    u = smc.toInternal(priorList, [values])[0]
+    density = smc.internalPriorDensity(priorList, u[None, :])[0]
+    chol = numpy.linalg.cholesky(cov)
+
+    states = numpy.empty((nSteps, len(priorList)))
+    distances = numpy.empty(nSteps)
+    nAccepted = 0
+    nSims = 0
+    for step in range(nSteps):
+        if step < burnIn and step >= adaptEvery and step % adaptEvery == 0:
+            chol = numpy.linalg.cholesky(proposalCovariance(states[:step, free]))
+        proposal = u.copy()
+        proposal[free] += chol.dot(rng.standard_normal(len(free)))
+        proposalDensity = smc.internalPriorDensity(priorList, proposal[None, :])[0]
+        if proposalDensity > 0 and rng.uniform() * density < proposalDensity:
+            proposalValues = smc.fromInternal(priorList, proposal[None, :])[0]
+            proposalDistance = sim.simulate([(prior.name, prior.format(v)) for prior, v in zip(priorList, proposalValues)])
+            nSims += 1
+            if proposalDistance <= tolerance:
+                u, density, values, distance = proposal, proposalDensity, proposalValues, proposalDistance
+                if step >= burnIn: nAccepted += 1
+        states[step] = u
+        distances[step] = distance
+    return {'chain': chain, 'states': states, 'distances': distances, 'nSims': nSims,
+            'acceptance': float(nAccepted) / max(nSteps - burnIn, 1)}
+
+
+#**********************************************************************#
+def splitRhat(samples):
+    #samples: chains x steps for one parameter; every chain is split in two
+    half = samples.shape[1] // 2
+    if half < 2: return float('nan')
+    parts = numpy.vstack([samples[:, :half], samples[:, half:2 * half]])
+    n = parts.shape[1]
+    within = parts.var(axis=1, ddof=1).mean()
+    between = n * parts.mean(axis=1).var(ddof=1)
+    if within == 0: return float('nan')
+    return math.sqrt(((n - 1.0) / n * within + between / n) / within)
+
+
+def effectiveSampleSize(samples):
+    #sum over chains, autocorrelations are cut at the first negative pair (Geyer)
+    total = 0.0
+    for x in samples:
+        n = len(x)
+        x = x - x.mean()
+        if n < 4 or not numpy.any(x): continue
+        spectrum = numpy.fft.rfft(x, 2 * n)
+        acf = numpy.fft.irfft(spectrum * numpy.conjugate(spectrum))[:n]
+        acf /= acf[0]
+        tau = -1.0
+        for k in range(0, n - 1, 2):
+            pair = acf[k] + acf[k + 1]
+            if pair < 0: break
+            tau += 2 * pair
+        total += n / max(tau, 1.0)
+    return total
+
+
+def diagnostics(priorList, chains, burnIn):
+    rows = []
+    for i, prior in enumerate(priorList):
+        if prior.dist == 'fixed': continue
+        samples = numpy.array([c['states'][burnIn:, i] for c in chains])
+        rows.append((prior.name, splitRhat(samples), effectiveSampleSize(samples)))
+    return rows
+
+
+#**********************************************************************#
+def writeSamples(path, priorList, chains, burnIn):
+    #the post burn-in states of all chains as plain rows for ABCestimator
+    with open(path, 'w') as f:
+        f.write('\t'.join(['Sim'] + [prior.name for prior in priorList] + ['myDist']) + '\n')
+        row = 0
+        for chain in chains:
+            for step in range(burnIn, len(chain['states'])):
+                row += 1
+                values = smc.fromInternal(priorList, chain['states'][step][None, :])[0]
+                f.write('\t'.join([str(row)] + [prior.format(v) for prior, v in zip(priorList, values)] +
+                                  ['%.10f' % chain['distances'][step]]) + '\n')
+
+
+def writeChains(path, priorList, chains):
+    with open(path, 'w') as f:
+        f.write('\t'.join(['Chain', 'Step'] + [prior.name for prior in priorList] + ['myDist']) + '\n')
+        for chain in chains:
+            for step in range(len(chain['states'])):
+                values = smc.fromInternal(priorList, chain['states'][step][None, :])[0]
+                f.write('\t'.join([str(chain['chain']), str(step)] + [prior.format(v) for prior, v in zip(priorList, values)] +
+                                  ['%.10f' % chain['distances'][step]]) + '\n')
+
+
+def writeDiagnostics(path, priorList, chains, tolerance, burnIn):
+    lines = ['tolerance\t%.10g' % tolerance, 'burnIn\t%d' % burnIn,
+             'simulations\t%d' % sum(c['nSims'] for c in chains)]
+    lines += ['acceptance_chain%d\t%.4f' % (c['chain'], c['acceptance']) for c in chains]
+    lines += ['', 'param\tsplitRhat\tESS']
+    lines += ['%s\t%.4f\t%.1f' % row for row in diagnostics(priorList, chains, burnIn)]
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    print('\n'.join(lines))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#
+#  @file  obscache.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+#/////////////////////////////////////////////////////////////////////////////
+
+#**********************************************************************#
+# Binary cache of the parsed observed data. run.py writes <quest>Data.bin
+# next to <quest>Data.txt once per run, and sim.py loads it with a single
+# read instead of parsing the text file for every simulation. The cache
+# stores the sha1 of the text file it was made from and is ignored as soon
+# as the text file no longer matches.
+#
+# Layout: a magic line, a JSON header line and then little endian doubles,
+# first every column of the data and then the max(obs, 1) denominators of
+# every column but Time, in the order given in the header.
+#**********************************************************************#
+from __future__ import print_function
+import sys
+import json
+import hashlib
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b'EVXOBS1\n'
+
+
+def cachePath(dataPath):
+    return dataPath[:-len('.txt')] + '.bin' if dataPath.endswith('.txt') else dataPath + '.bin'
+
+
+def hashFile(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def denominator(column):
+    return [max(x, 1) for x in column]
+
+
+def writeCache(dataPath, data, path=None):
+    path = path or cachePath(dataPath)
+    columns = sorted(data)
+    rows = len(data['Time'])
+    header = {'sha1': hashFile(dataPath), 'columns': columns, 'rows': rows}
+    values = array('d')
+    for key in columns:
+        values.extend(data[key])
+    for key in columns:
+        if key != 'Time': values.extend(denominator(data[key]))
+    if sys.byteorder == 'big': values.byteswap()
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write((json.dumps(header) + '\n').encode())
+        f.write(values.tobytes())
+    return path
+
+
+#returns (data, denominators), or None if there is no valid cache
+def loadCache(dataPath, path=None):
+    path = path or cachePath(dataPath)
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+    except IOError:
+        return None
+    if not raw.startswith(MAGIC): return None
+    #a file cut short inside its header is invalid like any other
+    headerEnd = raw.find(b'\n', len(MAGIC)) + 1
+    if headerEnd == 0: return None
+    try:
+        header = json.loads(raw[len(MAGIC):headerEnd].decode())
+    except ValueError:
+        return None
+    if header['sha1'] != hashFile(dataPath): return None
+    if (len(raw) - headerEnd) % 8: return None
+
+    columns = header['columns']
+    rows = header['rows']
+    if numpy is not None:
+        values = numpy.frombuffer(raw, dtype='<f8', offset=headerEnd)
+    else:
+        values = array('d')
+        values.frombytes(raw[headerEnd:])
+        if sys.byteorder == 'big': values.byteswap()
+    if len(values) != rows * (2 * len(columns) - 1): return None
+
+    data = {}
+    for i, key in enumerate(columns):
+        data[key] = values[i * rows:(i + 1) * rows]
+    denominators = {}
+    offset = len(columns) * rows
+    for key in columns:
+        if key == 'Time': continue
+        denominators[key] = values[offset:offset + rows]
+        offset += rows
+    return data, denominators
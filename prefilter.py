@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+#
+#  @file  prefilter.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# Writes the k rows of samples.txt with the smallest distance to a
+# candidates file, so that ABCestimator only has to read the rows it is
+# going to retain. Memory use is bounded by k distances plus one chunk of
+# the file, whatever the size of samples.txt.
+#
+# samples.txt is split into byte ranges that are processed in parallel.
+# The first pass keeps the k smallest distances of every range and merges
+# them into the global k-th smallest distance. The second pass writes the
+# rows below it and, in file order, as many rows equal to it as are needed
+# to make up k rows. The candidates are the rows below the threshold in the
+# order of samples.txt, followed by the ties.
+#**********************************************************************#
+from __future__ import print_function
+import io
+import os
+import heapq
+import shutil
+import multiprocessing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CHUNK_SIZE = 16 * 1024 * 1024
+MIN_RANGE_SIZE = 64 * 1024 * 1024
+
+
+#**********************************************************************#
+def selectClosest(samFile, outPath, k, column='myDist', jobs=1):
+    #returns the distance of the k-th closest row
+    with open(samFile, 'rb') as f:
+        header = f.readline()
+    columns = header.decode().split()
+    if column not in columns:
+        raise Exception('The samples {0} have no column {1}.'.format(samFile, column))
+    index = columns.index(column)
+    ranges = splitRanges(samFile, len(header), jobs)
+    tasks = [(samFile, start, stop, index, k) for start, stop in ranges]
+
+    pool = multiprocessing.Pool(min(jobs, len(tasks))) if jobs > 1 and len(tasks) > 1 else None
+    mapper = pool.map if pool is not None else map
+    try:
+        smallest = mergeSmallest(list(mapper(smallestInRange, tasks)), k)
+        if not smallest:
+            raise Exception('There are no samples in ' + samFile)
+        threshold = smallest[-1]
+        nTies = k - sum(1 for d in smallest if d < threshold)
+
+        partsDir = outPath + '.parts'
+        if not os.path.isdir(partsDir): os.mkdir(partsDir)
+        tasks = [(samFile, start, stop, index, threshold, nTies, os.path.join(partsDir, str(i)))
+                 for i, (start, stop) in enumerate(ranges)]
+        parts = list(mapper(writeRange, tasks))
+        if pool is not None: pool.close()
+    except:
+        if pool is not None: pool.terminate()
+        raise
+    finally:
+        if pool is not None: pool.join()
+
+    #all rows below the threshold, then the first of the ties
+    with open(outPath, 'wb') as out:
+        out.write(header)
+        for belowPath, tiesPath in parts:
+            with open(belowPath, 'rb') as f: shutil.copyfileobj(f, out, CHUNK_SIZE)
+        for belowPath, tiesPath in parts:
+            with open(tiesPath, 'rb') as f:
+                for line in f:
+                    if nTies == 0: break
+                    out.write(line)
+                    nTies -= 1
+    shutil.rmtree(partsDir)
+    return threshold
+
+
+def splitRanges(samFile, start, jobs):
+    #byte ranges of at least MIN_RANGE_SIZE, a range owns the rows that start in it
+    size = os.path.getsize(samFile)
+    nRanges = max(1, min(jobs, (size - start) // MIN_RANGE_SIZE))
+    bounds = [start + (size - start) * i // nRanges for i in range(nRanges + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def mergeSmallest(lists, k):
+    if numpy is not None:
+        merged = numpy.concatenate([numpy.asarray(d, dtype=float) for d in lists])
+        if len(merged) > k: merged = numpy.partition(merged, k - 1)[:k]
+        return numpy.sort(merged).tolist()
+    return heapq.nsmallest(k, (d for distances in lists for d in distances))
+
+
+#**********************************************************************#
+def readChunks(samFile, start, stop):
+    #newline terminated chunks holding the rows that start in [start, stop)
+    with open(samFile, 'rb') as f:
+        if start > 0:
+            #the row running over start belongs to the previous range
+            f.seek(start - 1)
+            if f.read(1) != b'\n': f.readline()
+        while True:
+            position = f.tell()
+            if position >= stop: break
+            chunk = f.read(min(CHUNK_SIZE, stop - position))
+            if not chunk: break
+            if f.tell() >= stop:
+                #finish the row that runs over stop
+                if not chunk.endswith(b'\n'): chunk += f.readline()
+                yield chunk
+                break
+            end = chunk.rfind(b'\n') + 1
+            if end == 0:
+                #a row longer than a chunk
+                yield chunk + f.readline()
+                continue
+            f.seek(position + end)
+            yield chunk[:end]
+
+
+def chunkDistances(chunk, index):
+    if numpy is not None:
+        distances = numpy.loadtxt(io.BytesIO(chunk), dtype=float, usecols=(index,), ndmin=1)
+    else:
+        distances = [float(line.split()[index]) for line in chunk.splitlines()]
+    if len(distances) != chunk.count(b'\n'):
+        raise Exception('The samples contain empty or malformed rows.')
+    return distances
+
+
+def smallestInRange(task):
+    samFile, start, stop, index, k = task
+    if numpy is None:
+        return heapq.nsmallest(k, (d for chunk in readChunks(samFile, start, stop) for d in chunkDistances(chunk, index)))
+    smallest = numpy.zeros(0)
+    for chunk in readChunks(samFile, start, stop):
+        smallest = numpy.concatenate([smallest, chunkDistances(chunk, index)])
+        #partitioning only once the buffer has grown keeps the cost per row constant
+        if len(smallest) > 2 * k: smallest = numpy.partition(smallest, k - 1)[:k]
+    if len(smallest) > k: smallest = numpy.partition(smallest, k - 1)[:k]
+    return smallest
+
+
+def writeRange(task):
+    #writes the rows below the threshold and the first nTies rows equal to it
+    samFile, start, stop, index, threshold, nTies, partPath = task
+    belowPath, tiesPath = partPath + '.below', partPath + '.ties'
+    with open(belowPath, 'wb') as below:
+        with open(tiesPath, 'wb') as ties:
+            for chunk in readChunks(samFile, start, stop):
+                distances = chunkDistances(chunk, index)
+                if numpy is not None and not (distances <= threshold).any(): continue
+                lines = chunk.splitlines(True)
+                if numpy is not None:
+                    below.write(b''.join([lines[i] for i in numpy.flatnonzero(distances < threshold)]))
+                    for i in numpy.flatnonzero(distances == threshold)[:nTies]:
+                        ties.write(lines[i])
+                        nTies -= 1
+                    continue
+                for line, d in zip(lines, distances):
+                    if d < threshold:
+                        below.write(line)
+                    elif d == threshold and nTies > 0:
+                        ties.write(line)
+                        nTies -= 1
+    return belowPath, tiesPath
@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+#
+#  @file  priors.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+#/////////////////////////////////////////////////////////////////////////////
+
+#**********************************************************************#
+# Reads an ABCtoolbox <quest>Priors.est file and draws parameter values
+# from it, so that run.py can sample without ABCsampler. Lines of the
+# [PARAMETERS] section look like
+#
+#     //#isInt? #name   #dist.  #min    #max
+#     0       birthRate logunif 0.001   1
+#
+# norm and lognorm priors take the mean and standard deviation (of the log
+# for lognorm) after min and max and are truncated to [min, max].
+#
+# The optional [RULES] section holds comparisons that every draw has to
+# satisfy, e.g. "deathRate < birthRate", and the optional
+# [COMPLEX PARAMETERS] section holds parameters computed from the others,
+# e.g. "0 netRate = birthRate - deathRate". Expressions may use + - * / ^,
+# parentheses, numbers, parameter names and the functions in EXPRESSION_FUNCS.
+#
+# PriorSampler draws whole batches at once with numpy, from pseudo-random
+# numbers, a Latin hypercube or a scrambled Sobol or Halton sequence
+# (see SAMPLING_MODES).
+#**********************************************************************#
+from __future__ import print_function
+import ast
+import math
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DISTRIBUTIONS = ['unif', 'logunif', 'norm', 'lognorm', 'fixed']
+SAMPLING_MODES = ['random', 'lhs', 'sobol', 'halton']
+
+
+class Prior(object):
+
+    def __init__(self, name, isInt, dist, lower, upper, args=None):
+        if dist not in DISTRIBUTIONS:
+            raise Exception('Unknown prior distribution {0} for parameter {1}.'.format(dist, name))
+        if lower > upper:
+            raise Exception('The minimum of parameter {0} is larger than its maximum.'.format(name))
+        if dist in ('logunif', 'lognorm') and lower <= 0:
+            raise Exception('The minimum of the {0} parameter {1} must be positive.'.format(dist, name))
+        self.name = name
+        self.isInt = isInt
+        self.dist = dist
+        self.min = lower
+        self.max = upper
+        self.args = args or []
+
+    def draw(self, rng=random):
+        if self.dist == 'unif':      value = rng.uniform(self.min, self.max)
+        elif self.dist == 'logunif': value = math.exp(rng.uniform(math.log(self.min), math.log(self.max)))
+        elif self.dist == 'fixed':   value = self.min
+        else:
+            mean, sd = self.args[0], self.args[1]
+            while True:
+                value = rng.gauss(mean, sd)
+                if self.dist == 'lognorm': value = math.exp(value)
+                if self.min <= value <= self.max: break
+        if self.isInt: value = int(round(value))
+        return value
+
+    #samplers that perturb parameter values (smc.py) work on the internal
+    #scale, which is the log of the value for logunif and lognorm priors
+    def isLogScale(self):
+        return self.dist in ('logunif', 'lognorm')
+
+    def toInternal(self, value):
+        return math.log(value) if self.isLogScale() else value
+
+    def fromInternal(self, u):
+        value = math.exp(u) if self.isLogScale() else u
+        if self.isInt: value = int(round(value))
+        return value
+
+    def internalDensity(self, u):
+        if self.dist == 'fixed': return 1.0
+        lower, upper = self.toInternal(self.min), self.toInternal(self.max)
+        if not lower <= u <= upper: return 0.0
+        if upper == lower: return 1.0
+        if self.dist in ('unif', 'logunif'): return 1.0 / (upper - lower)
+        mean, sd = self.args[0], self.args[1]
+        mass = normalCdf(upper, mean, sd) - normalCdf(lower, mean, sd)
+        return math.exp(-0.5 * ((u - mean) / sd) ** 2) / (sd * math.sqrt(2 * math.pi)) / mass
+
+    def format(self, value):
+        if self.isInt: return str(int(round(value)))
+        return repr(float(value))
+
+    #maps a numpy array of points in (0, 1) to values by the inverse cdf
+    def fromUnit(self, u):
+        if self.dist == 'fixed': values = numpy.full(len(u), self.min)
+        elif self.dist == 'unif': values = self.min + u * (self.max - self.min)
+        elif self.dist == 'logunif':
+            lower, upper = math.log(self.min), math.log(self.max)
+            values = numpy.exp(lower + u * (upper - lower))
+        else:
+            mean, sd = self.args[0], self.args[1]
+            lower, upper = self.toInternal(self.min), self.toInternal(self.max)
+            cdfLower, cdfUpper = normalCdf(lower, mean, sd), normalCdf(upper, mean, sd)
+            values = mean + sd * normalQuantile(cdfLower + u * (cdfUpper - cdfLower))
+            #the quantile is only accurate to about 1e-9, so keep the truncation exact
+            values = numpy.clip(values, lower, upper)
+            if self.dist == 'lognorm': values = numpy.exp(values)
+        if self.isInt: values = numpy.round(values)
+        return values
+
+    #density of a numpy array of values, 0 outside [min, max]; integer priors are treated as continuous
+    def densities(self, values):
+        values = numpy.asarray(values, dtype=float)
+        if self.dist == 'fixed': return (values == self.min).astype(float)
+        inside = (values >= self.min) & (values <= self.max)
+        values = numpy.where(inside, values, self.min)
+        lower, upper = self.toInternal(self.min), self.toInternal(self.max)
+        u = numpy.log(values) if self.isLogScale() else values
+        if upper == lower: density = numpy.ones(len(values))
+        elif self.dist in ('unif', 'logunif'): density = numpy.full(len(values), 1.0 / (upper - lower))
+        else:
+            mean, sd = self.args[0], self.args[1]
+            mass = normalCdf(upper, mean, sd) - normalCdf(lower, mean, sd)
+            density = numpy.exp(-0.5 * ((u - mean) / sd) ** 2) / (sd * math.sqrt(2 * math.pi)) / mass
+        if self.isLogScale(): density = density / values
+        return numpy.where(inside, density, 0.0)
+
+
+class ComplexParameter(object):
+
+    def __init__(self, name, isInt, expression):
+        self.name = name
+        self.isInt = isInt
+        self.expression = expression
+        self.code = parseExpression(expression)
+
+    def evaluate(self, values):
+        result = evaluateExpression(self.code, values)
+        if self.isInt: result = numpy.round(result) if numpy is not None and isinstance(result, numpy.ndarray) else round(result)
+        return result
+
+    def format(self, value):
+        if self.isInt: return str(int(round(value)))
+        return repr(float(value))
+
+
+class Rule(object):
+
+    def __init__(self, text):
+        self.text = text
+        self.code = parseExpression(text)
+        if not isinstance(self.code, ast.Compare):
+            raise Exception('The rule {0} is not a comparison.'.format(text))
+
+    def holds(self, values):
+        return evaluateExpression(self.code, values)
+
+
+#**********************************************************************#
+def readPriors(path):
+    return readPriorFile(path)[0]
+
+
+def readPriorFile(path):
+    #returns the priors, the rules and the complex parameters of the file
+    priors, rules, complexParams = [], [], []
+    section = None
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.split('//')[0].strip()
+            if not line: continue
+            if line.startswith('['):
+                section = ' '.join(line.upper().split())
+                continue
+            if section == '[PARAMETERS]': priors.append(parsePriorLine(line))
+            elif section == '[RULES]': rules.append(Rule(line))
+            elif section == '[COMPLEX PARAMETERS]': complexParams.append(parseComplexLine(line))
+    if not priors:
+        raise Exception('No parameters found in the priors file ' + path)
+    names = [prior.name for prior in priors] + [param.name for param in complexParams]
+    if len(set(names)) != len(names):
+        raise Exception('Parameter names are not unique in the priors file ' + path)
+    return priors, rules, complexParams
+
+
+def parsePriorLine(line):
+    fields = line.split()
+    if len(fields) < 5:
+        raise Exception('Cannot parse the prior: ' + line)
+    #a trailing output/hide keyword only matters to ABCsampler's output
+    numbers = [float(x) for x in fields[5:] if x not in ('output', 'hide')]
+    return Prior(fields[1], fields[0] == '1', fields[2], float(fields[3]), float(fields[4]), numbers)
+
+
+def parseComplexLine(line):
+    head, sep, expression = line.partition('=')
+    fields = head.split()
+    if not sep or len(fields) != 2:
+        raise Exception('Cannot parse the complex parameter: ' + line)
+    expression = expression.split()
+    if expression and expression[-1] in ('output', 'hide'): expression = expression[:-1]
+    return ComplexParameter(fields[1], fields[0] == '1', ' '.join(expression))
+
+
+#**********************************************************************#
+EXPRESSION_FUNCS = ['exp', 'log', 'log10', 'sqrt', 'abs', 'floor', 'ceil', 'min', 'max', 'pow']
+BINARY_OPS = {ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b, ast.Mult: lambda a, b: a * b,
+              ast.Div: lambda a, b: a / b, ast.Pow: lambda a, b: a ** b}
+COMPARE_OPS = {ast.Lt: lambda a, b: a < b, ast.LtE: lambda a, b: a <= b,
+               ast.Gt: lambda a, b: a > b, ast.GtE: lambda a, b: a >= b}
+
+
+def parseExpression(text):
+    try:
+        code = ast.parse(text.replace('^', '**'), mode='eval').body
+    except SyntaxError:
+        raise Exception('Cannot parse the expression: ' + text)
+    for node in ast.walk(code):
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in EXPRESSION_FUNCS or node.keywords:
+                raise Exception('Unknown function in the expression: ' + text)
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in BINARY_OPS: raise Exception('Unknown operator in the expression: ' + text)
+        elif isinstance(node, ast.Compare):
+            if any(type(op) not in COMPARE_OPS for op in node.ops): raise Exception('Unknown comparison in the expression: ' + text)
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)) or isinstance(node.value, bool):
+                raise Exception('Cannot evaluate the expression: ' + text)
+        elif not isinstance(node, (ast.Expression, ast.Name, ast.Load, ast.UnaryOp, ast.USub, ast.UAdd,
+                                   ast.operator, ast.cmpop)):
+            raise Exception('Cannot evaluate the expression: ' + text)
+    return code
+
+
+def expressionFunc(name, vectorized):
+    if not vectorized:
+        return {'abs': abs, 'min': min, 'max': max, 'pow': pow}.get(name) or getattr(math, name)
+    return {'min': numpy.minimum, 'max': numpy.maximum, 'pow': numpy.power}.get(name) or getattr(numpy, name)
+
+
+def evaluateExpression(node, values):
+    #values maps names to floats or to numpy arrays of equal length
+    vectorized = numpy is not None and any(isinstance(v, numpy.ndarray) for v in values.values())
+    return evaluateNode(node, values, vectorized)
+
+
+def evaluateNode(node, values, vectorized):
+    if isinstance(node, ast.Constant): return float(node.value)
+    if isinstance(node, ast.Name):
+        if node.id not in values: raise Exception('Unknown parameter in an expression: ' + node.id)
+        return values[node.id]
+    if isinstance(node, ast.UnaryOp):
+        operand = evaluateNode(node.operand, values, vectorized)
+        return -operand if isinstance(node.op, ast.USub) else operand
+    if isinstance(node, ast.BinOp):
+        return BINARY_OPS[type(node.op)](evaluateNode(node.left, values, vectorized), evaluateNode(node.right, values, vectorized))
+    if isinstance(node, ast.Call):
+        args = [evaluateNode(arg, values, vectorized) for arg in node.args]
+        return expressionFunc(node.func.id, vectorized)(*args)
+    #a chained comparison like "a < b < c" holds where all of its parts do
+    left, result = evaluateNode(node.left, values, vectorized), True
+    for op, comparator in zip(node.ops, node.comparators):
+        right = evaluateNode(comparator, values, vectorized)
+        result = result & COMPARE_OPS[type(op)](left, right)
+        left = right
+    return result
+
+
+#**********************************************************************#
+def normalCdf(x, mean, sd):
+    return 0.5 * (1 + math.erf((x - mean) / (sd * math.sqrt(2))))
+
+
+def normalQuantile(p):
+    #Acklam's rational approximation of the standard normal quantile, relative error below 1.2e-9
+    a = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02, 1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+    b = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02, 6.680131188771972e+01, -1.328068155288572e+01]
+    c = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00, -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+    d = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00]
+    p = numpy.clip(numpy.asarray(p, dtype=float), 1e-300, 1 - 1e-16)
+    x = numpy.empty_like(p)
+    tail = numpy.minimum(p, 1 - p)
+    central = tail >= 0.02425
+    q = p[central] - 0.5
+    r = q * q
+    x[central] = ((((((a[0]*r + a[1])*r + a[2])*r + a[3])*r + a[4])*r + a[5]) * q /
+                  (((((b[0]*r + b[1])*r + b[2])*r + b[3])*r + b[4])*r + 1))
+    q = numpy.sqrt(-2 * numpy.log(tail[~central]))
+    z = ((((((c[0]*q + c[1])*q + c[2])*q + c[3])*q + c[4])*q + c[5]) /
+         ((((d[0]*q + d[1])*q + d[2])*q + d[3])*q + 1))
+    x[~central] = numpy.where(p[~central] < 0.5, z, -z)
+    return x
+
+
+def drawParams(priors, rng=random):
+    return [prior.draw(rng) for prior in priors]
+
+
+#**********************************************************************#
+class PriorSampler(object):
+    """Draws batches of parameter values, one row per draw.
+
+    The columns are the priors followed by the complex parameters. Draws
+    that break a rule are replaced by further draws, so the rows of the
+    lhs, sobol and halton modes are only evenly spread over the region the
+    rules allow when they reject few draws. Each lhs batch is its own Latin
+    hypercube, so draw everything in one batch to stratify the whole run;
+    the sobol and halton sequences continue from batch to batch.
+    """
+
+    def __init__(self, priorList, rules=None, complexParams=None, mode='random', seed=None):
+        if numpy is None:
+            raise Exception('Drawing batches of parameters needs numpy.')
+        if mode not in SAMPLING_MODES:
+            raise Exception('Unknown sampling mode ' + mode)
+        self.priors = priorList
+        self.rules = rules or []
+        self.complexParams = complexParams or []
+        self.mode = mode
+        self.rng = numpy.random.RandomState(seed)
+        self.nDrawn = 0
+        dims = len(priorList)
+        if mode == 'sobol': self.directions = sobolDirections(dims)
+        #random digital shift (sobol) and rotation (halton) of the sequences
+        self.shift = self.rng.randint(0, 2 ** 32, size=dims).astype(numpy.uint64)
+        self.offset = self.rng.uniform(size=dims)
+
+    def names(self):
+        return [prior.name for prior in self.priors] + [param.name for param in self.complexParams]
+
+    def draw(self, n):
+        rows, nRows, tries = [], 0, 0
+        acceptance = 1.0
+        while nRows < n:
+            #draw enough for the acceptance rate of the rules so far
+            nDraws = int(math.ceil((n - nRows) / acceptance))
+            values = self.drawUnchecked(nDraws)
+            if self.rules:
+                named = dict(zip(self.names(), values.T))
+                keep = numpy.ones(len(values), dtype=bool)
+                for rule in self.rules: keep &= rule.holds(named)
+                values = values[keep]
+                tries = 0 if len(values) else tries + 1
+                if tries == 100:
+                    raise Exception('No draws from the priors satisfy the rules.')
+                acceptance = max(0.001, 0.9 * len(values) / float(nDraws))
+            rows.append(values[:n - nRows])
+            nRows += len(rows[-1])
+        return numpy.concatenate(rows) if len(rows) > 1 else rows[0]
+
+    def drawUnchecked(self, n):
+        unit = self.unitPoints(n)
+        values = numpy.empty((n, len(self.priors) + len(self.complexParams)))
+        named = {}
+        for i, prior in enumerate(self.priors):
+            values[:, i] = named[prior.name] = prior.fromUnit(unit[:, i])
+        for i, param in enumerate(self.complexParams, len(self.priors)):
+            values[:, i] = named[param.name] = param.evaluate(named)
+        return values
+
+    def unitPoints(self, n):
+        dims = len(self.priors)
+        start = self.nDrawn
+        self.nDrawn += n
+        if self.mode == 'random': return self.rng.uniform(size=(n, dims))
+        if self.mode == 'lhs':
+            strata = numpy.array([self.rng.permutation(n) for i in range(dims)]).T
+            return (strata + self.rng.uniform(size=(n, dims))) / n
+        if self.mode == 'sobol': return sobolPoints(self.directions, start, n, self.shift)
+        return (haltonPoints(start, n, dims) + self.offset) % 1.0
+
+
+#**********************************************************************#
+#primitive polynomials (degree s, coefficients a) and initial direction
+#numbers m of Sobol dimensions 2 to 21, from Joe and Kuo (2008)
+SOBOL_TABLE = [(1, 0, [1]), (2, 1, [1, 3]), (3, 1, [1, 3, 1]), (3, 2, [1, 1, 1]), (4, 1, [1, 1, 3, 3]),
+               (4, 4, [1, 3, 5, 13]), (5, 2, [1, 1, 5, 5, 17]), (5, 4, [1, 1, 5, 5, 5]), (5, 7, [1, 1, 7, 11, 19]),
+               (5, 11, [1, 1, 5, 1, 1]), (5, 13, [1, 1, 1, 3, 11]), (5, 14, [1, 3, 5, 5, 31]),
+               (6, 1, [1, 3, 3, 9, 7, 49]), (6, 13, [1, 1, 1, 15, 21, 21]), (6, 16, [1, 3, 1, 13, 27, 49]),
+               (6, 19, [1, 1, 1, 15, 7, 5]), (6, 22, [1, 3, 1, 15, 13, 25]), (6, 25, [1, 1, 5, 5, 19, 61]),
+               (7, 1, [1, 3, 7, 11, 23, 15, 103]), (7, 4, [1, 3, 7, 13, 13, 15, 69])]
+SOBOL_BITS = 32
+
+
+def sobolDirections(dims):
+    if dims > len(SOBOL_TABLE) + 1:
+        raise Exception('The sobol mode supports up to {0} parameters.'.format(len(SOBOL_TABLE) + 1))
+    directions = numpy.zeros((dims, SOBOL_BITS), dtype=numpy.uint64)
+    for k in range(SOBOL_BITS): directions[0, k] = 1 << (SOBOL_BITS - 1 - k)
+    for j in range(1, dims):
+        s, a, m = SOBOL_TABLE[j - 1]
+        v = [m[k] << (SOBOL_BITS - 1 - k) for k in range(s)]
+        for k in range(s, SOBOL_BITS):
+            value = v[k - s] ^ (v[k - s] >> s)
+            for l in range(1, s):
+                if (a >> (s - 1 - l)) & 1: value ^= v[k - l]
+            v.append(value)
+        directions[j] = v
+    return directions
+
+
+def sobolPoints(directions, start, n, shift):
+    #point i is the xor of the direction numbers of the bits set in the gray code of i
+    index = numpy.arange(start, start + n, dtype=numpy.uint64)
+    gray = index ^ (index >> numpy.uint64(1))
+    points = numpy.zeros((n, len(directions)), dtype=numpy.uint64)
+    for k in range(max(1, int(start + n - 1).bit_length())):
+        bit = (gray >> numpy.uint64(k)) & numpy.uint64(1)
+        points ^= bit[:, None] * directions[:, k]
+    points ^= shift
+    return (points.astype(float) + 0.5) / 2.0 ** SOBOL_BITS
+
+
+def haltonPoints(start, n, dims):
+    points = numpy.zeros((n, dims))
+    for j, base in enumerate(firstPrimes(dims)):
+        index = numpy.arange(start + 1, start + n + 1, dtype=numpy.int64)
+        scale = 1.0 / base
+        while index.any():
+            index, digit = numpy.divmod(index, base)
+            points[:, j] += digit * scale
+            scale /= base
+    return points
+
+
+def firstPrimes(n):
+    primes = []
+    candidate = 2
+    while len(primes) < n:
+        if all(candidate % p for p in primes): primes.append(candidate)
+        candidate += 1
+    return primes
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+#
+#  @file  rescore.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# Recomputes distances from the trajectory bank of a run (see trajbank.py
+# and run.py --trajectory-bank) instead of simulating again, for example
+# after changing a distance function or the observed data. The chunks of
+# the bank are scored in parallel and written as a samples file with the
+# columns of sim.py: Sim, the parameters, myDist (--distance) and
+# myDist_<name> for every one of --distances. Records with the same key
+# are only written once.
+#
+#     ./rescore.py sample/trajectories sample/birthData.txt --distance geometric -j 8 -o samples.txt
+#**********************************************************************#
+from __future__ import print_function
+import time
+import argparse
+import multiprocessing
+
+import dist
+import sim
+import obscache
+import trajbank
+
+WORKER_OBS = None
+WORKER_DENOMINATORS = None
+WORKER_DIST_NAMES = None
+
+
+#**********************************************************************#
+def main():
+    args = parseArgs()
+    start = time.time()
+    nRecords = rescore(args.bank, args.data, [args.distance] + sim.parseDistanceNames(args.distances), args.output, args.jobs)
+    print('Rescored {0} trajectories in {1:.1f} s, written to {2}'.format(nRecords, time.time() - start, args.output))
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Recompute distances from a trajectory bank.',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('bank', type=str, help='Directory of the trajectory bank')
+    parser.add_argument('data', type=str, help='Observed data, like <quest>Data.txt')
+    parser.add_argument('--distance', type=str, help='Distance of the myDist column. Options: ' \
+                        + (', ').join(dist.distFuncs.keys()), default='L2')
+    parser.add_argument('--distances', type=str, help='Comma separated distances, or all, to write as myDist_<name> columns as well.')
+    parser.add_argument('-j', '--jobs', type=int, help='Number of processes.', default=multiprocessing.cpu_count())
+    parser.add_argument('-o', '--output', type=str, help='Samples file to write.', default='rescored.txt')
+    return parser.parse_args()
+
+
+#**********************************************************************#
+def rescore(bankDir, dataPath, distNames, outPath, jobs=1):
+    #returns the number of trajectories written
+    for name in distNames:
+        if name not in dist.distFuncs: raise Exception('Invalid distance function name: {}'.format(name))
+    paths = trajbank.chunkPaths(bankDir)
+    if not paths: raise Exception('The trajectory bank {0} has no chunks.'.format(bankDir))
+    initArgs = (dataPath, distNames)
+    pool = multiprocessing.Pool(min(jobs, len(paths)), initWorker, initArgs) if jobs > 1 and len(paths) > 1 else None
+    if pool is None: initWorker(*initArgs)
+    try:
+        results = pool.imap(scoreChunk, paths) if pool else map(scoreChunk, paths)
+        nRecords = writeSamples(outPath, results, distNames)
+        if pool: pool.close()
+    except:
+        if pool: pool.terminate()
+        raise
+    finally:
+        if pool: pool.join()
+    return nRecords
+
+
+def writeSamples(outPath, results, distNames):
+    paramNames, seen = None, set()
+    with open(outPath, 'w') as out:
+        for rows in results:
+            for key, params, dists in rows:
+                if key in seen: continue
+                seen.add(key)
+                if paramNames is None:
+                    paramNames = [name for name, value in params]
+                    statNames = [sim.DIST_COLUMN] + [sim.distanceColumn(name) for name in distNames[1:]]
+                    out.write('\t'.join(['Sim'] + paramNames + statNames) + '\n')
+                if [name for name, value in params] != paramNames:
+                    raise Exception('The trajectory bank holds simulations of different parameters.')
+                out.write('\t'.join([str(len(seen))] + [value for name, value in params] + ['%.10f' % d for d in dists]) + '\n')
+    return len(seen)
+
+
+#**********************************************************************#
+def initWorker(dataPath, distNames):
+    global WORKER_OBS, WORKER_DENOMINATORS, WORKER_DIST_NAMES
+    cached = obscache.loadCache(dataPath)
+    if cached: WORKER_OBS, WORKER_DENOMINATORS = cached
+    else:      WORKER_OBS, WORKER_DENOMINATORS = sim.getData([dataPath]), None
+    WORKER_DIST_NAMES = distNames
+
+
+def scoreChunk(path):
+    return [(header['key'], header['params'], sim.getDists(WORKER_OBS, data, WORKER_DIST_NAMES, WORKER_DENOMINATORS))
+            for header, data in trajbank.readChunk(path)]
+
+
+if __name__ == '__main__':
+    main()
@@ -35,6 +35,7 @@
 #/////////////////////////////////////////////////////////////////////////////
 from __future__ import print_function
 import sys
+import ast
 import argparse
 import math
 import os
@@ -44,11 +45,29 @@ import platform
 import subprocess
 import time
 import re
+import threading
 from datetime import datetime
 from glob import glob
-from multiprocessing import Process
+from multiprocessing import Process, Array
+from multiprocessing.pool import ThreadPool
 
 import dist
+import sim
+import obscache
+import epbcache
+import simserver
+import sampler
+import priors
+import smc
+import mcmc
+import combine
+import samplestore
+import simbank
+import sampleindex
+import prefilter
+import shards
+import rundirs
+import estimator
 
 BIN_DIR = os.path.dirname(os.path.abspath(__file__))
 QST_NAME = None
@@ -61,10 +80,49 @@ DAG_FILE = None
 EST_DIR = None
 SAM_FILE = None
 SAM_FILE_NAME = 'samples.txt'
+COMBINE_JOBS = 1
+SAMPLE_STORE = True
+PREFILTER = False
+MAX_ESTIMATOR_SIMS = 10 ** 8 #ABCEstimator stops working after ~10^8
+CANDIDATES_FILE_NAME = 'candidates.txt'
+TRAJECTORY_BANK_DIR_NAME = 'trajectories'
+REUSE_DIR_NAME = 'reused'
+EPB_CACHE_DIR_NAME = 'epbcache'
+HTCONDOR_SIM_FILES = ['sim.py', 'dist.py', 'obscache.py', 'stream.py', 'trajbank.py', 'argparse.py', 'Worker_SSA_SDM']
+REUSE = False
+ESTIMATE_SHARDS = None
+SPLIT_PARAMS = None
+ESTIMATOR = 'abcestimator'
+REGRESSION = 'loclinear'
+JOINT_POSTERIORS = None
 DISTANCE = None
+DISTANCES = None
+ESTIMATE_COLUMN = 'myDist'
 N_SIMS = None
 PERCENT_RETAINED = None
 PEAK_WIDTH = None
+SWEEP_RETAINED = None
+SWEEP_PEAK_WIDTHS = None
+SIM_SERVER = False
+SAMPLER = None
+PRIOR_SAMPLING = 'random'
+SMC_PARTICLES = None
+SMC_ALPHA = None
+SMC_TOLERANCE = None
+SMC_GENERATIONS = None
+MCMC_PILOT = None
+MCMC_TOLERANCE = None
+MCMC_QUANTILE = None
+MCMC_BURN_IN = None
+SIM_OPTIONS = []
+EARLY_REJECT = None
+REJECT_THRESHOLD_FILE_NAME = 'reject_threshold.txt'
+DISTANCE_LOG_NAME = 'distances.log'
+LIVE_THRESHOLD_MIN_SIMS = 100   #simulations to wait for before the first live threshold
+LIVE_THRESHOLD_SLACK = 1.25     #the live threshold is only an estimate of the final cutoff
+LIVE_THRESHOLD_INTERVAL = 2     #seconds between live threshold updates
+BATCH_INPUT_NAME = 'batch.input.txt'
+BATCH_OUT_NAME = 'batch.txt'
 
 STAGE_FLAGS_USED = False
 
@@ -87,8 +145,10 @@ def main():
     else:
         WRK_DIR = takeSnapshot(args)
 
-    global DISTANCE
+    global DISTANCE, DISTANCES, ESTIMATE_COLUMN
     DISTANCE = args.distance
+    DISTANCES = args.distances
+    if args.estimate_distance: ESTIMATE_COLUMN = sim.distanceColumn(args.estimate_distance)
     setUpGlobalVars()
     verifyQuestFilesExist(args.quest)
     validateArgs(args)
@@ -103,10 +163,64 @@ def main():
     if args.p:
         PEAK_WIDTH = args.p
 
+    global SWEEP_RETAINED, SWEEP_PEAK_WIDTHS
+    SWEEP_RETAINED = parseNumbers(args.sweep_retained)
+    SWEEP_PEAK_WIDTHS = parseNumbers(args.sweep_peak_width)
+
+    global SIM_SERVER
+    SIM_SERVER = args.sim_server
+
+    global SAMPLER
+    SAMPLER = args.sampler
+
+    global PRIOR_SAMPLING
+    PRIOR_SAMPLING = args.prior_sampling
+
+    global SMC_PARTICLES, SMC_ALPHA, SMC_TOLERANCE, SMC_GENERATIONS
+    SMC_PARTICLES = args.smc_particles
+    SMC_ALPHA = args.smc_alpha
+    SMC_TOLERANCE = args.smc_tolerance
+    SMC_GENERATIONS = args.smc_generations
+
+    global MCMC_PILOT, MCMC_TOLERANCE, MCMC_QUANTILE, MCMC_BURN_IN
+    MCMC_PILOT = args.mcmc_pilot and os.path.abspath(args.mcmc_pilot)
+    MCMC_TOLERANCE = args.mcmc_tolerance
+    MCMC_QUANTILE = args.mcmc_quantile
+    MCMC_BURN_IN = args.mcmc_burn_in
+
+    global SIM_OPTIONS
+    if args.stream: SIM_OPTIONS.append('--stream')
+    if args.distances: SIM_OPTIONS.extend(['--distances', args.distances])
+    if args.trajectory_bank: SIM_OPTIONS.extend(['--trajectory-bank', os.path.join(SAM_DIR, TRAJECTORY_BANK_DIR_NAME)])
+
+    global EARLY_REJECT
+    EARLY_REJECT = args.early_reject
+
+    global REUSE
+    REUSE = args.reuse
+
     if args.recover:
         htcondorSubmitDAGFile()
         sys.exit(0)
 
+    global COMBINE_JOBS
+    COMBINE_JOBS = args.combine_jobs
+
+    global PREFILTER, ESTIMATE_SHARDS
+    PREFILTER = args.prefilter
+    ESTIMATE_SHARDS = args.estimate_shards
+
+    global SPLIT_PARAMS
+    SPLIT_PARAMS = args.split_params
+
+    global ESTIMATOR, REGRESSION, JOINT_POSTERIORS
+    ESTIMATOR = args.estimator
+    REGRESSION = args.regression
+    JOINT_POSTERIORS = args.joint_posteriors
+
+    global SAMPLE_STORE
+    SAMPLE_STORE = not args.no_sample_store and samplestore.numpy is not None
+
     if args.combine:
         combineSamples()
     
@@ -121,16 +235,70 @@ def parseArgs():
     parser.add_argument('--htcondor', help='Run the simulations on HTCondor', action='store_true')
     parser.add_argument('--sample', help='Generate the samples only.', action='store_true')
     parser.add_argument('--combine', help='Won\'t generate samples, just combines any existing samples into the sample file.', action='store_true')
+    parser.add_argument('--combine-jobs', type=int, help='Number of sample files to copy into the sample file at the same time.', default=1)
+    parser.add_argument('--no-sample-store', help='Do not keep the columnar copy of the samples (samples.cols) up to date when combining. '
+                        'It is skipped anyway if numpy is not installed.', action='store_true')
+    parser.add_argument('--prefilter', help='Before estimating, copy the samples ABCestimator is going to retain (the -r percent with the smallest distance) '
+                        'to estimate/candidates.txt, using -c processes, and let ABCestimator read only those. '
+                        'Always done when there are more than 1e8 samples, which ABCestimator cannot read.', action='store_true')
+    parser.add_argument('--estimate-shards', type=int, help='Deal the retained samples out to this many ABCestimator runs (implies --prefilter), '
+                        '-c of them at a time, and merge their retained samples and posterior densities. '
+                        'Default: as many as needed to keep every run below 1e8 samples.')
+    parser.add_argument('--estimator', type=str, choices=['abcestimator', 'native'], default='abcestimator',
+                        help='abcestimator runs the ABCestimator binary. native retains the same samples and estimates the posteriors with numpy '
+                        '(see --regression), without ABCestimator, and only plots them if R is installed.')
+    parser.add_argument('--regression', type=str, choices=estimator.REGRESSIONS, default='loclinear',
+                        help='Regression adjustment of --estimator native.')
+    parser.add_argument('--joint-posteriors', type=str, help='Pairs of parameters like "a,b;a,c" whose joint posterior densities --estimator native '
+                        'writes to estimate/ABC_GLM_model0_jointPosterior_<a>_<b>_Obs0.txt.')
+    parser.add_argument('--split-params', type=str, nargs='?', const='each',
+                        help='Estimate groups of parameters in separate ABCestimator runs, -c of them at a time, and merge their outputs. '
+                        'Without a value every parameter is its own group, otherwise list the groups like "a,b;c". Parameters that are not listed get their own group. '
+                        'Every group gets its own regression, so keep parameters that jointly affect the distance in one group.')
     parser.add_argument('--estimate', help='Use an existing sample file to estimate parameters.', action="store_true")
     parser.add_argument('--recover', help='Tries to recover in case of early termination. Valid only with runs using --htcondor', action='store_true')
     parser.add_argument('--distance', type=str, help='Distance to use. Options: ' \
                         + (', ').join(dist.distFuncs.keys()), default='L2')
+    parser.add_argument('--distances', type=str, help='Comma separated distances, or all, that every simulation also computes from its trajectory. '
+                        'They become the columns myDist_<name> of the samples, next to myDist (--distance), and --estimate-distance picks one to estimate with.')
+    parser.add_argument('--estimate-distance', type=str, help='Estimate with the myDist_<name> column of this --distances distance instead of myDist.')
+    parser.add_argument('--sampler', type=str, choices=['abcsampler', 'native', 'smc', 'mcmc'], default='abcsampler',
+                        help='abcsampler runs the ABCsampler binary once per core. native draws from the priors in run.py and keeps one simulation worker per core busy. '
+                        'smc runs ABC-SMC on the same workers, with -n as the simulation budget, and writes the final population as the samples. '
+                        'mcmc runs one ABC-MCMC chain per core for a total of -n steps, starting from --mcmc-pilot. native, smc and mcmc are not available with --htcondor.')
+    parser.add_argument('--prior-sampling', type=str, choices=priors.SAMPLING_MODES, default='random',
+                        help='How --sampler native draws from the priors: pseudo-random numbers, Latin hypercubes over consecutive blocks '
+                        'of {0} simulations, or a scrambled Sobol or Halton sequence, which cover the prior space more evenly.'.format(sampler.DRAW_CHUNK_SIZE))
+    parser.add_argument('--smc-particles', type=int, help='Population size of --sampler smc.', default=1000)
+    parser.add_argument('--smc-alpha', type=float, help='Each SMC tolerance is this quantile of the distances of the previous population.', default=0.5)
+    parser.add_argument('--smc-tolerance', type=float, help='Stop SMC once this tolerance is reached.')
+    parser.add_argument('--smc-generations', type=int, help='Maximum number of SMC populations.', default=20)
+    parser.add_argument('--mcmc-pilot', type=str, help='samples.txt of a pilot run to start the MCMC chains from.')
+    parser.add_argument('--mcmc-tolerance', type=float, help='MCMC tolerance. Default: the --mcmc-quantile percent quantile of the pilot distances.')
+    parser.add_argument('--mcmc-quantile', type=float, help='See --mcmc-tolerance.', default=5)
+    parser.add_argument('--mcmc-burn-in', type=int, help='Burn-in steps per chain, during which the proposal adapts. Default: a fifth of the steps.')
+    parser.add_argument('--sim-server', help='Keep one simulation server per core running instead of starting sim.py for every simulation. Not available with --htcondor.', action='store_true')
+    parser.add_argument('--stream', help='Stream the time series of each simulation through named pipes instead of writing TS*.txt files.', action='store_true')
+    parser.add_argument('--early-reject', type=str, help='Stop simulations as soon as their distance is known to exceed a threshold (implies --stream). '
+                        'Use a number for a fixed threshold, pilot:SAMPLES_FILE for the -r percent quantile of the distances of a pilot run, '
+                        'or live for the -r percent quantile of the distances of this run so far (local runs with --sampler abcsampler or native only).')
+    parser.add_argument('--trajectory-bank', help='Keep the compressed trajectory of every complete simulation in sample/trajectories, '
+                        'from which rescore.py recomputes distances without simulating again. Not available with --htcondor.', action='store_true')
+    parser.add_argument('--reuse', help='Reuse the simulations that earlier --reuse runs of the quest filed in its bank directory for the same model, '
+                        'observed data and distances, as far as their priors cover the current priors, simulate only the rest of the -n '
+                        'and file the new simulations for later runs. Local abcsampler and native runs only.', action='store_true')
     parser.add_argument('--working-dir', type=str, help='Specify a working directory to use. Overrides use of a timestamp.')
     parser.add_argument('--comment', type=str, help='Add a comment to the run\'s directory name.', default='')
     parser.add_argument('-n', type=int, help='Number of simulations.')
     parser.add_argument('-c', type=int, help='Number of cores.', default=1)
     parser.add_argument('-r', type=int, help='Percentage of simulations retained (see "numRetained" in ABCToolbox manual.', default=20)
-    parser.add_argument('-p', type=float, help='See "diracPeakWidth" in ABCToolbox manual. Default: 1/(number of simulations)')
+    parser.add_argument('-p', type=float, help='See "diracPeakWidth" in ABCToolbox manual. Default: 1/(number of simulations), '
+                        'or Silverman\'s rule with --estimator native')
+    parser.add_argument('--sweep-retained', type=str, help='Instead of one estimate with -r, estimate with every one of these comma separated percentages '
+                        'into estimate/sweep/r<retained>_p<peak width>/ and compare their posteriors in estimate/sweep/sweep.txt. '
+                        'The samples are scanned once, for the largest percentage.')
+    parser.add_argument('--sweep-peak-width', type=str, help='Comma separated -p values to sweep over, combined with every --sweep-retained percentage. '
+                        'With --estimator native they are kernel widths relative to the prior ranges.')
     parser.add_argument('quest', type=str, help='Name of the quest')
     args = parser.parse_args()
     return args
@@ -152,7 +320,7 @@ def takeSnapshot(args):
 
     map(lambda file: shutil.copyfile(os.path.join(BIN_DIR, file),
                                      os.path.join(snapshotDir, file)),
-        ['dist.py', 'plotDistance.r', 'plotPosteriorsGLM.r', 'sim.py', 'run.py']
+        ['dist.py', 'plotDistance.r', 'plotPosteriorsGLM.r', 'sim.py', 'obscache.py', 'epbcache.py', 'stream.py', 'simserver.py', 'simclient.py', 'priors.py', 'sampler.py', 'smc.py', 'mcmc.py', 'combine.py', 'samplestore.py', 'sampleindex.py', 'prefilter.py', 'shards.py', 'rundirs.py', 'kde.py', 'estimator.py', 'trajbank.py', 'rescore.py', 'simbank.py', 'run.py']
     )
     relQuestPath = os.path.join('..', 'quests', QST_NAME, QST_NAME + 'Quest.txt')
     shutil.copyfile(relQuestPath, os.path.join(snapshotDir, QST_NAME + 'Quest.txt'))
@@ -213,6 +381,50 @@ def validateArgs(args):
         if args.c <= 0: raise Exception('Number of cores must be greater than zero.')
     if (args.htcondor and not args.sample and (args.combine or args.estimate)):
         raise Exception('--htcondor can not be used with flags --combine or --estimate. Just remove the --htcondor flag and run either or both of those stages locally (assuming sampling is already complete).')
+    if (args.htcondor and args.sampler != 'abcsampler'):
+        raise Exception('--sampler {0} can only be used when running locally.'.format(args.sampler))
+    if args.estimate_shards is not None and args.estimate_shards <= 0: raise Exception('--estimate-shards must be greater than zero.')
+    if args.combine_jobs <= 0: raise Exception('--combine-jobs must be greater than zero.')
+    if args.sweep_retained or args.sweep_peak_width:
+        if args.split_params or args.estimate_shards:
+            raise Exception('--sweep-retained and --sweep-peak-width can not be used with --split-params or --estimate-shards.')
+        for percent in parseNumbers(args.sweep_retained) or []:
+            if not 0 < percent <= 100: raise Exception('--sweep-retained percentages must be in (0, 100].')
+        for width in parseNumbers(args.sweep_peak_width) or []:
+            if width <= 0: raise Exception('--sweep-peak-width values must be greater than zero.')
+    if args.distances:
+        sim.parseDistanceNames(args.distances)
+        if args.sampler not in ('abcsampler', 'native'):
+            raise Exception('--distances can only be used with --sampler abcsampler or native.')
+        if args.early_reject:
+            raise Exception('--distances can not be used with --early-reject, a rejected simulation only has a bound on its --distance.')
+    if args.estimate_distance and args.estimate_distance not in dist.distFuncs:
+        raise Exception('Invalid distance function name: {}'.format(args.estimate_distance))
+    if (args.estimator == 'native' and (args.split_params or args.estimate_shards)):
+        raise Exception('--split-params and --estimate-shards split the work between ABCestimator runs and can not be used with --estimator native.')
+    if args.joint_posteriors and args.estimator != 'native':
+        raise Exception('--joint-posteriors can only be used with --estimator native.')
+    if (args.prior_sampling != 'random' and args.sampler != 'native'):
+        raise Exception('--prior-sampling {0} can only be used with --sampler native.'.format(args.prior_sampling))
+    if (args.sampler == 'smc' and args.n < args.smc_particles and (args.sample or not STAGE_FLAGS_USED)):
+        raise Exception('--sampler smc needs at least --smc-particles simulations (-n).')
+    if (args.sampler == 'mcmc' and not args.mcmc_pilot and (args.sample or not STAGE_FLAGS_USED)):
+        raise Exception('--sampler mcmc needs the samples of a pilot run, see --mcmc-pilot.')
+    if (args.htcondor and args.sim_server):
+        raise Exception('--sim-server can only be used when running locally.')
+    if args.reuse:
+        if args.htcondor or args.sampler not in ('abcsampler', 'native'):
+            raise Exception('--reuse can only be used when running --sampler abcsampler or native locally.')
+        if args.early_reject:
+            raise Exception('--reuse can not be used with --early-reject, rejected simulations only have a bound on their distance.')
+        if simbank.numpy is None:
+            raise Exception('--reuse needs numpy.')
+    if (args.htcondor and args.trajectory_bank):
+        raise Exception('--trajectory-bank can only be used when running locally.')
+    if (args.htcondor and args.early_reject == 'live'):
+        raise Exception('--early-reject live can only be used when running locally.')
+    if (args.early_reject == 'live' and args.sampler not in ('abcsampler', 'native')):
+        raise Exception('--early-reject live can only be used with --sampler abcsampler or native.')
     if (args.recover and STAGE_FLAGS_USED):
         raise Exception('--recover can not be used with other stage flags (e.g. --sample, --combine, or --estimate)')
     if (args.recover and not os.path.isfile('{0}/{1}.dag'.format(DAG_DIR,args.quest))):
@@ -228,7 +440,7 @@ def runLocally(args):
 
     if args.estimate or not STAGE_FLAGS_USED:
         # estimate based on the distance of the samples generated
-        runEstimator(args.quest)
+        runEstimator(args.quest, args.c)
 
     #even when using condor, it runs it locally to do the estimation
     #so taking the snapshot here still works for running on condor
@@ -236,9 +448,82 @@ def runLocally(args):
 
 #**********************************************************************#
 def runSampler(QST_NAME, nSims, nCores):
-    prepSamplerFiles(QST_NAME, nSims, nCores)
+    nSims = prepSamplerFiles(QST_NAME, nSims, nCores)
     prepRunDirs(nCores)
-    runSamplerLocally(QST_NAME, nCores)
+    if nSims == 0            : print('All simulations were reused.')
+    elif SAMPLER == 'native' : runNativeSampler(QST_NAME, nSims, nCores)
+    elif SAMPLER == 'smc'    : runSmcSampler(QST_NAME, nSims, nCores)
+    elif SAMPLER == 'mcmc'   : runMcmcSampler(QST_NAME, nSims, nCores)
+    else                     : runSamplerLocally(QST_NAME, nSims, nCores)
+    if REUSE: depositSimulations(QST_NAME, nCores)
+
+
+#**********************************************************************#
+def runNativeSampler(QST_NAME, nSims, nCores):
+    print('Running {0} simulations on {1} native sampler workers.'.format(nSims, nCores))
+    simArgs = [QST_NAME, '--distance', DISTANCE] + SIM_OPTIONS
+    stopMonitor = startLiveThreshold(nCores)
+    try:
+        sampler.run(QST_NAME, os.path.join(SAM_DIR, QST_NAME + 'Priors.est'), nSims, nCores, SAM_DIR, simArgs,
+                    mode=PRIOR_SAMPLING)
+    finally:
+        stopMonitor.set()
+
+
+#**********************************************************************#
+def runSmcSampler(QST_NAME, nSims, nCores):
+    print('Running ABC-SMC with {0} particles and at most {1} simulations on {2} workers.'.format(SMC_PARTICLES, nSims, nCores))
+    priorList = readPerturbablePriors(QST_NAME)
+    simArgs = [QST_NAME, '--distance', DISTANCE] + SIM_OPTIONS
+    pool = sampler.startPool(nCores, SAM_DIR, priorList, simArgs)
+    simulate = lambda values: sampler.simulateAll(pool, priorList, values, sampler.defaultBatchSize(len(values), nCores))
+    try:
+        populations = smc.run(priorList, simulate, SMC_PARTICLES, nSims, SMC_ALPHA, SMC_TOLERANCE, SMC_GENERATIONS)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    #combineSamples picks the final population up like any other run directory
+    smcDir = os.path.join(SAM_DIR, 'smc')
+    if not os.path.isdir(smcDir): os.mkdir(smcDir)
+    smc.writeSamples(os.path.join(smcDir, sampler.SAMPLE_FILE_NAME), priorList, populations[-1])
+    smc.writePopulations(os.path.join(smcDir, 'populations.txt'), priorList, populations)
+
+
+#**********************************************************************#
+def runMcmcSampler(QST_NAME, nSims, nCores):
+    priorList = readPerturbablePriors(QST_NAME)
+    simArgs = [QST_NAME, '--distance', DISTANCE] + SIM_OPTIONS
+    nSteps = int(math.ceil(float(nSims) / nCores))
+    pool = sampler.startPool(nCores, SAM_DIR, priorList, simArgs)
+    try:
+        chains, tolerance, burnIn = mcmc.run(priorList, pool, MCMC_PILOT, nSteps, nCores, MCMC_TOLERANCE,
+                                             MCMC_QUANTILE, MCMC_BURN_IN)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    #combineSamples picks the post burn-in states up like any other run directory
+    mcmcDir = os.path.join(SAM_DIR, 'mcmc')
+    if not os.path.isdir(mcmcDir): os.mkdir(mcmcDir)
+    mcmc.writeSamples(os.path.join(mcmcDir, sampler.SAMPLE_FILE_NAME), priorList, chains, burnIn)
+    mcmc.writeChains(os.path.join(mcmcDir, 'chains.txt'), priorList, chains)
+    mcmc.writeDiagnostics(os.path.join(mcmcDir, 'diagnostics.txt'), priorList, chains, tolerance, burnIn)
+
+
+#**********************************************************************#
+def readPerturbablePriors(QST_NAME):
+    #smc and mcmc move parameters one by one and have no notion of rules or complex parameters
+    priorList, rules, complexParams = priors.readPriorFile(os.path.join(SAM_DIR, QST_NAME + 'Priors.est'))
+    if rules or complexParams:
+        raise Exception('--sampler {0} does not support [RULES] or [COMPLEX PARAMETERS] in the priors file.'.format(SAMPLER))
+    return priorList
 
 
 #**********************************************************************#
@@ -247,10 +532,151 @@ def prepSamplerFiles(QST_NAME, nSims, nCores, htcondor = False):
 
     generateEPBFile(QST_NAME)
     writeParFile(QST_NAME)
-    writeSamplerFile(QST_NAME, getSimsPerCore(nSims, nCores), htcondor)
+    if EARLY_REJECT: prepEarlyRejection(htcondor)
     shutil.copy(os.path.join(QST_DIR, QST_NAME + 'Priors.est'), SAM_DIR)
     shutil.copy(os.path.join(QST_DIR, QST_NAME + 'Data.txt'), SAM_DIR)
-    shutil.copy(os.path.join(BIN_DIR, 'target_distance.txt'), SAM_DIR)
+    writeObsCache(QST_NAME)
+    writeTargetFile(os.path.join(SAM_DIR, 'target_distance.txt'),
+                    ['myDist'] + [sim.distanceColumn(name) for name in sim.parseDistanceNames(DISTANCES)])
+    if REUSE: nSims = reuseSimulations(QST_NAME, nSims)
+    #locally the simulations are handed out in batches, see runSamplerLocally
+    if nSims: writeSamplerFile(QST_NAME, getSimsPerCore(nSims, nCores) if htcondor else nSims, htcondor)
+    return nSims
+
+
+#**********************************************************************#
+def reuseSimulations(QST_NAME, nSims):
+    #returns the number of simulations that are still needed
+    priorsPath = os.path.join(SAM_DIR, QST_NAME + 'Priors.est')
+    priorList, rules, complexParams = priors.readPriorFile(priorsPath)
+    if complexParams:
+        print('Simulations are not reused with [COMPLEX PARAMETERS] in the priors file.')
+        return nSims
+    columns = ['Sim'] + [prior.name for prior in priorList] + ['myDist'] + [sim.distanceColumn(name) for name in sim.parseDistanceNames(DISTANCES)]
+    reuseDir = os.path.join(SAM_DIR, REUSE_DIR_NAME)
+    if not os.path.isdir(reuseDir): os.mkdir(reuseDir)
+    nReused = simbank.select(getBankDir(QST_NAME), priorsPath, columns, nSims, os.path.join(reuseDir, sampler.SAMPLE_FILE_NAME))
+    print('Reused {0} simulations of earlier runs, simulating the other {1}.'.format(nReused, nSims - nReused))
+    return nSims - nReused
+
+
+def depositSimulations(QST_NAME, nCores):
+    #only the simulations of this run, not the reused ones
+    sampleFiles = [os.path.join(SAM_DIR, str(i), sampler.SAMPLE_FILE_NAME) for i in range(nCores)]
+    sampleFiles = [path for path in sampleFiles if os.path.isfile(path)]
+    nRows = simbank.deposit(getBankDir(QST_NAME), os.path.basename(os.path.normpath(WRK_DIR)), sampleFiles,
+                            os.path.join(SAM_DIR, QST_NAME + 'Priors.est'))
+    print('Filed {0} simulations in the bank for later runs.'.format(nRows))
+
+
+def getBankDir(QST_NAME):
+    return simbank.keyDir(os.path.join(QST_DIR, simbank.BANK_DIR_NAME), os.path.join(SAM_DIR, QST_NAME + 'Quest.epb'),
+                          os.path.join(SAM_DIR, QST_NAME + 'Data.txt'), [DISTANCE] + sim.parseDistanceNames(DISTANCES))
+
+
+#**********************************************************************#
+def writeTargetFile(path, columns):
+    #the observed value of every distance column is 0
+    with open(path, 'w') as f:
+        f.write('\t'.join(columns) + '\n')
+        f.write('\t'.join('0' for column in columns) + '\n')
+
+
+#**********************************************************************#
+def writeObsCache(QST_NAME):
+    #parse the observed data once here instead of once per simulation
+    dataPath = os.path.join(SAM_DIR, QST_NAME + 'Data.txt')
+    obscache.writeCache(dataPath, sim.getData([dataPath]))
+
+
+#**********************************************************************#
+def prepEarlyRejection(htcondor = False):
+    thresholdFile = os.path.join(SAM_DIR, REJECT_THRESHOLD_FILE_NAME)
+    if os.path.isfile(thresholdFile): os.remove(thresholdFile)
+
+    if EARLY_REJECT == 'live':
+        SIM_OPTIONS.extend(['--distance-log', DISTANCE_LOG_NAME])
+    elif EARLY_REJECT.startswith('pilot:'):
+        pilotFile = EARLY_REJECT[len('pilot:'):]
+        writeRejectThreshold(distanceQuantile(readDistances(pilotFile), PERCENT_RETAINED))
+    else:
+        try:
+            writeRejectThreshold(float(EARLY_REJECT))
+        except ValueError:
+            raise Exception('--early-reject must be a number, pilot:SAMPLES_FILE or live.')
+
+    #on HTCondor every job gets its own copy of the file
+    if htcondor : SIM_OPTIONS.extend(['--reject-threshold-file', REJECT_THRESHOLD_FILE_NAME])
+    else :        SIM_OPTIONS.extend(['--reject-threshold-file', thresholdFile])
+
+
+#**********************************************************************#
+def writeRejectThreshold(threshold):
+    #sims may read the file at any time, so replace it atomically
+    thresholdFile = os.path.join(SAM_DIR, REJECT_THRESHOLD_FILE_NAME)
+    with open(thresholdFile + '.tmp', 'w') as f:
+        f.write('%.10f\n' % threshold)
+    os.rename(thresholdFile + '.tmp', thresholdFile)
+    print('Early rejection threshold: {0}'.format(threshold))
+
+
+#**********************************************************************#
+def readDistances(samplesFile, column = 'myDist'):
+    return samplestore.readColumn(samplesFile, column)
+
+
+#**********************************************************************#
+def distanceQuantile(distances, percent):
+    if len(distances) == 0: raise Exception('Cannot compute a threshold without any distances.')
+    distances = sorted(distances)
+    k = int(math.ceil(percent / 100.0 * len(distances)))
+    return distances[min(max(k, 1), len(distances)) - 1]
+
+
+#**********************************************************************#
+def startLiveThreshold(nCores):
+    #returns the event that stops the monitor, which only runs with --early-reject live
+    stop = threading.Event()
+    if EARLY_REJECT == 'live':
+        monitor = threading.Thread(target = monitorLiveThreshold, args=(nCores, stop))
+        monitor.daemon = True
+        monitor.start()
+    return stop
+
+
+def monitorLiveThreshold(nCores, stop):
+    #keeps the threshold at the -r percent quantile of the distances so far
+    offsets = [0] * nCores
+    distances = []
+    bounds = []
+    nUsed = 0
+    while not stop.wait(LIVE_THRESHOLD_INTERVAL):
+        for i in range(nCores):
+            logPath = os.path.join(SAM_DIR, str(i), DISTANCE_LOG_NAME)
+            if not os.path.isfile(logPath): continue
+            with open(logPath, 'r') as f:
+                f.seek(offsets[i])
+                chunk = f.read()
+            #only take complete lines, the rest is picked up next time
+            chunk = chunk[:chunk.rfind('\n') + 1]
+            offsets[i] += len(chunk)
+            for x in chunk.split():
+                if x.startswith('>'): bounds.append(float(x[1:]))
+                else:                 distances.append(float(x))
+        nSims = len(distances) + len(bounds)
+        if nSims >= LIVE_THRESHOLD_MIN_SIMS and nSims > nUsed:
+            writeRejectThreshold(LIVE_THRESHOLD_SLACK * censoredQuantile(distances, bounds, PERCENT_RETAINED))
+            nUsed = nSims
+
+
+def censoredQuantile(distances, bounds, percent):
+    #the distances of rejected simulations are only known to exceed their
+    #bounds, which are above the threshold, so they rank above every
+    #complete distance. Ranking the bounds themselves would pull the
+    #quantile down and reject more than -r percent.
+    ranked = sorted(distances) + sorted(bounds)
+    k = int(math.ceil(percent / 100.0 * len(ranked)))
+    return ranked[min(max(k, 1), len(ranked)) - 1]
 
 
 #**********************************************************************#
@@ -258,22 +684,21 @@ def generateEPBFile(QST_NAME):
     questTextFile = os.path.join(QST_DIR, QST_NAME + 'Quest.txt')
     if not os.path.isfile(questTextFile):
         raise Exception('A quest file matching the quest name was not found.  Looked for {0} and did not find it.'.format(questTextFile))
-    try:
-        subprocess.call([BIN_DIR + '/Evolvix', '--parse_only', os.path.join(SAM_DIR, QST_NAME + 'Quest.epb'), questTextFile])
-    except OSError:
+    evolvixPath = BIN_DIR + '/Evolvix'
+    if not os.path.isfile(evolvixPath):
         raise Exception('There was an error parsing the quest file. Check that Evolvix is installed and available.')
+    cachedPath, cached = epbcache.parsedModel(questTextFile, evolvixPath, os.path.join(QST_DIR, EPB_CACHE_DIR_NAME))
+    epbcache.install(cachedPath, os.path.join(SAM_DIR, QST_NAME + 'Quest.epb'))
+    if cached: print('Using the parsed quest ' + cachedPath)
 
 
 #**********************************************************************#
 def writeParFile(QST_NAME):
-    priorsFile = open(os.path.join(QST_DIR, QST_NAME + 'Priors.est'), 'r')
-    priorsFile.readline()
-    priorsFile.readline()
+    priorList, rules, complexParams = priors.readPriorFile(os.path.join(QST_DIR, QST_NAME + 'Priors.est'))
 
     parFile = open(os.path.join(SAM_DIR, QST_NAME + '.par'), 'w')
-    for line in priorsFile:
-        paramName = line.split('\t')[1]
-        parFile.write('{0}: {0}\n'.format(paramName))
+    for param in priorList + complexParams:
+        parFile.write('{0}: {0}\n'.format(param.name))
 
     parFile.close()
 
@@ -296,6 +721,8 @@ def writeSamplerFile(QST_NAME, simsPerCore, htcondor = False):
     replacements['PARS_FILE'] = QST_NAME + '.par'
     replacements['MODEL_NAME'] = QST_NAME
     replacements['DISTANCE'] = DISTANCE
+    replacements['SIM_SCRIPT'] = 'simclient.py' if SIM_SERVER else 'sim.py'
+    replacements['SIM_OPTIONS'] = ''.join('#' + option for option in SIM_OPTIONS)
     if htcondor : replacements['SRC_DIR'] = '.'
     else :        replacements['SRC_DIR'] = BIN_DIR
 
@@ -305,30 +732,113 @@ def writeSamplerFile(QST_NAME, simsPerCore, htcondor = False):
 
 
 #**********************************************************************#
-def runSamplerLocally(QST_NAME, nCores):
+def runSamplerLocally(QST_NAME, nSims, nCores):
     procs = []
     samplerInput = os.path.join(SAM_DIR, QST_NAME + 'Sampler.input.txt')
     samplerInput = os.path.abspath(samplerInput)
+    #the jobs take batches until all of the simulations are handed out, so a
+    #job stuck on slow parameter values does not hold up the others
+    batchSize = sampler.defaultBatchSize(nSims, nCores)
+    batches = Array('l', [nSims, 0])
+    print('Running {0} simulations over {1} parallel jobs in batches of {2}.'.format(nSims, nCores, batchSize))
+    stopMonitor = startLiveThreshold(nCores)
     for i in range(0, nCores):
-        p = Process(target = execSampler, args=(i, samplerInput))
+        p = Process(target = execSampler, args=(i, samplerInput, batches, batchSize))
         procs.append(p)
         p.start()
-    for p in procs:
-        p.join()
-        procs.remove(p)
-        if p.exitcode:
-            cleanupChildren(procs)
-            raise Exception('Failed to run ABCsampler.')
+    try:
+        for p in list(procs):
+            p.join()
+            procs.remove(p)
+            if p.exitcode:
+                cleanupChildren(procs)
+                raise Exception('Failed to run ABCsampler.')
+    finally:
+        stopMonitor.set()
 
 
 #**********************************************************************#
-def execSampler(taskID, samplerFileName):
+def execSampler(taskID, samplerFileName, batches, batchSize):
     os.chdir(os.path.join(SAM_DIR, str(taskID)))
-    err = os.system('{0}/ABCsampler {1}'.format(BIN_DIR, samplerFileName))
+    server = startSimServer() if SIM_SERVER else None
+    try:
+        err = runSamplerBatches(samplerFileName, batches, batchSize)
+    finally:
+        if server: stopSimServer(server)
     if err: sys.exit(1)
     sys.exit(0)
 
 
+def runSamplerBatches(samplerFileName, batches, batchSize):
+    #runs ABCsampler once per batch and appends the batches to the sample file of the run dir
+    if os.path.isfile(sampler.SAMPLE_FILE_NAME): os.remove(sampler.SAMPLE_FILE_NAME)
+    nRows = 0
+    while True:
+        nSims, batchIndex = takeBatch(batches, batchSize)
+        if nSims == 0: return 0
+        writeBatchInputFile(samplerFileName, BATCH_INPUT_NAME, nSims, batchIndex)
+        err = os.system('{0}/ABCsampler {1}'.format(BIN_DIR, BATCH_INPUT_NAME))
+        if err: return err
+        nRows = appendBatchSamples(BATCH_OUT_NAME + '_sampling1.txt', sampler.SAMPLE_FILE_NAME, nRows)
+
+
+def takeBatch(batches, batchSize):
+    #batches holds the number of simulations left and of batches handed out
+    with batches.get_lock():
+        nSims = min(batchSize, batches[0])
+        batches[0] -= nSims
+        batches[1] += 1
+        return nSims, batches[1]
+
+
+def writeBatchInputFile(samplerFileName, path, nSims, batchIndex):
+    with open(samplerFileName, 'r') as f:
+        lines = [line.rstrip('\n') + '\n' for line in f if line.split()[:1] not in (['nbSims'], ['outName'], ['addToSeed'])]
+    lines.append('nbSims {0}\n'.format(nSims))
+    lines.append('outName {0}\n'.format(BATCH_OUT_NAME))
+    #ABCsampler seeds from the clock, batches started at the same time must still differ
+    lines.append('addToSeed {0}\n'.format(batchIndex))
+    with open(path, 'w') as f:
+        f.writelines(lines)
+
+
+def appendBatchSamples(batchPath, samplePath, nRows):
+    #numbers the rows on from the earlier batches, as a single ABCsampler run would
+    writeHeader = not os.path.isfile(samplePath)
+    with open(batchPath, 'r') as batch:
+        with open(samplePath, 'a') as out:
+            header = batch.readline()
+            if writeHeader: out.write(header)
+            for line in batch:
+                fields = line.split(None, 1)
+                if len(fields) < 2: continue
+                nRows += 1
+                out.write('{0}\t{1}\n'.format(nRows, fields[1].rstrip('\n')))
+    os.remove(batchPath)
+    return nRows
+
+
+#**********************************************************************#
+def startSimServer():
+    if os.path.exists(simserver.SOCKET_NAME): os.remove(simserver.SOCKET_NAME)
+    server = subprocess.Popen([sys.executable, BIN_DIR + '/simserver.py', QST_NAME, '--distance', DISTANCE] + SIM_OPTIONS)
+    #the socket only shows up once the observed data is loaded
+    while not os.path.exists(simserver.SOCKET_NAME):
+        if server.poll() is not None:
+            raise Exception('The simulation server exited before it started serving.')
+        time.sleep(0.01)
+    return server
+
+
+#**********************************************************************#
+def stopSimServer(server):
+    try:
+        simserver.stopServer()
+    except Exception:
+        server.terminate()
+    server.wait()
+
+
 #**********************************************************************#
 def cleanupChildren(procs):
     for p in procs:
@@ -337,42 +847,165 @@ def cleanupChildren(procs):
 
 
 #**********************************************************************#
-def runEstimator(QST_NAME):
+def runEstimator(QST_NAME, nCores=1):
     if not os.path.isdir(EST_DIR) : os.mkdir(EST_DIR)
 
-    shutil.copy(SAM_DIR + '/target_distance.txt', EST_DIR)
+    #the estimators take every column of the target file as a statistic, so it only names the one to estimate with
+    with open(SAM_FILE, 'r') as f:
+        if ESTIMATE_COLUMN not in f.readline().split():
+            raise Exception('The samples have no column {0}, see --distances.'.format(ESTIMATE_COLUMN))
+    writeTargetFile(os.path.join(EST_DIR, 'target_distance.txt'), [ESTIMATE_COLUMN])
 
-    combinedSamples = os.path.join(SAM_DIR + '/samples.txt')
-    nSamples = None
-    with open(combinedSamples) as f:
-        f.readline() #skip the header
-        nSamples = sum(1 for line in f) 
-    estimatorFileName = writeEstimatorFile(QST_NAME, nSamples)
-    
+    nSamples = sampleindex.rowCount(SAM_FILE)
     questPath = os.path.join(QST_DIR, '{0}Quest.txt'.format(QST_NAME))
     trueParamsValsPath = os.path.join(EST_DIR, 'true_param_vals.txt')
     writeTrueParamValsFile(questPath, trueParamsValsPath)
+
+    if SWEEP_RETAINED or SWEEP_PEAK_WIDTHS:
+        estimateSweep(QST_NAME, nSamples, nCores)
+        return
+
+    nShards = ESTIMATE_SHARDS or int(math.ceil(getNumRetained(nSamples) / float(MAX_ESTIMATOR_SIMS)))
+    samplesPath = SAM_FILE
+    if PREFILTER or nShards > 1 or nSamples > MAX_ESTIMATOR_SIMS:
+        samplesPath = prefilterSamples(nSamples, nCores)
+    estimatorFileName = writeEstimatorFile(QST_NAME, nSamples, samplesPath)
     
-    callEstimator(estimatorFileName)
+    if ESTIMATOR == 'native':
+        estimator.run(os.path.join(EST_DIR, estimatorFileName), REGRESSION, os.path.join(SAM_DIR, QST_NAME + 'Priors.est'),
+                      usePeakWidth=PEAK_WIDTH is not None)
+        callPlotScript(estimatorFileName, required=False)
+        return
+
+    if nShards > 1 and SPLIT_PARAMS:
+        raise Exception('--split-params can not be used when the samples are estimated in shards.')
+    if nShards > 1     : estimateInShards(QST_NAME, nSamples, samplesPath, nShards, nCores)
+    elif SPLIT_PARAMS  : estimateInGroups(QST_NAME, nSamples, samplesPath, nCores)
+    else               : callEstimator(estimatorFileName)
     callPlotScript(estimatorFileName)
 
 
 #**********************************************************************#
-def writeEstimatorFile(QST_NAME, nSamples):
+def prefilterSamples(nSamples, nCores, nRetained=None):
+    candidatesPath = os.path.join(EST_DIR, CANDIDATES_FILE_NAME)
+    nRetained = nRetained or getNumRetained(nSamples)
+    print('Copying the {0} closest of {1} samples to {2}'.format(nRetained, nSamples, candidatesPath))
+    threshold = prefilter.selectClosest(SAM_FILE, candidatesPath, nRetained, ESTIMATE_COLUMN, jobs=nCores)
+    print('The largest retained distance is {0}'.format(threshold))
+    return candidatesPath
+
+
+def getNumRetained(nSamples):
+    return int(max(1, round(PERCENT_RETAINED/100.0*nSamples)))
+
+
+#**********************************************************************#
+def estimateSweep(QST_NAME, nSamples, nCores):
+    #the retained sets of all percentages are nested, so one selection of the largest serves all of them
+    counts = sorted(set(int(max(1, round(percent / 100.0 * nSamples))) for percent in SWEEP_RETAINED or [PERCENT_RETAINED]))
+    sweepDir = os.path.join(EST_DIR, estimator.SWEEP_DIR_NAME)
+    if not os.path.isdir(sweepDir): os.mkdir(sweepDir)
+    print('Sweeping over {0} numbers of retained samples and {1} peak widths.'.format(len(counts), len(SWEEP_PEAK_WIDTHS or [None])))
+
+    if ESTIMATOR == 'native':
+        samplesPath = SAM_FILE
+        if PREFILTER or nSamples > MAX_ESTIMATOR_SIMS:
+            samplesPath = prefilterSamples(nSamples, nCores, counts[-1])
+        estimatorFileName = writeEstimatorFile(QST_NAME, nSamples, samplesPath, counts[-1])
+        estimator.sweep(os.path.join(EST_DIR, estimatorFileName), counts, SWEEP_PEAK_WIDTHS or [PEAK_WIDTH], REGRESSION,
+                        os.path.join(SAM_DIR, QST_NAME + 'Priors.est'), sweepDir, nSamples)
+        return
+
+    samplesPath = prefilterSamples(nSamples, nCores, counts[-1])
+    runs, runDirs, estimatorFileNames = [], [], []
+    for count in counts:
+        for peakWidth in SWEEP_PEAK_WIDTHS or [PEAK_WIDTH or 1 / float(nSamples)]:
+            runDir = os.path.join(sweepDir, estimator.sweepRunName(count, peakWidth))
+            if not os.path.isdir(runDir): os.mkdir(runDir)
+            for fileName in ('target_distance.txt', 'true_param_vals.txt'):
+                shutil.copy(os.path.join(EST_DIR, fileName), runDir)
+            estimatorFileNames.append(writeEstimatorFile(QST_NAME, nSamples, samplesPath, count, runDir, peakWidth=peakWidth))
+            runDirs.append(runDir)
+            runs.append((count, peakWidth, os.path.join(runDir, estimator.DEFAULT_OUTPUT_PREFIX + estimator.CHARACTERISTICS_NAME)))
+    callEstimators(estimatorFileNames, runDirs, nCores)
+    estimator.writeSweepTable(os.path.join(sweepDir, estimator.SWEEP_TABLE_NAME), runs, getParamNames(QST_NAME), nSamples)
+
+
+def parseNumbers(text):
+    return [float(x) for x in text.split(',') if x.strip()] if text else None
+
+
+#**********************************************************************#
+def estimateInShards(QST_NAME, nSamples, samplesPath, nShards, nCores):
+    print('Estimating the retained samples in {0} shards, {1} at a time.'.format(nShards, nCores))
+    paths, counts = shards.split(samplesPath, nShards, EST_DIR)
+    shardDirs = [os.path.dirname(path) for path in paths]
+    estimatorFileNames = []
+    for path, count in zip(paths, counts):
+        for fileName in ('target_distance.txt', 'true_param_vals.txt'):
+            shutil.copy(os.path.join(EST_DIR, fileName), os.path.dirname(path))
+        #every shard only holds retained samples
+        estimatorFileNames.append(writeEstimatorFile(QST_NAME, nSamples, path, count, os.path.dirname(path)))
+    callEstimators(estimatorFileNames, shardDirs, nCores)
+    shards.merge(shardDirs, counts, EST_DIR)
+
+
+#**********************************************************************#
+def estimateInGroups(QST_NAME, nSamples, samplesPath, nCores):
+    groups = getParamGroups(QST_NAME, SPLIT_PARAMS)
+    print('Estimating {0} groups of parameters, {1} at a time.'.format(len(groups), nCores))
+    names = getParamNames(QST_NAME)
+    groupDirs, estimatorFileNames = [], []
+    for i, group in enumerate(groups):
+        groupDir = os.path.join(EST_DIR, shards.GROUP_DIR_NAME.format(i))
+        if not os.path.isdir(groupDir): os.mkdir(groupDir)
+        for fileName in ('target_distance.txt', 'true_param_vals.txt'):
+            shutil.copy(os.path.join(EST_DIR, fileName), groupDir)
+        #parameter i is column i+2 of the samples, after Sim
+        columns = [names.index(name) + 2 for name in group]
+        estimatorFileNames.append(writeEstimatorFile(QST_NAME, nSamples, samplesPath, estDir=groupDir, paramColumns=columns))
+        groupDirs.append(groupDir)
+    callEstimators(estimatorFileNames, groupDirs, nCores)
+    shards.mergeGroups(groupDirs, EST_DIR, names)
+
+
+def getParamGroups(QST_NAME, spec):
+    names = getParamNames(QST_NAME)
+    groups = [] if spec == 'each' else [[name.strip() for name in group.split(',') if name.strip()] for group in spec.split(';')]
+    listed = [name for group in groups for name in group]
+    for name in listed:
+        if name not in names: raise Exception('--split-params names the unknown parameter ' + name)
+    if len(set(listed)) != len(listed):
+        raise Exception('--split-params lists a parameter in more than one group.')
+    return [group for group in groups if group] + [[name] for name in names if name not in listed]
+
+
+#**********************************************************************#
+def callEstimators(estimatorFileNames, estDirs, nCores):
+    pool = ThreadPool(max(1, min(nCores, len(estDirs))))
+    try:
+        pool.map(lambda job: callEstimator(*job), zip(estimatorFileNames, estDirs), chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+#**********************************************************************#
+def writeEstimatorFile(QST_NAME, nSamples, samplesPath=None, nRetained=None, estDir=None, paramColumns=None, peakWidth=None):
     replacements = {}
-    replacements['SAMPLES'] = os.path.abspath(SAM_FILE)
-    replacements['N_PARAMS'] = ','.join(map(str, range(2, getNumParams(QST_NAME)+2)))
-    replacements['N_SIMS'] = str(math.pow(10, 8)) #ABCEstimator stops working after ~10^8
-    replacements['N_RETAINED'] = str(round(PERCENT_RETAINED/100.0*nSamples))
+    replacements['SAMPLES'] = os.path.abspath(samplesPath or SAM_FILE)
+    replacements['N_PARAMS'] = ','.join(map(str, paramColumns or range(2, getNumParams(QST_NAME)+2)))
+    replacements['N_SIMS'] = str(float(MAX_ESTIMATOR_SIMS))
+    replacements['N_RETAINED'] = str(nRetained or getNumRetained(nSamples))
 
-    global PEAK_WIDTH
-    if not PEAK_WIDTH:
-        PEAK_WIDTH = 1/float(nSamples)
-        print(PEAK_WIDTH)
-    replacements['PEAK_WIDTH'] = str(PEAK_WIDTH)
+    #PEAK_WIDTH stays None without -p, so that the native estimator can tell
+    replacements['PEAK_WIDTH'] = str(peakWidth or PEAK_WIDTH or 1/float(nSamples))
 
-    inputFilePath = os.path.join(EST_DIR, QST_NAME + 'Estimator.input.txt')
+    inputFilePath = os.path.join(estDir or EST_DIR, QST_NAME + 'Estimator.input.txt')
     writeInputFile(BIN_DIR + '/estimatorTemplate.input.txt', inputFilePath, replacements)
+    if JOINT_POSTERIORS:
+        with open(inputFilePath, 'a') as f:
+            f.write('jointPosteriors ' + JOINT_POSTERIORS + '\n')
     return os.path.basename(inputFilePath)
 
 
@@ -384,10 +1017,15 @@ def getNumParams(QST_NAME):
     return numParams
 
 
+def getParamNames(QST_NAME):
+    with open(os.path.join(SAM_DIR, QST_NAME + '.par'), 'r') as f:
+        return [line.split(':')[0].strip() for line in f if line.strip()]
+
+
 #**********************************************************************#
-def callEstimator(estimatorFileName):
+def callEstimator(estimatorFileName, estDir=None):
     try:
-        subprocess.check_call([BIN_DIR + '/ABCestimator', estimatorFileName], cwd=EST_DIR, stdin=None, stdout=None, stderr=None, shell=False)
+        subprocess.check_call([BIN_DIR + '/ABCestimator', estimatorFileName], cwd=estDir or EST_DIR, stdin=None, stdout=None, stderr=None, shell=False)
     except subprocess.CalledProcessError:
         raise Exception('ABCestimator exited with an error.')
     except OSError:
@@ -395,13 +1033,14 @@ def callEstimator(estimatorFileName):
 
 
 #**********************************************************************#
-def callPlotScript(estimatorFileName):
+def callPlotScript(estimatorFileName, required=True):
     try:
         subprocess.check_call(['Rscript', BIN_DIR + '/plotPosteriorsGLM.r', estimatorFileName], cwd=EST_DIR, stdin=None, stdout=None, stderr=None, shell=False)
     except subprocess.CalledProcessError:
         raise Exception('Rscript exited with an error.')
     except OSError:
-        raise Exception('Rscript was not found. Please confirm that R is installed and that it is in the search PATH.')
+        if required: raise Exception('Rscript was not found. Please confirm that R is installed and that it is in the search PATH.')
+        print('Rscript was not found, skipping the plots.')
 
 
 #**********************************************************************#
@@ -442,17 +1081,40 @@ def htcondorDagFileHeader(QST_NAME):
 #**********************************************************************#
 def htcondorGenerateSampleJobLines(QST_NAME, nCores):
 
+    checkShippedModules('sim.py', HTCONDOR_SIM_FILES)
     inputFiles  = ','.join(listFiles(SAM_DIR)) 
-    inputFiles += ',{0}/sim.py'.format(BIN_DIR)
-    inputFiles += ',{0}/dist.py'.format(BIN_DIR)
-    inputFiles += ',{0}/argparse.py'.format(BIN_DIR)
-    inputFiles += ',{0}/Worker_SSA_SDM'.format(BIN_DIR)
+    for fileName in HTCONDOR_SIM_FILES:
+        inputFiles += ',{0}/{1}'.format(BIN_DIR, fileName)
 
     submitFile = os.path.join(BIN_DIR, 'evolvix_generic_condor.sub')
 
     return htcondorJobSpecificLines(nCores, submitFile, QST_NAME + 'Sampler.input.txt', inputFiles)
 
 
+def checkShippedModules(script, fileNames):
+    #a job dies on its first import of a module of this repo that was not shipped with it
+    missing = sorted(set(localImports(script)) - set(fileNames))
+    if missing:
+        raise Exception('The HTCondor jobs would miss {0}, which {1} imports. Add them to HTCONDOR_SIM_FILES.'.format(', '.join(missing), script))
+
+
+def localImports(script, seen = None):
+    #the modules of this repo that script imports, directly or through each other
+    seen = seen if seen is not None else set()
+    with open(os.path.join(BIN_DIR, script), 'r') as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import): names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level: names = [node.module]
+        else: continue
+        for name in names:
+            fileName = name.split('.')[0] + '.py'
+            if fileName in seen or not os.path.isfile(os.path.join(BIN_DIR, fileName)): continue
+            seen.add(fileName)
+            localImports(fileName, seen)
+    return seen
+
+
 #**********************************************************************#
 def htcondorGenerateEstimateJobLines(QST_NAME):
     return '\nSCRIPT POST Evolvix_PE_Sample /usr/bin/env python {0}/run.py '\
@@ -487,7 +1149,6 @@ def combineSamples():
     if not os.path.isdir(SAM_DIR):
         raise Exception('Cannot find the samples directory: ' + SAM_DIR)
 
-    sampleFiles = {}    
     sampleFileName = 'out.txt_sampling1.txt'
     sampleFiles = [os.path.join(dir,sampleFileName)
                    for dir in listDirs(SAM_DIR)
@@ -499,42 +1160,29 @@ def combineSamples():
                          + ' in the numbered jobs directories. '
                          + 'Did you already combine the samples?')
 
-    #need to copy the header from one of the sample files to the combined file
-    if not os.path.isfile(SAM_FILE):
-        with open(SAM_FILE, 'w') as combinedSamples:
-            with open(sampleFiles[0], 'r') as sampleFile:
-                header = sampleFile.readline()
-                print(header, file=combinedSamples, end='')
-
-    with open(SAM_FILE, 'a') as combinedSamples:
-        for sampleFile in sampleFiles:
-            with open(sampleFile, 'r') as nextFile:
-                nextFile.readline()
-                print(''.join(nextFile.readlines()), file=combinedSamples, end='')
-            print('Done processing ' + os.path.abspath(sampleFile))
+    combine.combine(SAM_FILE, sorted(sampleFiles), COMBINE_JOBS)
+    index = sampleindex.update(SAM_FILE)
+    print('Indexed {0} samples in {1}'.format(index.rows, sampleindex.indexPath(SAM_FILE)))
+    if SAMPLE_STORE:
+        store = samplestore.update(SAM_FILE)
+        print('Updated the sample store {0} ({1} rows)'.format(store.path, store.rows))
     print('Done combining the samples')
 
 
 #**********************************************************************#
 def makeRunDirs(nCores):
-    for i in range(0, nCores) :
-        path = os.path.join(SAM_DIR, str(i))
-        shutil.rmtree(path, ignore_errors = True)
-        os.mkdir(path)
+    rundirs.make(SAM_DIR, nCores)
 
 
 #**********************************************************************#
 def prepRunDirs(nCores):
     srcFiles = listFiles(SAM_DIR)
     
-    try: srcFiles.remove(SAM_FILE)
-    except ValueError: pass
+    for path in (SAM_FILE, SAM_FILE + combine.MANIFEST_SUFFIX):
+        try: srcFiles.remove(path)
+        except ValueError: pass
     
-    for i in range(nCores) :
-        runDir = os.path.join(SAM_DIR, str(i))
-        if not os.path.exists(runDir): os.mkdir(runDir)
-        for f in srcFiles:
-            shutil.copy(f, runDir)
+    rundirs.populate(SAM_DIR, srcFiles, nCores)
 
 #**********************************************************************#
 def writeInputFile(templateFilePath, inputFilePath, replacements):
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#
+#  @file  rundirs.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# Run directories for the local samplers. Every core gets a numbered
+# directory under the sample directory with the files that ABCsampler and
+# sim.py look for in their working directory. Instead of a copy of every
+# file per core, populate() copies the files once into a read-only
+# directory and fills the run directories with hard links to it, falling
+# back to symbolic links and then to copies where the file system has no
+# hard links. The files are read-only so that a worker writing to one of
+# them fails instead of changing it for all the other cores.
+#
+# The directories are set up by a pool of threads, the file system calls
+# spend most of their time outside of the interpreter lock.
+#**********************************************************************#
+from __future__ import print_function
+import os
+import stat
+import shutil
+from multiprocessing.pool import ThreadPool
+
+SHARED_DIR_NAME = 'runfiles'
+JOBS = 16
+READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+#**********************************************************************#
+def populate(samDir, srcFiles, nCores, jobs=JOBS):
+    #links srcFiles into the run directories 0 .. nCores - 1 of samDir
+    sharedDir = os.path.join(samDir, SHARED_DIR_NAME)
+    shutil.rmtree(sharedDir, ignore_errors=True)
+    os.mkdir(sharedDir)
+    for path in srcFiles:
+        sharedPath = os.path.join(sharedDir, os.path.basename(path))
+        shutil.copy(path, sharedPath)
+        #keep the execute bits of the worker binaries
+        os.chmod(sharedPath, os.stat(sharedPath).st_mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH) | READ_ONLY)
+
+    names = [os.path.basename(path) for path in srcFiles]
+    def populateRunDir(i):
+        runDir = os.path.join(samDir, str(i))
+        if not os.path.isdir(runDir): os.mkdir(runDir)
+        for name in names:
+            linkFile(os.path.join(sharedDir, name), os.path.join(runDir, name))
+    forEachCore(populateRunDir, nCores, jobs)
+
+
+def make(samDir, nCores, jobs=JOBS):
+    #empty run directories, the files come with the HTCondor jobs
+    def makeRunDir(i):
+        path = os.path.join(samDir, str(i))
+        shutil.rmtree(path, ignore_errors=True)
+        os.mkdir(path)
+    forEachCore(makeRunDir, nCores, jobs)
+
+
+#**********************************************************************#
+def linkFile(src, dst):
+    #the destination may still be a link to the files of an earlier run
+    if os.path.lexists(dst): os.remove(dst)
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    try:
+        os.symlink(os.path.relpath(src, os.path.dirname(dst)), dst)
+        return
+    except OSError:
+        pass
+    shutil.copy(src, dst)
+
+
+def forEachCore(func, nCores, jobs):
+    if nCores <= 1 or jobs <= 1:
+        for i in range(nCores): func(i)
+        return
+    pool = ThreadPool(min(jobs, nCores))
+    try:
+        #consume the results so that exceptions of the threads are raised here
+        for result in pool.imap_unordered(func, range(nCores), chunksize=max(1, nCores // (4 * jobs))):
+            pass
+    finally:
+        pool.close()
+        pool.join()
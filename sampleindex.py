@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+#
+#  @file  sampleindex.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# Row index of samples.txt. combineSamples() in run.py keeps samples.idx
+# next to samples.txt up to date, so the rows can be counted without
+# reading samples.txt and any row can be read after skipping at most
+# STRIDE - 1 lines.
+#
+# Layout: a magic line, the stride, the number of indexed rows, the number
+# of bytes of samples.txt they take up and the sha1 of the first (at most
+# IDENTITY_BYTES) of those bytes, followed by the byte offset of every
+# STRIDE-th row, all little endian. Rows are numbered from 0 and do not
+# include the header line.
+#
+#     ./sampleindex.py samples.txt --random 1000 --seed 1 > subset.txt
+#**********************************************************************#
+from __future__ import print_function
+import os
+import sys
+import struct
+import random
+import hashlib
+import argparse
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b'EVXIDX1\n'
+HEADER = struct.Struct('<QQQ20s')
+HEADER_SIZE = len(MAGIC) + HEADER.size
+INDEX_SUFFIX = '.idx'
+STRIDE = 1024
+CHUNK_SIZE = 16 * 1024 * 1024
+IDENTITY_BYTES = 4096
+
+
+#**********************************************************************#
+def main():
+    args = parseArgs()
+    index = openIndex(args.samples) or update(args.samples)
+    if args.count:
+        print(index.rows)
+        return
+    with open(args.samples, 'r') as f:
+        sys.stdout.write(f.readline())
+    if args.random is not None:
+        lines = index.randomRows(args.random, random.Random(args.seed))
+    else:
+        start, _, stop = (args.rows or ':').partition(':')
+        lines = index.readRows(int(start or 0), int(stop) if stop else index.rows)
+    for line in lines: sys.stdout.write(line)
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Count or read rows of a samples file through its index.',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('samples', type=str, help='Path of the samples file')
+    parser.add_argument('--count', help='Print the number of rows.', action='store_true')
+    parser.add_argument('--rows', type=str, help='Print the rows START:STOP (numbered from 0, STOP excluded).')
+    parser.add_argument('--random', type=int, help='Print this many rows drawn at random without replacement.')
+    parser.add_argument('--seed', type=int, help='Seed of --random.')
+    return parser.parse_args()
+
+
+#**********************************************************************#
+class RowIndex(object):
+
+    def __init__(self, samFile, stride, rows, offsets):
+        self.samFile = samFile
+        self.stride = stride
+        self.rows = rows
+        self.offsets = offsets
+
+    def seek(self, f, row):
+        #positions the binary file f at the start of the row
+        if not 0 <= row < self.rows:
+            raise Exception('Row {0} is out of range, {1} has {2} rows.'.format(row, self.samFile, self.rows))
+        f.seek(self.offsets[row // self.stride])
+        for i in range(row % self.stride): f.readline()
+
+    def readRows(self, start, stop):
+        stop = min(stop, self.rows)
+        if start >= stop: return []
+        with open(self.samFile, 'rb') as f:
+            self.seek(f, start)
+            return [f.readline().decode() for row in range(start, stop)]
+
+    def randomRows(self, k, rng=random):
+        #rows in file order, reading forward instead of seeking when the next row is close
+        rows = sorted(rng.sample(range(self.rows), min(k, self.rows)))
+        lines = []
+        with open(self.samFile, 'rb') as f:
+            at = None
+            for row in rows:
+                if at is None or not 0 <= row - at < self.stride:
+                    self.seek(f, row)
+                else:
+                    for i in range(row - at): f.readline()
+                lines.append(f.readline().decode())
+                at = row + 1
+        return lines
+
+
+#**********************************************************************#
+def indexPath(samFile):
+    return os.path.splitext(samFile)[0] + INDEX_SUFFIX
+
+
+def rowCount(samFile):
+    index = openIndex(samFile)
+    if index is not None: return index.rows
+    with open(samFile, 'rb') as f:
+        f.readline() #skip the header
+        return sum(1 for line in f)
+
+
+def openIndex(samFile):
+    #returns the index of samFile, or None if there is none or it is out of date
+    header = readHeader(indexPath(samFile))
+    if header is None or not os.path.isfile(samFile): return None
+    stride, rows, textSize, digest, offsets = header
+    if textSize != os.path.getsize(samFile) or digest != identity(samFile, textSize): return None
+    return RowIndex(samFile, stride, rows, offsets)
+
+
+def update(samFile):
+    #indexes the rows added to samFile since the last update, or indexes it anew
+    path = indexPath(samFile)
+    header = readHeader(path)
+    with open(samFile, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if header is None or header[0] != STRIDE or header[2] > size or header[3] != identity(samFile, header[2]):
+            header = (STRIDE, 0, len(f.readline()), None, array('Q'))
+        stride, rows, textSize, digest, offsets = header
+        while True:
+            f.seek(textSize)
+            newlines = newlinePositions(f.read(CHUNK_SIZE))
+            #only complete rows are indexed, the rest is read again next time
+            if not len(newlines): break
+            for i in range((stride - rows % stride) % stride, len(newlines), stride):
+                offsets.append(textSize + (int(newlines[i - 1]) + 1 if i else 0))
+            rows += len(newlines)
+            textSize += int(newlines[-1]) + 1
+
+    writeIndex(path, (stride, rows, textSize, identity(samFile, textSize), offsets))
+    return RowIndex(samFile, stride, rows, offsets)
+
+
+def newlinePositions(chunk):
+    if numpy is not None:
+        return numpy.flatnonzero(numpy.frombuffer(chunk, dtype=numpy.uint8) == ord('\n'))
+    positions = []
+    position = chunk.find(b'\n')
+    while position >= 0:
+        positions.append(position)
+        position = chunk.find(b'\n', position + 1)
+    return positions
+
+
+def identity(samFile, size):
+    with open(samFile, 'rb') as f:
+        return hashlib.sha1(f.read(min(size, IDENTITY_BYTES))).digest()
+
+
+#**********************************************************************#
+def readHeader(path):
+    if not os.path.isfile(path): return None
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC: return None
+        stride, rows, textSize, digest = HEADER.unpack(f.read(HEADER.size))
+        offsets = array('Q')
+        nOffsets = (rows + stride - 1) // stride
+        offsets.frombytes(f.read(8 * nOffsets))
+    if len(offsets) != nOffsets: return None
+    if sys.byteorder == 'big': offsets.byteswap()
+    return stride, rows, textSize, digest, offsets
+
+
+def writeIndex(path, header):
+    stride, rows, textSize, digest, offsets = header
+    if sys.byteorder == 'big':
+        offsets = array('Q', offsets)
+        offsets.byteswap()
+    with open(path + '.tmp', 'wb') as f:
+        f.write(MAGIC)
+        f.write(HEADER.pack(stride, rows, textSize, digest))
+        f.write(offsets.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(path + '.tmp', path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+#
+#  @file  sampler.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+#/////////////////////////////////////////////////////////////////////////////
+
+#**********************************************************************#
+# A rejection sampler that runs inside run.py instead of ABCsampler.
+# Parameters are drawn from <quest>Priors.est in the main process (see
+# priors.PriorSampler for the sampling modes) and handed out in batches to
+# a pool of persistent worker processes, one per core. Each worker keeps
+# sim.py loaded, runs in its own numbered run directory and appends its
+# rows to out.txt_sampling1.txt there, which is the file combineSamples()
+# in run.py collects. Complex parameters are passed to the simulations and
+# written to the samples after the priors. The same pool of workers also runs
+# the simulations of the other samplers (see smc.py).
+#**********************************************************************#
+from __future__ import print_function
+import os
+import random
+import multiprocessing
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import priors
+import sim
+
+SAMPLE_FILE_NAME = 'out.txt_sampling1.txt'
+DEFAULT_BATCH_SIZE = 50
+DRAW_CHUNK_SIZE = 100000
+WORKER_CHECK_INTERVAL = 1.0   #seconds between checks for workers that died
+WORKER_START_TIMEOUT = 10.0   #seconds a new worker waits for a free run directory
+
+WORKER_PRIORS = None
+WORKER_OUT = None
+WORKER_LOST = None
+
+
+#**********************************************************************#
+def run(questName, priorsPath, nSims, nCores, samDir, simArgs, batchSize=None, seed=None, mode='random'):
+    priorList, rules, complexParams = priors.readPriorFile(priorsPath)
+    batchSize = batchSize or defaultBatchSize(nSims, nCores)
+    pool = startPool(nCores, samDir, priorList + complexParams, simArgs)
+    try:
+        done = 0
+        nextReport = nSims / 10.0
+        batches = drawBatches(priorList, rules, complexParams, nSims, batchSize, mode, seed)
+        for n in checkedResults(pool, pool.imap_unordered(simulateBatch, batches)):
+            done += n
+            if done >= nextReport:
+                print('Finished {0} of {1} simulations.'.format(done, nSims))
+                nextReport += nSims / 10.0
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def defaultBatchSize(nSims, nCores):
+    #small enough that all cores finish at about the same time
+    return max(1, min(DEFAULT_BATCH_SIZE, nSims // (10 * nCores)))
+
+
+def drawBatches(priorList, rules, complexParams, nSims, batchSize, mode='random', seed=None):
+    columns = priorList + complexParams
+    if priors.numpy is None and mode == 'random' and not rules and not complexParams:
+        rng = random.Random(seed)
+        chunks = ([priors.drawParams(priorList, rng) for i in range(start, min(start + DRAW_CHUNK_SIZE, nSims))]
+                  for start in range(0, nSims, DRAW_CHUNK_SIZE))
+    else:
+        priorSampler = priors.PriorSampler(priorList, rules, complexParams, mode, seed)
+        #every chunk of lhs draws is its own Latin hypercube, a design over all
+        #of -n would have to be held in memory at once
+        chunks = (priorSampler.draw(min(DRAW_CHUNK_SIZE, nSims - start)) for start in range(0, nSims, DRAW_CHUNK_SIZE))
+
+    simIndex = 0
+    for chunk in chunks:
+        for start in range(0, len(chunk), batchSize):
+            batch = []
+            for values in chunk[start:start + batchSize]:
+                simIndex += 1
+                batch.append((simIndex, [column.format(value) for column, value in zip(columns, values)]))
+            yield batch
+
+
+#**********************************************************************#
+def startPool(nCores, samDir, priorList, simArgs):
+    #one worker per numbered run directory in samDir
+    runDirs = multiprocessing.Queue()
+    for i in range(nCores):
+        runDirs.put(os.path.join(samDir, str(i)))
+    workerLost = multiprocessing.Event()
+    pool = multiprocessing.Pool(nCores, initWorker, (runDirs, workerLost, priorList, simArgs))
+    pool.workerLost = workerLost
+    return pool
+
+
+def checkedResults(pool, results):
+    #the results of pool.imap(_unordered), but the task of a worker that died
+    #never finishes, so fail instead of waiting for it forever
+    while True:
+        try:
+            yield results.next(WORKER_CHECK_INTERVAL)
+        except StopIteration:
+            return
+        except multiprocessing.TimeoutError:
+            if pool.workerLost.is_set():
+                raise Exception('A simulation worker died (e.g. a simulation crashed or ran out of memory), stopping the run.')
+
+
+def simulateAll(pool, priorList, valuesList, batchSize=DEFAULT_BATCH_SIZE):
+    #returns the distances of the parameter vectors in valuesList, in order
+    formatted = [[prior.format(value) for prior, value in zip(priorList, values)] for values in valuesList]
+    indexed = list(enumerate(formatted))
+    batches = [indexed[start:start + batchSize] for start in range(0, len(indexed), batchSize)]
+    distances = [None] * len(formatted)
+    for results in checkedResults(pool, pool.imap_unordered(simulateParams, batches)):
+        for index, dist in results:
+            distances[index] = dist
+    return distances
+
+
+#**********************************************************************#
+def initWorker(runDirs, workerLost, priorList, simArgs):
+    global WORKER_PRIORS, WORKER_LOST
+    try:
+        os.chdir(runDirs.get(timeout=WORKER_START_TIMEOUT))
+    except queue.Empty:
+        #the pool only starts more workers than run directories to replace one that died
+        workerLost.set()
+        WORKER_LOST = True
+        return
+    sim.configure(sim.parseArgs(simArgs))
+    sim.getObsData()
+    WORKER_PRIORS = priorList
+
+
+def checkWorker():
+    if WORKER_LOST: raise Exception('A simulation worker died (e.g. a simulation crashed or ran out of memory), stopping the run.')
+
+
+def simulateParams(batch):
+    checkWorker()
+    return [(index, sim.simulate([(prior.name, value) for prior, value in zip(WORKER_PRIORS, values)]))
+            for index, values in batch]
+
+
+def simulateBatch(batch):
+    global WORKER_OUT
+    checkWorker()
+    if WORKER_OUT is None:
+        WORKER_OUT = open(SAMPLE_FILE_NAME, 'w')
+        WORKER_OUT.write('\t'.join(['Sim'] + [prior.name for prior in WORKER_PRIORS] + sim.statNames()) + '\n')
+    for simIndex, values in batch:
+        params = [(prior.name, value) for prior, value in zip(WORKER_PRIORS, values)]
+        dists = sim.simulateDistances(params)
+        WORKER_OUT.write('\t'.join([str(simIndex)] + values + ['%.10f' % d for d in dists]) + '\n')
+    WORKER_OUT.flush()
+    return len(batch)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+#
+#  @file  samplestore.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# A columnar copy of samples.txt, so that run.py and the samplers can get
+# at the row count or a column of the samples without parsing the text.
+# The store is a directory next to samples.txt (samples.cols) holding one
+# file of little-endian float64 values per column and header.json with
+# the column names, the number of rows and how many bytes of samples.txt
+# the store holds. update() appends the rows combine.py added to
+# samples.txt since the last update and openStore() hands out read-only
+# memory-mapped views of the columns.
+#**********************************************************************#
+from __future__ import print_function
+import os
+import io
+import json
+import hashlib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+STORE_SUFFIX = '.cols'
+HEADER_NAME = 'header.json'
+DTYPE = '<f8'
+CHUNK_SIZE = 16 * 1024 * 1024
+IDENTITY_BYTES = 4096
+
+
+class SampleStore(object):
+
+    def __init__(self, path, header):
+        self.path = path
+        self.columns = header['columns']
+        self.rows = header['rows']
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def column(self, name):
+        if name not in self.columns:
+            raise Exception('The sample store {0} has no column {1}.'.format(self.path, name))
+        if self.rows == 0: return numpy.zeros(0, dtype=DTYPE)
+        return numpy.memmap(columnPath(self.path, self.columns.index(name)), dtype=DTYPE, mode='r', shape=(self.rows,))
+
+
+#**********************************************************************#
+def storePath(samFile):
+    return os.path.splitext(samFile)[0] + STORE_SUFFIX
+
+
+def columnPath(path, index):
+    return os.path.join(path, '{0}.f8'.format(index))
+
+
+def openStore(samFile):
+    #returns the store of samFile, or None if there is none or it is out of date
+    if numpy is None: return None
+    path = storePath(samFile)
+    header = readHeader(path)
+    if header is None or not os.path.isfile(samFile): return None
+    if header['textSize'] != os.path.getsize(samFile) or header['identity'] != identity(samFile, header['textSize']):
+        return None
+    return SampleStore(path, header)
+
+
+def readColumn(samFile, name):
+    #the column from the store if it is up to date, parsed from the text otherwise
+    store = openStore(samFile)
+    if store is not None and name in store: return store.column(name)
+    with open(samFile, 'r') as f:
+        header = f.readline().split()
+        if name not in header:
+            raise Exception('The samples {0} have no column {1}.'.format(samFile, name))
+        index = header.index(name)
+        values = [float(line.split()[index]) for line in f if line.strip()]
+    return numpy.array(values) if numpy is not None else values
+
+
+#**********************************************************************#
+def update(samFile):
+    #appends the rows added to samFile since the last update, or builds the store anew
+    if numpy is None:
+        raise Exception('The sample store needs numpy.')
+    path = storePath(samFile)
+    if not os.path.isdir(path): os.mkdir(path)
+    with open(samFile, 'rb') as f:
+        headerLine = f.readline()
+        columns = headerLine.decode().split()
+        size = os.fstat(f.fileno()).st_size
+        header = readHeader(path)
+        if (header is None or header['columns'] != columns or header['textSize'] > size
+                or header['identity'] != identity(samFile, header['textSize'])):
+            header = {'columns': columns, 'rows': 0, 'textSize': len(headerLine)}
+        f.seek(header['textSize'])
+
+        outs = [open(columnPath(path, i), 'ab') for i in range(len(columns))]
+        try:
+            #drops rows that an unfinished update appended after the header was written
+            for out in outs: out.truncate(header['rows'] * 8)
+            rest = b''
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk: break
+                chunk = rest + chunk
+                end = chunk.rfind(b'\n') + 1
+                rest = chunk[end:]
+                rows = parseRows(chunk[:end], len(columns), samFile)
+                for i, out in enumerate(outs): out.write(numpy.ascontiguousarray(rows[:, i], dtype=DTYPE).tobytes())
+                header['rows'] += len(rows)
+                header['textSize'] += end
+            for out in outs:
+                out.flush()
+                os.fsync(out.fileno())
+        finally:
+            for out in outs: out.close()
+
+    header['identity'] = identity(samFile, header['textSize'])
+    writeHeader(path, header)
+    return SampleStore(path, header)
+
+
+def parseRows(text, nColumns, samFile):
+    if not text.strip(): return numpy.zeros((0, nColumns))
+    rows = numpy.loadtxt(io.BytesIO(text), dtype=float, ndmin=2)
+    if rows.shape[1] != nColumns:
+        raise Exception('The rows of {0} do not have {1} columns.'.format(samFile, nColumns))
+    return rows
+
+
+def identity(samFile, size):
+    with open(samFile, 'rb') as f:
+        return hashlib.sha1(f.read(min(size, IDENTITY_BYTES))).hexdigest()
+
+
+#**********************************************************************#
+def readHeader(path):
+    headerPath = os.path.join(path, HEADER_NAME)
+    if not os.path.isfile(headerPath): return None
+    with open(headerPath, 'r') as f:
+        return json.load(f)
+
+
+def writeHeader(path, header):
+    headerPath = os.path.join(path, HEADER_NAME)
+    with open(headerPath + '.tmp', 'w') as f:
+        f.write(json.dumps(header, indent=1, sort_keys=True))
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(headerPath + '.tmp', headerPath)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+#
+#  @file  shards.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# Estimation of reference tables that are too large for one ABCestimator
+# run. The retained samples (see prefilter.py) are dealt out row by row to
+# shards small enough for ABCestimator. Because the samples of a run are
+# exchangeable, every shard is a random subsample of the retained samples
+# and its ABCestimator run estimates the same posterior. run.py estimates
+# the shards in parallel and merge() combines their outputs:
+#
+#  - the *BestSimsParamStats* files (the retained samples) are concatenated
+#  - the *MarginalPosteriorDensities* files are averaged, weighted by the
+#    number of samples of every shard, on a grid spanning the grids of all
+#    shards and renormalized
+#
+# The other outputs (posterior characteristics, model fit and p-values)
+# are left in the shard directories.
+#
+# The parameters can also be split into groups that are estimated by
+# separate ABCestimator runs on the same samples. Each group gets its own
+# regression, so parameters in different groups are modelled as if they
+# did not influence the distance together. mergeGroups() joins the output
+# tables of the groups column by column into the layout of a single run.
+#**********************************************************************#
+from __future__ import print_function
+import os
+import glob
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SHARD_DIR_NAME = 'shard{0}'
+GROUP_DIR_NAME = 'group{0}'
+RETAINED_PATTERN = '*BestSimsParamStats*.txt'
+DENSITIES_PATTERN = '*MarginalPosteriorDensities*.txt'
+
+
+#**********************************************************************#
+def split(samplesPath, nShards, outDir):
+    #deals the rows out round robin, returns the paths and row counts of the shards
+    paths = [os.path.join(outDir, SHARD_DIR_NAME.format(i), os.path.basename(samplesPath)) for i in range(nShards)]
+    counts = [0] * nShards
+    outs = []
+    try:
+        for path in paths:
+            if not os.path.isdir(os.path.dirname(path)): os.mkdir(os.path.dirname(path))
+            outs.append(open(path, 'wb'))
+        with open(samplesPath, 'rb') as f:
+            header = f.readline()
+            for out in outs: out.write(header)
+            for i, line in enumerate(f):
+                outs[i % nShards].write(line)
+                counts[i % nShards] += 1
+    finally:
+        for out in outs: out.close()
+    return paths, counts
+
+
+#**********************************************************************#
+def merge(shardDirs, weights, outDir):
+    if numpy is None:
+        raise Exception('Merging the estimates of the shards needs numpy.')
+    for name in outputNames(shardDirs, RETAINED_PATTERN):
+        mergeRetained([os.path.join(d, name) for d in shardDirs], os.path.join(outDir, name))
+    for name in outputNames(shardDirs, DENSITIES_PATTERN):
+        mergeDensities([os.path.join(d, name) for d in shardDirs], weights, os.path.join(outDir, name))
+
+
+def outputNames(shardDirs, pattern):
+    names = [set(os.path.basename(p) for p in glob.glob(os.path.join(d, pattern))) for d in shardDirs]
+    missing = set.union(*names) - set.intersection(*names)
+    if missing:
+        raise Exception('Not every shard wrote ' + ', '.join(sorted(missing)))
+    return sorted(names[0])
+
+
+def mergeRetained(paths, outPath):
+    with open(outPath, 'wb') as out:
+        for i, path in enumerate(paths):
+            with open(path, 'rb') as f:
+                header = f.readline()
+                if i == 0: out.write(header)
+                for line in f: out.write(line)
+
+
+def mergeDensities(paths, weights, outPath):
+    #each file has a number column and then a value and a value.density column per parameter
+    tables = [readTable(path) for path in paths]
+    header = tables[0][0]
+    if any(t[0] != header for t in tables):
+        raise Exception('The shards estimated different parameters: ' + ', '.join(paths))
+    nPoints = len(tables[0][1])
+    weights = numpy.asarray(weights, dtype=float) / sum(weights)
+    merged = numpy.zeros((nPoints, len(header)))
+    merged[:, 0] = numpy.arange(nPoints)
+    for j, name in enumerate(header):
+        if not name.endswith('.density'): continue
+        grids = [t[1][:, j - 1] for t in tables]
+        grid = numpy.linspace(min(g[0] for g in grids), max(g[-1] for g in grids), nPoints)
+        density = sum(w * numpy.interp(grid, g, t[1][:, j], left=0, right=0) for w, g, t in zip(weights, grids, tables))
+        area = numpy.trapezoid(density, grid) if hasattr(numpy, 'trapezoid') else numpy.trapz(density, grid)
+        merged[:, j - 1] = grid
+        merged[:, j] = density / area if area > 0 else density
+    with open(outPath, 'w') as out:
+        out.write('\t'.join(header) + '\n')
+        for row in merged:
+            out.write('\t'.join([str(int(row[0]))] + [repr(float(x)) for x in row[1:]]) + '\n')
+
+
+def readTable(path):
+    with open(path, 'r') as f:
+        header = f.readline().split()
+        rows = [[float(x) for x in line.split()] for line in f if line.strip()]
+    return header, numpy.array(rows).reshape(-1, len(header))
+
+
+#**********************************************************************#
+def mergeGroups(groupDirs, outDir, paramNames):
+    #every run retains the same samples, so the rows of their tables line up
+    for name in outputNames(groupDirs, '*.txt'):
+        if not name.startswith('ABC_'): continue
+        paths = [os.path.join(d, name) for d in groupDirs]
+        tables = [readRows(path) for path in paths]
+        if all(t == tables[0] for t in tables):
+            joined = tables[0]
+        else:
+            joined = orderColumns(joinColumns(tables, paths), paramNames)
+        with open(os.path.join(outDir, name), 'w') as out:
+            for row in joined: out.write('\t'.join(row) + '\n')
+
+
+def readRows(path):
+    with open(path, 'r') as f:
+        return [line.split() for line in f if line.strip()]
+
+
+def joinColumns(tables, paths):
+    #appends the columns of every table that are not in the tables before it
+    header = list(tables[0][0])
+    rows = [list(row) for row in tables[0][1:]]
+    for table, path in zip(tables[1:], paths[1:]):
+        if len(table) != len(tables[0]):
+            raise Exception('{0} does not have as many rows as {1}.'.format(path, paths[0]))
+        for key in ('Sim', 'number'):
+            if key in header and key in table[0]:
+                a, b = header.index(key), table[0].index(key)
+                if any(row[a] != other[b] for row, other in zip(rows, table[1:])):
+                    raise Exception('The rows of {0} do not match the rows of {1}.'.format(path, paths[0]))
+        new = [j for j, name in enumerate(table[0]) if name not in header]
+        header += [table[0][j] for j in new]
+        for row, other in zip(rows, table[1:]): row.extend(other[j] for j in new)
+    return [header] + rows
+
+
+def orderColumns(table, paramNames):
+    #puts the columns of all parameters, in the order of paramNames, where the first of them is
+    def rank(name):
+        for i, param in enumerate(paramNames):
+            if name == param or name.startswith(param + '.') or name.startswith(param + '_'): return i
+        return None
+    header = table[0]
+    params = sorted([j for j, name in enumerate(header) if rank(name) is not None], key=lambda j: (rank(header[j]), j))
+    if not params: return table
+    others = [j for j in range(len(header)) if rank(header[j]) is None]
+    first = min(params)
+    order = [j for j in others if j < first] + params + [j for j in others if j > first]
+    return [[row[j] for j in order] for row in table]
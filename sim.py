@@ -41,75 +41,252 @@ import os
 import sys
 import glob
 import argparse
+import subprocess
+import threading
+from array import array
 import dist
+import obscache
+import stream
+import trajbank
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 BIN_DIR = os.path.dirname(os.path.abspath(__file__))
 QST_DIR = None
 QUEST_NAME = None
 DIST_FUNC = None
+DIST_NAME = None
+DIST_NAMES = []         #further distances of the same trajectory, see --distances
+DIST_COLUMN = 'myDist'
+OBS_DATA = None
+OBS_DENOMINATORS = None
+STREAM = False
+REJECT_THRESHOLD_FILE = None
+DISTANCE_LOG = None
+TRAJECTORY_BANK = None
 
 def main():
     args = parseArgs()
+    QST_DIR = '{0}/Quests/{1}'.format(os.path.abspath(BIN_DIR + '/..'), args.quest)
+    configure(args)
+
+    writeSummaryStats(simulateDistances(readParams()))
+
+def configure(args):
+    #also used by the long-lived callers, simserver.py and sampler.py
     global QUEST_NAME
+    global STREAM
+    global REJECT_THRESHOLD_FILE
+    global DISTANCE_LOG
+    global DIST_NAMES
+    global TRAJECTORY_BANK
     QUEST_NAME = args.quest
-    QST_DIR = '{0}/Quests/{1}'.format(os.path.abspath(BIN_DIR + '/..'), QUEST_NAME)
-
     setDistanceFunc(args.distance)
+    STREAM = args.stream
+    REJECT_THRESHOLD_FILE = args.reject_threshold_file
+    DISTANCE_LOG = args.distance_log
+    DIST_NAMES = parseDistanceNames(args.distances)
+    TRAJECTORY_BANK = args.trajectory_bank
+    if TRAJECTORY_BANK and not os.path.isdir(TRAJECTORY_BANK):
+        #other workers may be creating it at the same time
+        try: os.makedirs(TRAJECTORY_BANK)
+        except OSError:
+            if not os.path.isdir(TRAJECTORY_BANK): raise
+    if DIST_NAMES and REJECT_THRESHOLD_FILE:
+        raise Exception('--distances can not be used with --reject-threshold-file, a rejected simulation only has a bound on its --distance.')
 
-    paramsArg = getParamsArg()
-    if os.path.isfile('Worker_SSA_SDM'):
-        workerPath = './Worker_SSA_SDM'
+def simulate(params):
+    return simulateDistances(params)[0]
+
+def simulateDistances(params):
+    #the --distance of the simulation followed by its --distances
+    paramsArg = getParamsArg(params)
+    obsData = getObsData()
+    threshold = getRejectThreshold()
+    if STREAM or threshold is not None:
+        simData, lowerBound = streamWorker(paramsArg, threshold)
     else:
-        workerPath = BIN_DIR + '/Worker_SSA_SDM'
- 
-    os.system('{0} {1}Quest.epb {2} >> /dev/null'.format(workerPath, QUEST_NAME, paramsArg))
+        stream.removePipes()
+        runWorker(paramsArg)
+        simData, lowerBound = getData(glob.glob('TS*.txt')), None
+    #a simulation stopped early is reported with the distance it had
+    #reached, which is a lower bound of the distance it would have had
+    if lowerBound is not None: dists = [lowerBound]
+    else:                      dists = getDists(obsData, simData, [DIST_NAME] + DIST_NAMES, OBS_DENOMINATORS)
+    if DISTANCE_LOG: logDistance(dists[0], lowerBound is not None)
+    #only complete trajectories, every run directory into its own chunks
+    if TRAJECTORY_BANK and lowerBound is None:
+        trajbank.append(TRAJECTORY_BANK, os.path.basename(os.getcwd()), params, simData)
+    return dists
+
+def getRejectThreshold():
+    #read for every simulation because run.py may update it during the run
+    if not REJECT_THRESHOLD_FILE: return None
+    try:
+        with open(REJECT_THRESHOLD_FILE, 'r') as f:
+            return float(f.read())
+    except (IOError, ValueError):
+        return None
+
+def logDistance(dist, rejected=False):
+    #the lower bounds of rejected simulations are marked with a leading >
+    with open(DISTANCE_LOG, 'a') as f:
+        f.write('%s%.10f\n' % ('>' if rejected else '', dist))
+
+def runWorker(paramsArg):
+    os.system('{0} {1}Quest.epb {2} >> /dev/null'.format(getWorkerPath(), QUEST_NAME, paramsArg))
+
+def streamWorker(paramsArg, threshold=None):
+    paths = stream.preparePipes()
+    if not paths:
+        #first simulation in this directory, it tells us the file names
+        runWorker(paramsArg)
+        return getData(glob.glob('TS*.txt')), None
+
+    #with a threshold the worker is killed as soon as the distance of the
+    #rows seen so far can no longer get below it
+    partial = None
+    if threshold is not None:
+        partial = dist.PartialDistance(DIST_NAME, getObsData(), OBS_DENOMINATORS)
+    lock = threading.Lock()
+    state = {'worker': None, 'rejected': False}
+    def onRow(pipe, rowIndex, row):
+        with lock:
+            if state['rejected']: return
+            partial.addRow(rowIndex, pipe.headers, row)
+            if partial.lowerBound() > threshold:
+                state['rejected'] = True
+                state['worker'].kill()
+
+    pipes = []
+    try:
+        pipes = [stream.TimeSeriesPipe(path, onRow if partial else None) for path in paths]
+        with open(os.devnull, 'w') as devnull:
+            with lock:
+                state['worker'] = subprocess.Popen([getWorkerPath(), QUEST_NAME + 'Quest.epb'] + paramsArg.split(), stdout=devnull)
+            state['worker'].wait()
+    finally:
+        worker = state['worker']
+        if worker and worker.poll() is None: worker.kill()
+        for pipe in pipes: pipe.finish()
+    if state['rejected']: return None, partial.lowerBound()
+
+    simData = {}
+    for pipe in pipes:
+        if pipe.headers: mergeData(simData, toColumns(pipe.headers, pipe.values, pipe.path))
+    #in case the worker replaced a fifo by a regular file
+    files = stream.regularFiles()
+    if files: mergeData(simData, getData(files))
+    return simData, None
 
-    obsData = getData([QUEST_NAME + 'Data.txt'])
-    simData = getData(glob.glob('TS*.txt'))
-    dist = getDist(obsData, simData)
+def getWorkerPath():
+    if os.path.isfile('Worker_SSA_SDM'):
+        return './Worker_SSA_SDM'
+    return BIN_DIR + '/Worker_SSA_SDM'
+
+def getObsData():
+    #the observed data never changes during a run, so long-lived callers
+    #(see simserver.py) only pay for loading it once
+    global OBS_DATA
+    global OBS_DENOMINATORS
+    if OBS_DATA is None:
+        dataPath = QUEST_NAME + 'Data.txt'
+        cached = obscache.loadCache(dataPath)
+        if cached: OBS_DATA, OBS_DENOMINATORS = cached
+        else:      OBS_DATA = getData([dataPath])
+    return OBS_DATA
+
+def statNames():
+    return [DIST_COLUMN] + [distanceColumn(name) for name in DIST_NAMES]
+
+def distanceColumn(funcName):
+    #column of a --distances distance in the samples
+    return '{0}_{1}'.format(DIST_COLUMN, funcName)
+
+def writeSummaryStats(dists):
     with open('summary_stats_temp.txt', 'w') as f:
-        print('myDist\n%.10f\n' % dist, file=f)
+        print('\t'.join(statNames()), file=f)
+        print('\t'.join('%.10f' % d for d in dists) + '\n', file=f)
 
-def parseArgs():
+def parseArgs(argv=None):
     parser = argparse.ArgumentParser(description='Run a simulation.',
                                      formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('quest', type=str, help='Name of the Quest.')
     parser.add_argument('--distance', type=str, help='Distance to use. Options: ' \
                         + (', ').join(dist.distFuncs.keys()), default='L2')
-    return parser.parse_args()
+    parser.add_argument('--stream', help='Read the time series through named pipes instead of TS*.txt files.', action='store_true')
+    parser.add_argument('--reject-threshold-file', type=str, help='File holding a distance threshold. Simulations are stopped as soon as their distance is known to exceed it. Implies --stream.')
+    parser.add_argument('--distance-log', type=str, help='Append the distance of every simulation to this file, '
+                        'the lower bounds of simulations stopped early with a leading >.')
+    parser.add_argument('--distances', type=str, help='Comma separated distances, or all, to compute from the same trajectory as well. '
+                        'They are written as the summary statistics myDist_<name> after myDist.')
+    parser.add_argument('--trajectory-bank', type=str, help='Keep the trajectory of every complete simulation in this directory, see trajbank.py and rescore.py.')
+    return parser.parse_args(argv)
 
-def getParamsArg():
+def readParams():
     paramsFile = open(QUEST_NAME + '-temp.par', 'r')
     params = []
     for line in paramsFile:
         fields = [x.strip() for x in  line.split(':')]
-        params.append('{0}Part={1}'.format(fields[0], fields[1]))
-    return '--Change_Model ' + ' '.join(params) 
+        params.append((fields[0], fields[1]))
+    paramsFile.close()
+    return params
+
+def getParamsArg(params):
+    return '--Change_Model ' + ' '.join('{0}Part={1}'.format(name, value) for name, value in params)
 
 def setDistanceFunc(funcName):
     try:
         global DIST_FUNC
+        global DIST_NAME
         DIST_FUNC = dist.distFuncs[funcName]
+        DIST_NAME = funcName
     except KeyError:    
         raise Exception('Invalid distance function name: {}'.format(funcName))
 
+def parseDistanceNames(text):
+    if not text: return []
+    names = sorted(dist.distFuncs) if text == 'all' else [name.strip() for name in text.split(',') if name.strip()]
+    for name in names:
+        if name not in dist.distFuncs: raise Exception('Invalid distance function name: {}'.format(name))
+    if len(set(names)) != len(names): raise Exception('--distances lists a distance more than once.')
+    return names
+
 def getData(filePaths):
-    files = map(lambda x: open(x, 'r'), filePaths)
     data = {}
-    for f in files:
-        fileData = {}
-        headers = f.readline().split()
-        for header in headers:
-            fileData[header] = []
-        for line in f:
-            for i in range(0, len(headers)):
-                fileData[headers[i]].append(float(line.split()[i]))
-        mergeData(data, fileData)
+    for filePath in filePaths:
+        mergeData(data, readColumns(filePath))
     return data;
 
+def readColumns(filePath):
+    #parses the whole file in one go into one contiguous float array per column
+    with open(filePath, 'r') as f:
+        headers = f.readline().split()
+        if numpy is not None:
+            values = numpy.loadtxt(f, dtype=float, ndmin=2).ravel()
+        else:
+            values = array('d', map(float, f.read().split()))
+    return toColumns(headers, values, filePath)
+
+def toColumns(headers, values, source):
+    #values holds the rows of a time series back to back
+    if len(values) % len(headers):
+        raise Exception('Wrong number of columns in ' + source)
+    if numpy is not None:
+        matrix = numpy.asarray(values, dtype=float).reshape(-1, len(headers))
+        return dict(zip(headers, numpy.ascontiguousarray(matrix.T)))
+    return dict((header, values[i::len(headers)]) for i, header in enumerate(headers))
+
+def sameColumn(a, b):
+    if numpy is not None: return numpy.array_equal(a, b)
+    return a == b
+
 def mergeData(data, newData):
     if 'Time' in data:
-        if data['Time'] != newData['Time']:
+        if not sameColumn(data['Time'], newData['Time']):
             raise Exception('Times do not match while merging data.')   
     else:
         data['Time'] = newData['Time']
@@ -120,20 +297,25 @@ def mergeData(data, newData):
             raise Exception('Cannot overwrite amounts while merging data.')
         data[key] = newData[key]
 
-def getDist(obsData, simData):
-    distances = {}
+def getDist(obsData, simData, obsDenominators=None):
+    return getDists(obsData, simData, [DIST_NAME], obsDenominators)[0]
+
+def getDists(obsData, simData, funcNames, obsDenominators=None):
     if obsData.keys() != simData.keys():
         raise Exception('Keys must be equal when calculating the distance.')
-    if obsData['Time'] != simData['Time']:
+    if not sameColumn(obsData['Time'], simData['Time']):
         raise Exception('Times must be equal when calculating the distance.')
-    for key in obsData:
-        if key == 'Time': continue
+    keys = sorted(key for key in obsData if key != 'Time')
+    for key in keys:
         if len(obsData[key]) != len(simData[key]):
             raise Exception("Distance function requires vectors of the same length")
-        distances[key] = DIST_FUNC(obsData[key], simData[key])
-    dist = 0
-    for key in distances:
-        dist  += distances[key]
-    return dist
+    #all species are scored in one pass over the (time x species) matrices
+    obsMatrix = dist.stackColumns([obsData[key] for key in keys])
+    simMatrix = dist.stackColumns([simData[key] for key in keys])
+    denominators = None
+    if obsDenominators:
+        denominators = dist.stackColumns([obsDenominators[key] for key in keys])
+    return [dist.matrixDist(funcName, obsMatrix, simMatrix, denominators) for funcName in funcNames]
 
-main()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+#
+#  @file  simbank.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# A bank of the simulations of a quest for later runs (run.py --reuse).
+# Runs are filed under the sha1 of everything that decides a distance: the
+# parsed model (Quest.epb), the observed data and the distances, so only
+# simulations that would be simulated the same way again are reused.
+#
+#   <bank>/<key>/<run>/samples.txt   the rows the run simulated
+#   <bank>/<key>/<run>/priors.est    the priors it drew them from
+#   <bank>/<key>/<run>/run.json      rows and columns, written last
+#
+# A run can serve new priors if it has the same parameters, no rules or
+# complex parameters, and the support of its priors contains the new one.
+# Its rows are then draws from the old priors, and keeping every row with
+# probability r / max(r), where r is the ratio of the new to the old prior
+# density, turns them into draws from the new priors (rejection sampling).
+# Where both priors are uniform, r is constant inside the new bounds and
+# the rows inside them are kept. The rules of the new priors are applied
+# on top. The maximum of r is taken over a grid of RATIO_GRID_POINTS
+# points of every parameter and over the rows.
+#**********************************************************************#
+from __future__ import print_function
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import priors
+import samplestore
+
+BANK_DIR_NAME = 'bank'
+SAMPLES_NAME = 'samples.txt'
+PRIORS_NAME = 'priors.est'
+META_NAME = 'run.json'
+RATIO_GRID_POINTS = 1001
+COPY_BLOCK_SIZE = 16 * 2 ** 20
+
+
+#**********************************************************************#
+def keyDir(bankDir, epbPath, dataPath, distances):
+    digest = hashlib.sha1()
+    for path in (epbPath, dataPath):
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(COPY_BLOCK_SIZE), b''):
+                digest.update(block)
+    digest.update(json.dumps(distances).encode())
+    return os.path.join(bankDir, digest.hexdigest())
+
+
+def deposit(keyDir, runName, sampleFiles, priorsPath):
+    #files the complete rows of the sample files, returns their number
+    if not os.path.isdir(keyDir): os.makedirs(keyDir)
+    runDir = tempfile.mkdtemp(prefix=runName + '-', dir=keyDir)
+    samplesPath = os.path.join(runDir, SAMPLES_NAME)
+    header, rows = None, 0
+    with open(samplesPath, 'wb') as out:
+        for path in sampleFiles:
+            with open(path, 'rb') as f:
+                first = f.readline()
+                if header is None:
+                    header = first
+                    out.write(header)
+                elif first != header:
+                    raise Exception('The sample files {0} and {1} have different columns.'.format(sampleFiles[0], path))
+                for line in f:
+                    if not line.endswith(b'\n'): break
+                    out.write(line)
+                    rows += 1
+    if header is None:
+        shutil.rmtree(runDir)
+        return 0
+    shutil.copy(priorsPath, os.path.join(runDir, PRIORS_NAME))
+    if samplestore.numpy is not None: samplestore.update(samplesPath)
+    writeMeta(runDir, {'rows': rows, 'columns': header.decode().split()})
+    return rows
+
+
+def select(keyDir, priorsPath, columns, n, outPath, rng=None):
+    #writes at most n filed rows that are draws from the priors in priorsPath, returns their number
+    rng = rng or numpy.random.RandomState()
+    priorList, rules, complexParams = priors.readPriorFile(priorsPath)
+    if complexParams: raise Exception('Simulations with complex parameters can not be reused.')
+    accepted = []
+    for runDir in runDirs(keyDir):
+        meta = readMeta(runDir)
+        if meta is None or meta['columns'] != columns: continue
+        oldPriors, oldRules, oldComplex = priors.readPriorFile(os.path.join(runDir, PRIORS_NAME))
+        if oldRules or oldComplex or not covers(oldPriors, priorList): continue
+        samplesPath = os.path.join(runDir, SAMPLES_NAME)
+        values = dict((prior.name, numpy.asarray(samplestore.readColumn(samplesPath, prior.name))) for prior in priorList)
+        keep = rng.uniform(size=meta['rows']) * maxRatio(oldPriors, priorList, values) < densityRatio(oldPriors, priorList, values)
+        for rule in rules: keep &= rule.holds(values)
+        accepted.append((samplesPath, keep))
+
+    total = sum(int(keep.sum()) for path, keep in accepted)
+    if total > n:
+        #a random n of all accepted rows, in the order of the runs
+        chosen = numpy.zeros(total, dtype=bool)
+        chosen[rng.choice(total, n, replace=False)] = True
+        start = 0
+        for i, (path, keep) in enumerate(accepted):
+            count = int(keep.sum())
+            keep = keep.copy()
+            keep[keep] = chosen[start:start + count]
+            accepted[i] = (path, keep)
+            start += count
+        total = n
+    if total: writeRows(outPath, columns, accepted)
+    return total
+
+
+#**********************************************************************#
+def runDirs(keyDir):
+    if not os.path.isdir(keyDir): return []
+    return [os.path.join(keyDir, name) for name in sorted(os.listdir(keyDir)) if os.path.isdir(os.path.join(keyDir, name))]
+
+
+def covers(oldPriors, newPriors):
+    #whether the old priors are positive wherever the new ones are
+    if [p.name for p in oldPriors] != [p.name for p in newPriors]: return False
+    for old, new in zip(oldPriors, newPriors):
+        if old.isInt != new.isInt: return False
+        if new.dist == 'fixed':
+            if old.dist != 'fixed' or old.min != new.min: return False
+        elif old.dist == 'fixed' or old.min > new.min or old.max < new.max:
+            return False
+    return True
+
+
+def densityRatio(oldPriors, newPriors, values):
+    ratio = 1.0
+    for old, new in zip(oldPriors, newPriors):
+        x = values[new.name]
+        oldDensity = old.densities(x)
+        ratio = ratio * numpy.where(oldDensity > 0, new.densities(x) / numpy.where(oldDensity > 0, oldDensity, 1), 0)
+    return ratio
+
+
+def maxRatio(oldPriors, newPriors, values):
+    #the ratio of every parameter only depends on that parameter
+    result = 1.0
+    for old, new in zip(oldPriors, newPriors):
+        if new.dist == 'fixed': continue
+        grid = numpy.linspace(new.toInternal(new.min), new.toInternal(new.max), RATIO_GRID_POINTS)
+        if new.isLogScale(): grid = numpy.exp(grid)
+        x = numpy.concatenate([grid, values[new.name]])
+        result *= densityRatio([old], [new], {new.name: x}).max()
+    return result
+
+
+def writeRows(outPath, columns, accepted):
+    with open(outPath, 'w') as out:
+        out.write('\t'.join(columns) + '\n')
+        for path, keep in accepted:
+            if not keep.any(): continue
+            with open(path, 'r') as f:
+                f.readline()
+                for line, kept in zip(f, keep):
+                    if kept: out.write(line)
+
+
+def readMeta(runDir):
+    try:
+        with open(os.path.join(runDir, META_NAME), 'r') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def writeMeta(runDir, meta):
+    #written last and atomically, runs without it are still being filed
+    path = os.path.join(runDir, META_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.rename(path + '.tmp', path)
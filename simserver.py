@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+#
+#  @file  simserver.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+#/////////////////////////////////////////////////////////////////////////////
+
+from __future__ import print_function
+import os
+import sys
+import socket
+import argparse
+import dist
+import sim
+
+#relative on purpose: unix socket paths are limited to ~100 characters and the
+#run directories can be nested deeply
+SOCKET_NAME = 'sim.sock'
+
+#**********************************************************************#
+# A long-lived simulation server. One of these is started in every run
+# directory. ABCsampler calls simclient.py for each simulation, which asks the
+# server to run the simulation with the already loaded distance function and
+# observed data instead of starting up sim.py from scratch.
+#**********************************************************************#
+def main():
+    args = parseArgs()
+    sim.configure(args)
+    sim.getObsData()
+    serve(args.socket)
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Serve simulations for simclient.py.',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('quest', type=str, help='Name of the Quest.')
+    parser.add_argument('--distance', type=str, help='Distance to use. Options: ' \
+                        + (', ').join(dist.distFuncs.keys()), default='L2')
+    parser.add_argument('--stream', help='Read the time series through named pipes instead of TS*.txt files.', action='store_true')
+    parser.add_argument('--reject-threshold-file', type=str, help='File holding a distance threshold. Simulations are stopped as soon as their distance is known to exceed it. Implies --stream.')
+    parser.add_argument('--distance-log', type=str, help='Append the distance of every simulation to this file, '
+                        'the lower bounds of simulations stopped early with a leading >.')
+    parser.add_argument('--distances', type=str, help='Comma separated distances, or all, to compute from the same trajectory as well.')
+    parser.add_argument('--trajectory-bank', type=str, help='Keep the trajectory of every complete simulation in this directory.')
+    parser.add_argument('--socket', type=str, help='Path of the socket to listen on.', default=SOCKET_NAME)
+    return parser.parse_args()
+
+
+def serve(socketPath):
+    if os.path.exists(socketPath): os.remove(socketPath)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socketPath)
+    server.listen(1)
+    try:
+        while True:
+            conn = server.accept()[0]
+            try:
+                if not handleRequest(conn): break
+            finally:
+                conn.close()
+    finally:
+        server.close()
+        os.remove(socketPath)
+
+
+def handleRequest(conn):
+    request = conn.makefile('rb').readline().strip()
+    if request == b'quit':
+        conn.sendall(b'ok\n')
+        return False
+    if request != b'run':
+        conn.sendall(b'error unknown request\n')
+        return True
+    try:
+        sim.writeSummaryStats(sim.simulateDistances(sim.readParams()))
+    except Exception as e:
+        conn.sendall('error {0}\n'.format(str(e).replace('\n', ' ')).encode())
+        return True
+    conn.sendall(b'ok\n')
+    return True
+
+
+def stopServer(socketPath=SOCKET_NAME):
+    return request(socketPath, b'quit')
+
+
+def request(socketPath, message):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socketPath)
+        client.sendall(message + b'\n')
+        return client.makefile('rb').readline().strip()
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+#
+#  @file  smc.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+#/////////////////////////////////////////////////////////////////////////////
+
+#**********************************************************************#
+# ABC-SMC, the population Monte Carlo sampler of Beaumont et al. (2009).
+# The first population comes straight from the priors. Every following
+# population moves the particles of the previous one with a Gaussian kernel
+# whose covariance is twice the weighted covariance of that population and
+# only keeps simulations within a tolerance that shrinks to the alpha
+# quantile of the previous distances. Importance weights correct for not
+# sampling from the priors. Parameters with logunif and lognorm priors are
+# perturbed on the log scale (see priors.Prior.toInternal).
+#
+# The simulations themselves are done by a callable that maps a list of
+# parameter vectors to their distances, e.g. sampler.simulateAll on a pool
+# of simulation workers.
+#**********************************************************************#
+from __future__ import print_function
+import math
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+POPULATION_HEADER = ['Gen', 'Sim']
+MAX_EMPTY_ROUNDS = 100   #rounds of proposals that all fall outside the priors before a generation is given up
+
+
+class Population(object):
+
+    def __init__(self, generation, tolerance, values, internal, distances, weights, nSims):
+        self.generation = generation
+        self.tolerance = tolerance
+        self.values = values          #parameter values as passed to the simulations
+        self.internal = internal      #numpy array (particles x parameters) on the internal scale
+        self.distances = distances
+        self.weights = weights
+        self.nSims = nSims            #simulations run for this population
+
+    def ess(self):
+        return 1.0 / numpy.sum(numpy.square(self.weights))
+
+
+#**********************************************************************#
+def run(priorList, simulate, nParticles, maxSims, alpha=0.5, targetTolerance=None,
+        maxGenerations=20, minAcceptance=0.01, seed=None):
+    if numpy is None:
+        raise Exception('The SMC sampler requires numpy.')
+    if maxSims < nParticles:
+        raise Exception('ABC-SMC needs at least as many simulations as particles ({0} < {1}).'.format(maxSims, nParticles))
+    rng = numpy.random.RandomState(seed)
+    pyRng = random.Random(seed)
+
+    values = [[prior.draw(pyRng) for prior in priorList] for i in range(nParticles)]
+    internal = toInternal(priorList, values)
+    distances = numpy.asarray(simulate(values), dtype=float)
+    populations = [Population(0, float('inf'), values, internal, distances,
+                              numpy.full(nParticles, 1.0 / nParticles), nParticles)]
+    report(populations[-1])
+    nSims = nParticles
+
+    while len(populations) < maxGenerations:
+        previous = populations[-1]
+        tolerance = float(numpy.percentile(previous.distances, 100 * alpha))
+        if targetTolerance is not None and previous.tolerance <= targetTolerance: break
+        if targetTolerance is not None: tolerance = max(tolerance, targetTolerance)
+        if tolerance >= previous.tolerance: break
+
+        population = nextPopulation(priorList, simulate, previous, tolerance, maxSims - nSims, rng)
+        if population is None: break
+        nSims += population.nSims
+        populations.append(population)
+        report(population)
+        if float(nParticles) / population.nSims < minAcceptance: break
+    return populations
+
+
+def nextPopulation(priorList, simulate, previous, tolerance, simsLeft, rng):
+    nParticles = len(previous.values)
+    free = [i for i, prior in enumerate(priorList) if prior.dist != 'fixed']
+    cov = kernelCovariance(previous, free)
+    chol = numpy.linalg.cholesky(cov)
+
+    accepted = []
+    nSims = 0
+    nEmptyRounds = 0
+    acceptance = 1.0
+    while len(accepted) < nParticles:
+        #propose enough for the missing particles at the last acceptance rate
+        nProposals = int(min(simsLeft - nSims, math.ceil(1.2 * (nParticles - len(accepted)) / acceptance)))
+        if nProposals <= 0: return None
+        proposals = perturb(previous, chol, free, nProposals, rng)
+        priorDensity = internalPriorDensity(priorList, proposals)
+        proposals, priorDensity = proposals[priorDensity > 0], priorDensity[priorDensity > 0]
+        if not len(proposals):
+            #e.g. a population collapsed onto a bound of its prior
+            nEmptyRounds += 1
+            if nEmptyRounds >= MAX_EMPTY_ROUNDS:
+                print('Generation {0}: the perturbed particles keep falling outside the priors, stopping.'.format(previous.generation + 1))
+                return None
+            continue
+        values = fromInternal(priorList, proposals)
+        distances = numpy.asarray(simulate(values), dtype=float)
+        nSims += len(values)
+        acceptance = max(float(numpy.sum(distances <= tolerance)) / len(values), 1.0 / len(values))
+        for i in numpy.flatnonzero(distances <= tolerance):
+            accepted.append((values[i], proposals[i], distances[i], priorDensity[i]))
+
+    accepted = accepted[:nParticles]
+    internal = numpy.array([a[1] for a in accepted])
+    priorDensity = numpy.array([a[3] for a in accepted])
+    weights = priorDensity / kernelMixtureDensity(internal[:, free], previous.internal[:, free], previous.weights, cov)
+    return Population(previous.generation + 1, tolerance, [a[0] for a in accepted], internal,
+                      numpy.array([a[2] for a in accepted]), weights / weights.sum(), nSims)
+
+
+#**********************************************************************#
+def kernelCovariance(population, free):
+    #twice the weighted covariance (Beaumont et al. 2009), with a little
+    #jitter so that collapsed parameters keep a positive definite kernel
+    x = population.internal[:, free]
+    cov = 2 * numpy.atleast_2d(numpy.cov(x, rowvar=False, aweights=population.weights))
+    return cov + numpy.eye(len(free)) * (1e-12 + 1e-9 * numpy.trace(cov) / len(free))
+
+
+def perturb(population, chol, free, n, rng):
+    ancestors = rng.choice(len(population.weights), size=n, p=population.weights)
+    proposals = population.internal[ancestors].copy()
+    proposals[:, free] += rng.standard_normal((n, len(free))).dot(chol.T)
+    return proposals
+
+
+def kernelMixtureDensity(x, centers, weights, cov, chunk=1000):
+    #sum_j w_j N(x_i; c_j, cov) for every row x_i, in chunks to bound memory
+    chol = numpy.linalg.cholesky(cov)
+    norm = 1.0 / (numpy.power(2 * math.pi, x.shape[1] / 2.0) * numpy.prod(numpy.diag(chol)))
+    density = numpy.empty(len(x))
+    for start in range(0, len(x), chunk):
+        diff = x[start:start + chunk, None, :] - centers[None, :, :]
+        z = numpy.linalg.solve(chol, diff.reshape(-1, x.shape[1]).T).T.reshape(diff.shape)
+        density[start:start + chunk] = norm * numpy.exp(-0.5 * numpy.sum(z * z, axis=2)).dot(weights)
+    return density
+
+
+def toInternal(priorList, values):
+    return numpy.array([[prior.toInternal(v) for prior, v in zip(priorList, row)] for row in values], dtype=float)
+
+
+def fromInternal(priorList, internal):
+    return [[prior.fromInternal(u) for prior, u in zip(priorList, row)] for row in internal]
+
+
+def internalPriorDensity(priorList, internal):
+    density = numpy.ones(len(internal))
+    for i, prior in enumerate(priorList):
+        density *= [prior.internalDensity(u) for u in internal[:, i]]
+    return density
+
+
+def report(population):
+    print('SMC generation {0}: tolerance {1:.6g}, {2} simulations, ESS {3:.1f}'.format(
+          population.generation, population.tolerance, population.nSims, population.ess()))
+
+
+#**********************************************************************#
+def resample(population, n, rng):
+    #systematic resampling into n equally weighted particles
+    positions = (rng.uniform() + numpy.arange(n)) / n
+    indices = numpy.searchsorted(numpy.cumsum(population.weights), positions)
+    return numpy.minimum(indices, len(population.weights) - 1)
+
+
+def writeSamples(path, priorList, population, seed=None):
+    #the final population as plain (unweighted) rows for ABCestimator
+    rng = numpy.random.RandomState(seed)
+    with open(path, 'w') as f:
+        f.write('\t'.join(['Sim'] + [prior.name for prior in priorList] + ['myDist']) + '\n')
+        for row, i in enumerate(resample(population, len(population.weights), rng)):
+            values = [prior.format(v) for prior, v in zip(priorList, population.values[i])]
+            f.write('\t'.join([str(row + 1)] + values + ['%.10f' % population.distances[i]]) + '\n')
+
+
+def writePopulations(path, priorList, populations):
+    with open(path, 'w') as f:
+        f.write('\t'.join(POPULATION_HEADER + [prior.name for prior in priorList] + ['myDist', 'weight', 'tolerance']) + '\n')
+        for population in populations:
+            for i in range(len(population.values)):
+                values = [prior.format(v) for prior, v in zip(priorList, population.values[i])]
+                f.write('\t'.join([str(population.generation), str(i + 1)] + values +
+                                  ['%.10f' % population.distances[i], '%.10g' % population.weights[i],
+                                   '%.10g' % population.tolerance]) + '\n')
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+#
+#  @file  stream.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+#/////////////////////////////////////////////////////////////////////////////
+
+#**********************************************************************#
+# Streams the time series of a running worker through named pipes instead
+# of TS*.txt files on disk. The worker only knows how to write its
+# TimeSeries blocks to files, so every TS*.txt file of a run directory is
+# replaced by a fifo of the same name and sim.py parses the rows while the
+# worker is still producing them.
+#**********************************************************************#
+from __future__ import print_function
+import os
+import stat
+import glob
+import fcntl
+import threading
+from array import array
+
+TS_PATTERN = 'TS*.txt'
+
+
+#**********************************************************************#
+def isFifo(path):
+    return stat.S_ISFIFO(os.stat(path).st_mode)
+
+
+def preparePipes():
+    #the file names come from the TimeSeries blocks of the quest, so they are
+    #only known after a first simulation wrote regular files. Returns an
+    #empty list if there was no simulation yet.
+    paths = sorted(glob.glob(TS_PATTERN))
+    for path in paths:
+        if not isFifo(path):
+            os.remove(path)
+            os.mkfifo(path)
+    return paths
+
+
+def removePipes():
+    #a worker writing regular files would block forever on a fifo left
+    #behind by an earlier streaming run
+    for path in glob.glob(TS_PATTERN):
+        if isFifo(path): os.remove(path)
+
+
+def regularFiles():
+    return sorted(path for path in glob.glob(TS_PATTERN) if not isFifo(path))
+
+
+#**********************************************************************#
+class TimeSeriesPipe(object):
+    # Reads one TimeSeries fifo on a separate thread. The pipe keeps a write
+    # end of its own open until closeWriter() is called, so the reader never
+    # sees an end of file before the worker had a chance to open the fifo,
+    # and the worker never blocks on opening it.
+
+    def __init__(self, path, onRow=None):
+        self.path = path
+        self.onRow = onRow
+        self.headers = None
+        self.nRows = 0
+        self.values = array('d')
+        self.error = None
+        readFd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        self.writeFd = os.open(path, os.O_WRONLY)
+        clearNonBlocking(readFd)
+        self.reader = os.fdopen(readFd, 'r')
+        self.thread = threading.Thread(target=self.read)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def read(self):
+        try:
+            for line in self.reader:
+                fields = line.split()
+                if not fields: continue
+                if self.headers is None:
+                    self.headers = fields
+                    continue
+                row = [float(x) for x in fields]
+                self.values.extend(row)
+                self.nRows += 1
+                if self.onRow: self.onRow(self, self.nRows - 1, row)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.reader.close()
+
+    def closeWriter(self):
+        if self.writeFd is not None:
+            os.close(self.writeFd)
+            self.writeFd = None
+
+    def finish(self):
+        self.closeWriter()
+        self.thread.join()
+        if self.error: raise self.error
+
+
+def clearNonBlocking(fd):
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags & ~os.O_NONBLOCK)
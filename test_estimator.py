@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+#**********************************************************************#
+# Checks of the native estimator, run with python -m unittest test_estimator
+#**********************************************************************#
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import estimator
+
+
+#**********************************************************************#
+@unittest.skipIf(estimator.numpy is None, 'The native estimator needs numpy.')
+class PeakWidthTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='evolvix_test_')
+        rng = random.Random(1)
+        with open(os.path.join(self.dir, 'samples.txt'), 'w') as f:
+            f.write('Sim\tbirthRate\tmyDist\n')
+            for i in range(500):
+                rate = rng.uniform(0, 1)
+                f.write('{0}\t{1:.10f}\t{2:.10f}\n'.format(i + 1, rate, abs(rate - 0.3) + rng.uniform(0, 0.05)))
+        with open(os.path.join(self.dir, 'target_distance.txt'), 'w') as f:
+            f.write('myDist\n0\n')
+        with open(os.path.join(self.dir, 'priors.est'), 'w') as f:
+            f.write('[PARAMETERS]\n0\tbirthRate\tunif\t0\t1\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def density(self, peakWidth, usePeakWidth):
+        inputPath = os.path.join(self.dir, 'input.txt')
+        with open(inputPath, 'w') as f:
+            f.write('simName samples.txt\nobsName target_distance.txt\nparams 2\nnumRetained 100\n'
+                    'diracPeakWidth {0}\n'.format(peakWidth))
+        estimator.run(inputPath, 'none', os.path.join(self.dir, 'priors.est'), usePeakWidth)
+        with open(os.path.join(self.dir, estimator.DEFAULT_OUTPUT_PREFIX + 'model0_MarginalPosteriorDensities_Obs0.txt')) as f:
+            return f.read()
+
+    def testPeakWidthChangesDensities(self):
+        silverman = self.density(0.001, False)
+        self.assertEqual(silverman, self.density(0.2, False))
+        narrow = self.density(0.001, True)
+        wide = self.density(0.2, True)
+        self.assertNotEqual(narrow, wide)
+        self.assertNotEqual(silverman, wide)
+
+
+if __name__ == '__main__':
+    unittest.main()
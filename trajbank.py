@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+#
+#  @file  trajbank.py
+#
+#  Licensing of this file is governed by the Evolvix Contributors License Agreement
+#  as described at http://evolvix.org/intro/legal
+#
+#  The license chosen for this file is the BSD-3-Clause
+#  ( http://opensource.org/licenses/BSD-3-Clause ):
+#
+#  Copyright (c) 10/18/2026 Authors and contributors as listed in the corresponding
+#                code repository of this file and associated organizations if applicable.
+#                All rights reserved.
+#/////////////////////////////////////////////////////////////////////////////
+#  Redistribution and use in source and binary forms, with or without modification,
+#  are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the names of authors nor the names of their organizations nor
+#     the names of other contributors to the project may be used to endorse or promote
+#     products derived from this software without specific prior written permission.
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#  IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+#  INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+#  BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+#  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+#  OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+#  OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#**********************************************************************#
+# A bank of simulated trajectories (sim.py --trajectory-bank), so that
+# distances can be recomputed later (see rescore.py) without simulating
+# again. Every run directory appends to its own chunk files in the bank,
+# <run dir>.<n>.trj, and starts a new one once a chunk has MAX_CHUNK_SIZE
+# bytes, so sims never share a file.
+#
+# A chunk is a sequence of records: a struct '<II' with the lengths of a
+# JSON header and of the payload, the header, the payload and a struct
+# '<I4s' with the length of the record and END_MAGIC. The header
+# holds the key, the parameters, the column names and the number of rows.
+# The payload is the zlib compressed, byte shuffled little endian doubles
+# of every column in turn. The key is the sha1 of the parameters and of
+# the doubles, which addresses a record by its content. A record cut off
+# by a crash ends the chunk for readers, and writers start a new chunk
+# instead of appending behind it.
+#**********************************************************************#
+from __future__ import print_function
+import os
+import sys
+import glob
+import json
+import zlib
+import struct
+import hashlib
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+RECORD_HEADER = struct.Struct('<II')
+RECORD_END = struct.Struct('<I4s')
+END_MAGIC = b'TRJ\n'
+CHUNK_SUFFIX = '.trj'
+MAX_CHUNK_SIZE = 64 * 2 ** 20
+COMPRESSION_LEVEL = 6
+DOUBLE_SIZE = 8
+
+
+#**********************************************************************#
+def append(bankDir, core, params, data):
+    #params are the (name, value) pairs of the simulation, data its columns as read by sim.getData
+    columns = ['Time'] + sorted(key for key in data if key != 'Time')
+    raw = b''.join(columnBytes(data[column]) for column in columns)
+    key = recordKey(params, raw)
+    header = json.dumps({'key': key, 'params': [list(p) for p in params], 'columns': columns,
+                         'rows': len(data['Time'])}).encode()
+    payload = zlib.compress(shuffle(raw), COMPRESSION_LEVEL)
+    record = RECORD_HEADER.pack(len(header), len(payload)) + header + payload
+    fd = os.open(currentChunk(bankDir, core), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, record + RECORD_END.pack(len(record), END_MAGIC))
+    finally:
+        os.close(fd)
+    return key
+
+
+def readChunk(path):
+    #yields the header and the columns of every complete record
+    with open(path, 'rb') as f:
+        raw = f.read()
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(raw):
+        headerSize, payloadSize = RECORD_HEADER.unpack_from(raw, offset)
+        start = offset + RECORD_HEADER.size
+        end = start + headerSize + payloadSize
+        if end + RECORD_END.size > len(raw): break
+        if RECORD_END.unpack_from(raw, end) != (end - offset, END_MAGIC): break
+        header = json.loads(raw[start:start + headerSize].decode())
+        values = unshuffle(zlib.decompress(raw[start + headerSize:end]))
+        yield header, toColumns(header['columns'], header['rows'], values)
+        offset = end + RECORD_END.size
+
+
+def chunkPaths(bankDir):
+    return sorted(glob.glob(os.path.join(bankDir, '*' + CHUNK_SUFFIX)))
+
+
+#**********************************************************************#
+def currentChunk(bankDir, core):
+    #the last chunk of the core, or a new one once it is full or ends in a broken record
+    paths = glob.glob(os.path.join(bankDir, '{0}.*{1}'.format(core, CHUNK_SUFFIX)))
+    numbers = [int(os.path.basename(p)[len(core) + 1:-len(CHUNK_SUFFIX)]) for p in paths]
+    number = max(numbers) if numbers else 0
+    path = chunkPath(bankDir, core, number)
+    if os.path.exists(path) and (os.path.getsize(path) >= MAX_CHUNK_SIZE or not completeTail(path)):
+        path = chunkPath(bankDir, core, number + 1)
+    return path
+
+
+def completeTail(path):
+    size = os.path.getsize(path)
+    if size == 0: return True
+    if size < RECORD_END.size: return False
+    with open(path, 'rb') as f:
+        f.seek(size - RECORD_END.size)
+        length, magic = RECORD_END.unpack(f.read(RECORD_END.size))
+    return magic == END_MAGIC and length + RECORD_END.size <= size
+
+
+def chunkPath(bankDir, core, number):
+    return os.path.join(bankDir, '{0}.{1}{2}'.format(core, number, CHUNK_SUFFIX))
+
+
+def recordKey(params, raw):
+    digest = hashlib.sha1()
+    for name, value in params:
+        digest.update('{0}={1};'.format(name, value).encode())
+    digest.update(raw)
+    return digest.hexdigest()
+
+
+def columnBytes(column):
+    if numpy is not None: return numpy.asarray(column, dtype='<f8').tobytes()
+    values = array('d', column)
+    if sys.byteorder == 'big': values.byteswap()
+    return values.tobytes()
+
+
+def toColumns(names, rows, raw):
+    if numpy is not None:
+        values = numpy.frombuffer(raw, dtype='<f8').reshape(len(names), rows)
+        return dict(zip(names, values))
+    values = array('d')
+    values.frombytes(raw)
+    if sys.byteorder == 'big': values.byteswap()
+    return dict((name, values[i * rows:(i + 1) * rows]) for i, name in enumerate(names))
+
+
+#**********************************************************************#
+# Byte shuffling groups the i-th bytes of all doubles, which compresses
+# trajectories of counts about twice as well as the plain doubles.
+#**********************************************************************#
+def shuffle(raw):
+    n = len(raw) // DOUBLE_SIZE
+    out = bytearray(len(raw))
+    for i in range(DOUBLE_SIZE):
+        out[i * n:(i + 1) * n] = raw[i::DOUBLE_SIZE]
+    return bytes(out)
+
+
+def unshuffle(raw):
+    n = len(raw) // DOUBLE_SIZE
+    out = bytearray(len(raw))
+    for i in range(DOUBLE_SIZE):
+        out[i::DOUBLE_SIZE] = raw[i * n:(i + 1) * n]
+    return bytes(out)